@@ -75,6 +75,7 @@ sleep 30
 # 运行数据库迁移
 echo "运行数据库迁移..."
 $DOCKER_COMPOSE_CMD exec backend python manage.py migrate 2>/dev/null || echo "警告: 数据库迁移失败"
+$DOCKER_COMPOSE_CMD exec backend python manage.py createcachetable 2>/dev/null || echo "警告: 缓存表创建失败"
 
 # 收集静态文件
 echo "收集静态文件..."
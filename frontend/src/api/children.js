@@ -1,4 +1,5 @@
 import request from '@/utils/request'
+import { runJob, runExportJob } from './jobs'
 
 /**
  * 获取幼儿列表
@@ -210,10 +211,10 @@ export const getChildrenAttendanceStats = (params) => {
 /**
  * 批量导入幼儿数据
  * @param {FormData} formData - 包含文件的表单数据
- * @returns {Promise} - 返回导入结果
+ * @returns {Promise} - 以后台任务导入，返回导入结果
  */
 export const importChildren = (formData) => {
-  return request({
+  return runJob({
     url: 'children/import_data/',
     method: 'post',
     data: formData,
@@ -238,14 +239,13 @@ export const exportChildTemplate = () => {
 /**
  * 导出幼儿数据
  * @param {Object} params - 查询参数（与获取列表参数一致）
- * @returns {Promise} - 返回导出的文件流
+ * @returns {Promise} - 以后台任务导出，返回导出的文件流
  */
 export const exportChildren = (params) => {
-  return request({
+  return runExportJob({
     url: 'children/export_data/',
     method: 'get',
-    params,
-    responseType: 'blob'
+    params
   })
 }
 
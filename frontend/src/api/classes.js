@@ -1,4 +1,5 @@
 import request from '@/utils/request'
+import { runJob } from './jobs'
 
 /**
  * 获取班级列表
@@ -114,10 +115,10 @@ export function getClasses(params) {
 /**
  * 批量导入班级数据
  * @param {FormData} formData - 包含Excel文件的表单数据
- * @returns {Promise} - 返回导入结果
+ * @returns {Promise} - 以后台任务导入，返回导入结果
  */
 export function importClasses(formData) {
-  return request({
+  return runJob({
     url: 'classes/import_data/',
     method: 'post',
     data: formData,
@@ -0,0 +1,76 @@
+import request from '@/utils/request'
+
+// 轮询任务状态的间隔（毫秒）
+const POLL_INTERVAL = 1000
+
+const sleep = (ms) => new Promise(resolve => setTimeout(resolve, ms))
+
+/**
+ * 获取后台任务详情
+ * @param {number} id - 任务ID
+ * @returns {Promise} - 返回任务状态、进度和执行结果
+ */
+export function getJob(id) {
+  return request({
+    url: `jobs/${id}/`,
+    method: 'get'
+  })
+}
+
+/**
+ * 下载后台任务生成的文件
+ * @param {number} id - 任务ID
+ * @returns {Promise} - 返回文件流
+ */
+export function downloadJobResult(id) {
+  return request({
+    url: `jobs/${id}/download/`,
+    method: 'get',
+    responseType: 'blob'
+  })
+}
+
+/**
+ * 轮询直到任务结束
+ * 任务失败时以与直接请求相同的形式拒绝，error.response 中是任务记录的状态码和响应数据
+ * @param {Object} job - 提交任务时返回的任务信息
+ * @returns {Promise} - 返回执行完成的任务
+ */
+export async function waitForJob(job) {
+  while (job.status === 'pending' || job.status === 'running') {
+    await sleep(POLL_INTERVAL)
+    job = await getJob(job.id)
+  }
+  if (job.status === 'failed') {
+    const error = new Error(job.message || '任务执行失败')
+    error.response = { status: job.status_code, data: job.result }
+    throw error
+  }
+  return job
+}
+
+// 在请求参数中指定以后台任务执行
+const submitJob = (config) => request({
+  ...config,
+  params: { ...config.params, background: true }
+})
+
+/**
+ * 以后台任务执行导入等操作，等待任务结束
+ * @param {Object} config - 请求配置
+ * @returns {Promise} - 返回操作的响应数据
+ */
+export async function runJob(config) {
+  const job = await waitForJob(await submitJob(config))
+  return job.result
+}
+
+/**
+ * 以后台任务执行导出，等待任务结束后下载生成的文件
+ * @param {Object} config - 请求配置
+ * @returns {Promise} - 返回文件流
+ */
+export async function runExportJob(config) {
+  const job = await waitForJob(await submitJob(config))
+  return downloadJobResult(job.id)
+}
@@ -1,4 +1,5 @@
 import request from '@/utils/request'
+import { runExportJob } from './jobs'
 
 /**
  * 选区管理相关API
@@ -93,6 +94,16 @@ export function updateSelectionRecord(id, data) {
   })
 }
 
+// 批量调整选区：moves 每项包含 id、selection_area_id 和读取记录时的 updated_at
+// 记录已被其他操作修改时返回409，不写入任何数据
+export function bulkMoveSelectionRecords(moves) {
+  return request({
+    url: 'selections/selection-records/bulk_move/',
+    method: 'post',
+    data: { moves }
+  })
+}
+
 export function deleteSelectionRecord(id) {
   return request({
     url: `selections/selection-records/${id}/`,
@@ -155,12 +166,19 @@ export function getDashboardStats(params) {
   })
 }
 
-// 导出选区记录API
-export function exportSelectionRecords(params) {
+// 选区操作页面的班级看板：选区及当天人数、幼儿名单和当天的分配
+export function getClassBoard(classId) {
   return request({
+    url: `selections/class-board/${classId}/`,
+    method: 'get'
+  })
+}
+
+// 导出选区记录API，以后台任务导出并下载生成的文件
+export function exportSelectionRecords(params) {
+  return runExportJob({
     url: 'selections/selection-records/export/',
     method: 'get',
-    params,
-    responseType: 'blob'
+    params
   })
 }
\ No newline at end of file
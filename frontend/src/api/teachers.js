@@ -1,4 +1,5 @@
 import request from '@/utils/request'
+import { runJob } from './jobs'
 
 /**
  * 获取教师列表
@@ -111,10 +112,10 @@ export function updateTeacherStatus(id, status) {
 /**
  * 批量导入教师数据
  * @param {FormData} formData - 包含Excel文件的表单数据
- * @returns {Promise} - 返回导入结果
+ * @returns {Promise} - 以后台任务导入，返回导入结果
  */
 export function importTeachers(formData) {
-  return request({
+  return runJob({
     url: 'teachers/import_data/',
     method: 'post',
     data: formData,
@@ -100,6 +100,11 @@ service.interceptors.response.use(
       return Promise.reject(error)
     }
     
+    // 409表示数据已被其他操作修改，由调用方刷新数据
+    if (status === 409 && data && data.conflicts) {
+      return Promise.reject(error)
+    }
+    
     // 优先使用后端返回的错误信息
     if (data && typeof data === 'object' && data.msg) {
       ElMessage.error(data.msg)
@@ -7,6 +7,7 @@ echo "开始初始化数据库..."
 # 运行 Django 数据库迁移
 echo "运行数据库迁移..."
 docker-compose exec backend python manage.py migrate
+docker-compose exec backend python manage.py createcachetable
 
 # 收集静态文件
 echo "收集静态文件..."
@@ -0,0 +1,325 @@
+import os
+import urllib.parse
+import pandas as pd
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.core.validators import validate_email
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from .models import Child
+from jobs.progress import report_progress
+from classes.models import Class
+from kindergartens.models import Kindergarten
+from kindergartens.counters import refresh_counters_for_classes
+from search.index import index_instances, index_unindexed
+from common.cache import bump_model_versions
+
+
+# 导入文件必须包含的列
+REQUIRED_COLUMNS = ['幼儿姓名(*)', '性别(*)', '出生日期(*)', '班级名称(*)', '家长姓名', '家长手机号']
+
+# 可选文本列与模型字段的对应关系
+OPTIONAL_TEXT_COLUMNS = {
+    '家长邮箱': 'parent_email',
+    '家庭地址': 'home_address',
+    '健康备注': 'health_notes',
+    '备注': 'notes',
+}
+
+# 性别取值映射，无法识别的性别按原逻辑默认为男
+GENDER_MAP = {'男': 'male', '女': 'female', 'male': 'male', 'female': 'female'}
+
+# 每批写入的记录数
+IMPORT_BATCH_SIZE = 500
+
+
+def _clean_text(series):
+    """
+    将一列转换为去除首尾空白的字符串，空值和空字符串统一为 None
+
+    Excel 中的数字单元格（如学号、手机号）会被读成浮点数，这里去掉多余的“.0”。
+    """
+    text = series.astype('string').str.strip()
+    text = text.str.replace(r'^(\d+)\.0$', r'\1', regex=True)
+    text = text.mask(text == '')
+    return text.astype(object).where(text.notna(), None)
+
+
+def _parse_dates(series):
+    """
+    批量解析日期列，无法解析的值为 NaT
+    """
+    return pd.to_datetime(series, errors='coerce', format='mixed').dt.date
+
+
+def _column(df, name):
+    """
+    读取可选列，不存在时返回全空的列
+    """
+    if name in df.columns:
+        return df[name]
+    return pd.Series([None] * len(df), index=df.index, dtype=object)
+
+
+class ChildImporter:
+    """
+    幼儿批量导入流程
+
+    1. 在 DataFrame 上整列规范化性别、日期、手机号等字段
+    2. 幼儿园和班级名称通过一次查询加载到字典中解析
+    3. 按学号匹配已有幼儿，批量更新已有记录、批量创建新记录
+    出错的行记录行号和原因后跳过，其余行在一个事务中写入；
+    试运行模式只做校验和统计，不写入数据库。
+    """
+    def __init__(self, user, dry_run=False, batch_size=IMPORT_BATCH_SIZE):
+        self.user = user
+        self.dry_run = dry_run
+        self.batch_size = batch_size
+        self.errors = {}
+        # 被更新幼儿的原班级ID
+        self.previous_class_ids = set()
+
+    def add_error(self, index, message):
+        """
+        记录行错误，同一行只保留第一个错误
+        """
+        self.errors.setdefault(index, message)
+
+    def run(self, df):
+        """
+        执行导入
+
+        Args:
+            df (DataFrame): 从Excel读取的原始数据
+
+        Returns:
+            dict: created_count、updated_count、total_rows、errors、dry_run
+        """
+        report_progress(0, f'共 {len(df)} 行，正在校验数据', force=True)
+        frame = self.normalize(df)
+        self.resolve_classes(df, frame)
+        self.validate(frame)
+        valid = frame.drop(index=list(self.errors))
+
+        to_create, to_update, avatar_paths = self.build_instances(valid)
+        if not self.dry_run:
+            report_progress(60, f'校验完成，正在写入 {len(to_create) + len(to_update)} 条记录', force=True)
+            self.write(to_create, to_update)
+            if avatar_paths:
+                report_progress(90, f'正在保存 {len(avatar_paths)} 个头像文件', force=True)
+            self.save_avatars(avatar_paths)
+
+        return {
+            'created_count': len(to_create),
+            'updated_count': len(to_update),
+            'total_rows': len(df),
+            'errors': [f'第{index + 2}行: {message}' for index, message in sorted(self.errors.items())],
+            'dry_run': self.dry_run,
+        }
+
+    def normalize(self, df):
+        """
+        整列规范化导入数据
+        """
+        today = timezone.now().date()
+        frame = pd.DataFrame(index=df.index)
+        frame['name'] = _clean_text(df['幼儿姓名(*)'])
+        frame['gender'] = _clean_text(df['性别(*)']).map(GENDER_MAP).fillna('male')
+        frame['birth_date'] = _parse_dates(df['出生日期(*)'])
+        frame['class_name'] = _clean_text(df['班级名称(*)'])
+        frame['parent_name'] = _clean_text(df['家长姓名']).fillna('')
+        # 手机号去掉空格和连字符
+        frame['parent_phone'] = _clean_text(
+            df['家长手机号'].astype('string').str.replace(r'[\s-]', '', regex=True)
+        ).fillna('')
+        frame['student_id'] = _clean_text(_column(df, '学号'))
+
+        admission = _column(df, '入园日期')
+        frame['admission_date'] = _parse_dates(admission)
+        frame['admission_invalid'] = admission.notna() & frame['admission_date'].isna()
+        frame['admission_date'] = frame['admission_date'].where(admission.notna(), today)
+
+        for column, field in OPTIONAL_TEXT_COLUMNS.items():
+            frame[field] = _clean_text(_column(df, column))
+        frame['avatar_url'] = _clean_text(_column(df, '头像URL'))
+        return frame
+
+    def get_user_kindergarten_id(self):
+        """
+        非系统所有者导入时使用的幼儿园
+        """
+        user = self.user
+        if user.role == 'teacher' and getattr(user, 'teacher', None):
+            return user.teacher.kindergarten_id
+        return user.kindergarten_id
+
+    def resolve_classes(self, df, frame):
+        """
+        一次查询加载涉及的班级，将班级名称解析为班级ID
+        """
+        frame['class_id'] = None
+        class_names = set(frame['class_name'].dropna())
+
+        if self.user.role == 'owner':
+            # 系统所有者需要通过幼儿园名称定位班级
+            kindergarten_names = _clean_text(_column(df, '幼儿园名称'))
+            known_kindergartens = set(
+                Kindergarten.objects.filter(
+                    name__in=set(kindergarten_names.dropna())
+                ).values_list('name', flat=True)
+            )
+            class_map = {
+                (kindergarten_name, class_name): class_id
+                for kindergarten_name, class_name, class_id in Class.objects.filter(
+                    kindergarten__name__in=known_kindergartens, name__in=class_names
+                ).values_list('kindergarten__name', 'name', 'id')
+            }
+            for index, class_name in frame['class_name'].items():
+                if class_name is None:
+                    continue
+                kindergarten_name = kindergarten_names[index]
+                if kindergarten_name is None:
+                    self.add_error(index, '系统管理员需要提供幼儿园名称')
+                elif kindergarten_name not in known_kindergartens:
+                    self.add_error(index, f"幼儿园 '{kindergarten_name}' 不存在")
+                elif (kindergarten_name, class_name) not in class_map:
+                    self.add_error(index, f"班级 '{class_name}' 在指定幼儿园中不存在")
+                else:
+                    frame.at[index, 'class_id'] = class_map[(kindergarten_name, class_name)]
+        else:
+            class_map = dict(
+                Class.objects.filter(
+                    kindergarten_id=self.get_user_kindergarten_id(), name__in=class_names
+                ).values_list('name', 'id')
+            )
+            for index, class_name in frame['class_name'].items():
+                if class_name is None:
+                    continue
+                if class_name not in class_map:
+                    self.add_error(index, f"班级 '{class_name}' 在您的幼儿园中不存在")
+                else:
+                    frame.at[index, 'class_id'] = class_map[class_name]
+
+    def validate(self, frame):
+        """
+        校验必填项、字段长度、日期和邮箱格式，并检查文件内重复的学号
+        """
+        checks = [
+            (frame['name'].isna(), '幼儿姓名不能为空'),
+            (frame['class_name'].isna(), '班级不能为空'),
+            (frame['birth_date'].isna(), '出生日期格式不正确'),
+            (frame['admission_invalid'], '入园日期格式不正确'),
+            (frame['name'].str.len() > 50, '幼儿姓名不能超过50个字符'),
+            (frame['parent_name'].str.len() > 50, '家长姓名不能超过50个字符'),
+            (frame['parent_phone'].str.len() > 11, '家长手机号不能超过11位'),
+            (frame['student_id'].str.len() > 20, '学号不能超过20个字符'),
+            (frame['home_address'].str.len() > 255, '家庭地址不能超过255个字符'),
+            (frame['student_id'].notna() & frame['student_id'].duplicated(), '学号在导入文件中重复'),
+        ]
+        for mask, message in checks:
+            for index in frame.index[mask.fillna(False).astype(bool)]:
+                self.add_error(index, message)
+
+        for index, email in frame['parent_email'].dropna().items():
+            try:
+                validate_email(email)
+            except ValidationError:
+                self.add_error(index, f"家长邮箱 '{email}' 格式不正确")
+
+    def get_avatar_path(self, index, avatar_url):
+        """
+        解析本地头像路径，只支持 file:/// 开头的本地文件
+        """
+        if not avatar_url.startswith('file:///'):
+            self.add_error(index, f'头像URL只支持本地文件路径 {avatar_url}')
+            return None
+        file_path = urllib.parse.unquote(avatar_url[8:])
+        if not os.path.exists(file_path):
+            self.add_error(index, f'头像文件不存在 {file_path}')
+            return None
+        return file_path
+
+    def build_instances(self, valid):
+        """
+        按学号匹配已有幼儿，构建待创建和待更新的实例
+        """
+        # 学号全局唯一，按学号匹配时一并取出所属幼儿园，只允许更新导入者数据范围内的幼儿
+        existing = Child.objects.annotate(
+            kindergarten_id=F('class_info__kindergarten_id')
+        ).in_bulk(set(valid['student_id'].dropna()), field_name='student_id')
+        kindergarten_id = None if self.user.role == 'owner' else self.get_user_kindergarten_id()
+        now = timezone.now()
+        to_create, to_update, avatar_paths = [], [], []
+
+        for index, row in zip(valid.index, valid.to_dict('records')):
+            child = existing.get(row['student_id'])
+            if child is not None and kindergarten_id is not None and child.kindergarten_id != kindergarten_id:
+                self.add_error(index, f"学号 '{row['student_id']}' 已被其他幼儿园的幼儿使用")
+                continue
+
+            # 头像无效时仍导入该行，只记录错误
+            avatar_path = None
+            if row['avatar_url'] is not None:
+                avatar_path = self.get_avatar_path(index, row['avatar_url'])
+
+            if child is None:
+                child = Child(created_at=now, student_id=row['student_id'])
+                to_create.append(child)
+            else:
+                to_update.append(child)
+                # 记录原班级，写入后重算原班级所属幼儿园的统计字段
+                self.previous_class_ids.add(child.class_info_id)
+
+            child.name = row['name']
+            child.gender = row['gender']
+            child.birth_date = row['birth_date']
+            child.class_info_id = row['class_id']
+            child.parent_name = row['parent_name']
+            child.parent_phone = row['parent_phone']
+            child.admission_date = row['admission_date']
+            # 可选字段为空时保留原值
+            for field in OPTIONAL_TEXT_COLUMNS.values():
+                if row[field] is not None:
+                    setattr(child, field, row[field])
+            child.updated_at = now
+            if avatar_path:
+                avatar_paths.append((index, child, avatar_path))
+        return to_create, to_update, avatar_paths
+
+    def write(self, to_create, to_update):
+        """
+        在一个事务中分批写入，批量写入不触发信号，写入后统一重算幼儿园统计字段、更新搜索词元并使响应缓存失效
+        """
+        update_fields = [
+            'name', 'gender', 'birth_date', 'class_info', 'parent_name', 'parent_phone',
+            'admission_date', 'updated_at', *OPTIONAL_TEXT_COLUMNS.values()
+        ]
+        with transaction.atomic():
+            Child.objects.bulk_create(to_create, batch_size=self.batch_size)
+            Child.objects.bulk_update(to_update, update_fields, batch_size=self.batch_size)
+            refresh_counters_for_classes(
+                {child.class_info_id for child in to_create + to_update} | self.previous_class_ids
+            )
+            index_instances('child', to_create + to_update, batch_size=self.batch_size)
+            if any(child.pk is None for child in to_create):
+                # 部分数据库的 bulk_create 不回填主键，新建的幼儿按缺少词元补建
+                index_unindexed('child')
+            bump_model_versions('children.Child')
+
+    def save_avatars(self, avatar_paths):
+        """
+        保存本地头像文件，只有提供了头像的行会逐条写入
+        """
+        for index, child, file_path in avatar_paths:
+            if child.pk is None:
+                # 部分数据库的 bulk_create 不回填主键，按学号重新获取
+                child = Child.objects.filter(student_id=child.student_id).first() if child.student_id else None
+                if child is None:
+                    self.add_error(index, '头像文件保存失败 无法定位新建的幼儿')
+                    continue
+            try:
+                with open(file_path, 'rb') as f:
+                    child.avatar.save(os.path.basename(file_path), File(f), save=True)
+            except Exception as e:
+                self.add_error(index, f'头像文件保存失败 {str(e)}')
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('children', '0002_child_child_class_active_idx'),
+        ('classes', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='child',
+            index=models.Index(fields=['created_at', 'id'], name='child_created_idx'),
+        ),
+    ]
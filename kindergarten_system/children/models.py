@@ -1,6 +1,31 @@
 from django.db import models
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 
+
+class ChildQuerySet(models.QuerySet):
+    """
+    幼儿查询集
+    """
+    def with_list_data(self):
+        """
+        一次查询取出序列化所需的数据：班级和幼儿园联表读取，选区记录数以子查询注解统计
+
+        子查询不产生 GROUP BY，默认排序保持有效。注解字段为 selection_records_count
+        """
+        from selections.models import SelectionRecord
+
+        count_subquery = SelectionRecord.objects.filter(
+            child=models.OuterRef('pk')
+        ).order_by().values('child').annotate(
+            count=models.Count('id')
+        ).values('count')
+        return self.select_related('class_info__kindergarten').annotate(
+            selection_records_count=Coalesce(
+                models.Subquery(count_subquery, output_field=models.IntegerField()), 0
+            )
+        )
+
 # 幼儿模型
 class Child(models.Model):
     """
@@ -132,10 +157,18 @@ class Child(models.Model):
         auto_now=True
     )
     
+    objects = ChildQuerySet.as_manager()
+    
     class Meta:
         verbose_name = '幼儿'
         verbose_name_plural = '幼儿管理'
         ordering = ['-created_at']
+        indexes = [
+            # 按班级统计在读幼儿
+            models.Index(fields=['class_info', 'is_active'], name='child_class_active_idx'),
+            # 列表默认排序及游标分页
+            models.Index(fields=['created_at', 'id'], name='child_created_idx'),
+        ]
     
     def __str__(self):
         if self.class_info:
@@ -143,12 +176,12 @@ class Child(models.Model):
         return self.name
     
     # 计算年龄
-    def get_age(self):
+    def get_age(self, today=None):
         """
-        计算幼儿当前年龄
+        计算幼儿当前年龄，批量计算时可传入当天日期避免逐行取时间
         """
         if self.birth_date:
-            today = timezone.now().date()
+            today = today or timezone.now().date()
             age = today.year - self.birth_date.year
             # 如果还没过生日，年龄减1
             if today.month < self.birth_date.month or (
@@ -170,7 +203,9 @@ class Child(models.Model):
     # 获取幼儿的选区记录数
     def get_selection_count(self):
         """
-        获取幼儿的选区记录数
+        获取幼儿的选区记录数，查询集已注解时直接使用注解值
         """
+        if hasattr(self, 'selection_records_count'):
+            return self.selection_records_count
         from selections.models import SelectionRecord
         return SelectionRecord.objects.filter(child=self).count()
@@ -10,7 +10,7 @@ class ChildSerializer(serializers.ModelSerializer):
     # 关联字段
     class_info = ClassBriefSerializer(read_only=True)
     class_id = serializers.IntegerField(write_only=True, required=False)
-    kindergarten = KindergartenBriefSerializer(read_only=True)
+    kindergarten = KindergartenBriefSerializer(source='class_info.kindergarten', read_only=True, allow_null=True)
     
     # 动态计算字段
     age = serializers.SerializerMethodField(read_only=True)
@@ -40,7 +40,10 @@ class ChildSerializer(serializers.ModelSerializer):
         """
         获取幼儿年龄
         """
-        return obj.get_age()
+        # 列表序列化时所有行共用同一个当天日期
+        if not hasattr(self, '_today'):
+            self._today = timezone.now().date()
+        return obj.get_age(self._today)
     
     def get_selection_count(self, obj):
         """
@@ -173,6 +176,7 @@ class ChildImportSerializer(serializers.Serializer):
     幼儿批量导入序列化器
     """
     file = serializers.FileField(required=True)
+    dry_run = serializers.BooleanField(required=False, default=False)
     
     def validate_file(self, value):
         """
@@ -0,0 +1,83 @@
+import calendar
+from datetime import date
+from django.db.models import Count, Q
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+
+# 年龄段划分，左闭右开
+AGE_RANGES = ((0, 3), (3, 4), (4, 5), (5, 6), (6, 10))
+
+
+def _birth_date_cutoff(today, age):
+    """
+    满指定周岁的最晚出生日期
+
+    出生日期不晚于该日期时，按 Child.get_age 的算法年龄不小于 age。
+    当天为2月29日而目标年份不是闰年时取2月28日。
+    """
+    year = today.year - age
+    day = min(today.day, calendar.monthrange(year, today.month)[1])
+    return date(year, today.month, day)
+
+
+def age_bucket_filters(today=None):
+    """
+    将年龄段转换为出生日期区间条件
+
+    年龄落在 [min_age, max_age) 等价于出生日期落在
+    (满 max_age 周岁的最晚出生日期, 满 min_age 周岁的最晚出生日期]，
+    因此年龄分布可以在数据库中一次聚合完成。
+
+    Returns:
+        list: (年龄段名称, 过滤条件) 列表
+    """
+    today = today or timezone.now().date()
+    return [
+        (
+            f'{min_age}-{max_age}岁',
+            Q(birth_date__lte=_birth_date_cutoff(today, min_age), birth_date__gt=_birth_date_cutoff(today, max_age))
+        )
+        for min_age, max_age in AGE_RANGES
+    ]
+
+
+def build_child_stats(queryset, today=None):
+    """
+    计算幼儿统计数据
+
+    无论幼儿数量多少，都只执行固定的4条查询：
+    汇总计数（含各年龄段）、性别分组、班级分组、按月入园分组。
+
+    Args:
+        queryset: 已按用户数据范围过滤的幼儿查询集
+        today: 计算年龄使用的日期，默认为当天
+    """
+    buckets = age_bucket_filters(today)
+    totals = queryset.aggregate(
+        total_count=Count('id'),
+        active_count=Count('id', filter=Q(is_active=True)),
+        **{f'age_{index}': Count('id', filter=condition) for index, (_, condition) in enumerate(buckets)}
+    )
+
+    # 去掉默认排序，避免排序字段进入分组
+    grouped = queryset.order_by()
+    gender_stats = grouped.values('gender').annotate(count=Count('id'))
+    class_stats = grouped.values('class_info__name', 'class_info__id').annotate(count=Count('id'))
+    admission_stats = grouped.filter(admission_date__isnull=False).annotate(
+        month=TruncMonth('admission_date')
+    ).values('month').annotate(count=Count('id')).order_by('month')
+
+    return {
+        'total_count': totals['total_count'],
+        'active_count': totals['active_count'],
+        'inactive_count': totals['total_count'] - totals['active_count'],
+        'gender_stats': {item['gender']: item['count'] for item in gender_stats},
+        'class_stats': list(class_stats),
+        'age_stats': [
+            {'range': name, 'count': totals[f'age_{index}']} for index, (name, _) in enumerate(buckets)
+        ],
+        'admission_stats': [
+            {'month': item['month'].strftime('%Y-%m'), 'count': item['count']} for item in admission_stats
+        ],
+    }
@@ -0,0 +1,147 @@
+from datetime import datetime
+from django.http import HttpResponse
+from rest_framework import status
+from rest_framework.response import Response
+import pandas as pd
+from .models import Child
+from .importers import ChildImporter, REQUIRED_COLUMNS
+from .serializers import ChildSerializer, ChildImportSerializer, ChildFilterSerializer
+from users.scope import UserScope
+from search.index import search_filter
+from jobs.registry import register_task
+
+
+@register_task('children.import_data')
+def import_children(user, params, upload):
+    """
+    批量导入幼儿数据，传入 dry_run=true 时只校验不写入
+    """
+    data = params.copy()
+    data['file'] = upload
+    serializer = ChildImportSerializer(data=data)
+    serializer.is_valid(raise_exception=True)
+    
+    # 试运行只校验数据和统计结果，不写入数据库
+    dry_run = serializer.validated_data['dry_run']
+    
+    try:
+        # 读取Excel文件
+        df = pd.read_excel(upload)
+        
+        # 检查必要的列
+        missing_columns = [col for col in REQUIRED_COLUMNS if col not in df.columns]
+        if missing_columns:
+            return Response(
+                {'error': f'缺少必要的列: {missing_columns}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        # 整列规范化、批量解析班级并按学号批量写入，出错的行跳过并记录行号
+        result = ChildImporter(user, dry_run=dry_run).run(df)
+        
+        if result['errors']:
+            return Response(result, status=status.HTTP_207_MULTI_STATUS)
+        elif dry_run:
+            return Response(result, status=status.HTTP_200_OK)
+        else:
+            return Response(result, status=status.HTTP_201_CREATED)
+            
+    except Exception as e:
+        return Response(
+            {'error': f'导入失败: {str(e)}'},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+
+@register_task('children.export_template')
+def export_child_template(user, params, upload):
+    """
+    导出幼儿数据导入模板
+    """
+    # 创建模板数据
+    template_data = {
+        '幼儿姓名(*)': ['张三', '李四'],
+        '性别(*)': ['男', '女'],
+        '出生日期(*)': ['2020-01-01', '2020-02-02'],
+        '班级名称(*)': ['大一班', '小一班'],
+        '学号': ['', ''],
+        '入园日期': ['2023-09-01', '2023-09-01'],
+        '家长姓名': ['张三爸爸', '李四妈妈'],
+        '家长手机号': ['13800138001', '13900139002'],
+        '家长邮箱': ['', ''],
+        '家庭地址': ['北京市朝阳区XX小区', '上海市浦东新区XX路'],
+        '健康备注': ['无', '对海鲜过敏'],
+        '头像URL': ['', ''],  # 头像URL列
+        '备注': ['', '']
+    }
+    
+    df = pd.DataFrame(template_data)
+    
+    # 创建响应
+    response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+    response['Content-Disposition'] = f'attachment; filename=child_template_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
+    
+    # 保存到响应
+    with pd.ExcelWriter(response, engine='openpyxl') as writer:
+        df.to_excel(writer, index=False, sheet_name='幼儿信息')
+    
+    return response
+
+
+@register_task('children.export_data')
+def export_children(user, params, upload):
+    """
+    导出幼儿数据
+    """
+    # 应用筛选条件
+    filter_serializer = ChildFilterSerializer(data=params)
+    filter_serializer.is_valid(raise_exception=True)
+    filter_params = filter_serializer.validated_data
+    
+    # 一次取出班级、幼儿园和选区记录数，并按用户的数据范围过滤
+    queryset = UserScope(user).filter(
+        Child.objects.with_list_data(), 'class_info__kindergarten_id', 'class_info_id'
+    )
+    
+    # 应用筛选条件
+    if filter_params.get('name'):
+        queryset = search_filter(queryset, 'child', filter_params['name'], fields=['name'])
+    if filter_params.get('class_id'):
+        queryset = queryset.filter(class_info_id=filter_params['class_id'])
+    # 其他筛选条件...
+    
+    # 获取数据
+    children = list(queryset)
+    serializer = ChildSerializer(children, many=True)
+    data = serializer.data
+    
+    # 转换为导出格式，序列化结果不含在读状态，从模型读取
+    export_data = []
+    for child, item in zip(children, data):
+        export_data.append({
+            '幼儿ID': item['id'],
+            '幼儿姓名': item['name'],
+            '性别': '男' if item['gender'] == 'male' else '女',
+            '出生日期': item['birth_date'],
+            '年龄': item['age'],
+            '班级': item['class_info']['name'] if item['class_info'] else '',
+            '学号': item['student_id'] or '',
+            '入园日期': item['admission_date'],
+            '家长姓名': item['parent_name'],
+            '家长手机号': item['parent_phone'],
+            '家庭地址': item['home_address'] or '',
+            '状态': '在读' if child.is_active else '已毕业',
+            '创建时间': item['created_at']
+        })
+    
+    df = pd.DataFrame(export_data)
+    
+    # 创建响应
+    response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+    response['Content-Disposition'] = f'attachment; filename=children_export_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
+    
+    # 保存到响应
+    with pd.ExcelWriter(response, engine='openpyxl') as writer:
+        df.to_excel(writer, index=False, sheet_name='幼儿信息')
+    
+    return response
@@ -1,3 +1,317 @@
+from datetime import timedelta
+from io import BytesIO
+import pandas as pd
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from common.query_plan import QueryPlanAssertionsMixin
+from kindergartens.models import Kindergarten
+from classes.models import Class
+from users.models import User
+from .models import Child
+from .stats import AGE_RANGES, _birth_date_cutoff
 
-# Create your tests here.
+
+class ChildImportTests(TestCase):
+    """
+    幼儿批量导入接口测试
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.kindergarten = Kindergarten.objects.create(name='阳光幼儿园')
+        cls.other_kindergarten = Kindergarten.objects.create(name='星星幼儿园')
+        cls.class_a = Class.objects.create(name='大一班', kindergarten=cls.kindergarten)
+        cls.class_b = Class.objects.create(name='小一班', kindergarten=cls.kindergarten)
+        Class.objects.create(name='中一班', kindergarten=cls.other_kindergarten)
+        cls.existing = Child.objects.create(
+            name='旧名字', class_info=cls.class_b, student_id='2023001', notes='保留的备注'
+        )
+        cls.owner = User.objects.create_user(username='owner', password='pass', role='owner')
+        cls.principal = User.objects.create_user(
+            username='principal', password='pass', role='principal', kindergarten=cls.kindergarten
+        )
+
+    def make_file(self, rows):
+        columns = ['幼儿姓名(*)', '性别(*)', '出生日期(*)', '班级名称(*)', '学号', '家长姓名', '家长手机号', '备注']
+        output = BytesIO()
+        pd.DataFrame(rows, columns=columns).to_excel(output, index=False)
+        return SimpleUploadedFile('children.xlsx', output.getvalue())
+
+    def post(self, user, rows, **extra):
+        client = APIClient()
+        client.force_authenticate(user=user)
+        data = {'file': self.make_file(rows), **extra}
+        return client.post('/api/children/import_data/', data, format='multipart')
+
+    def test_upsert_by_student_id(self):
+        response = self.post(self.principal, [
+            ['张三', '男', '2020-01-01', '大一班', 2023001, '张爸爸', 13800138001, None],
+            ['李四', '女', '2020/02/02', '小一班', None, '李妈妈', '139-0013-9002', '新生'],
+        ])
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual((response.data['created_count'], response.data['updated_count']), (1, 1))
+
+        self.existing.refresh_from_db()
+        self.assertEqual(self.existing.name, '张三')
+        self.assertEqual(self.existing.class_info, self.class_a)
+        self.assertEqual(self.existing.parent_phone, '13800138001')
+        # 空的可选列不覆盖原值
+        self.assertEqual(self.existing.notes, '保留的备注')
+
+        created = Child.objects.get(name='李四')
+        self.assertEqual(created.gender, 'female')
+        self.assertEqual(created.parent_phone, '13900139002')
+        self.assertEqual(str(created.birth_date), '2020-02-02')
+
+    def test_bad_rows_are_reported_with_row_numbers(self):
+        response = self.post(self.principal, [
+            ['张三', '男', '2020-01-01', '大一班', None, '', '', None],
+            ['李四', '女', '2020-01-01', '中一班', None, '', '', None],
+            ['王五', '男', '不是日期', '大一班', None, '', '', None],
+            ['赵六', '男', '2020-01-01', '大一班', 'A1', '', '', None],
+            ['钱七', '男', '2020-01-01', '大一班', 'A1', '', '', None],
+        ])
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual(response.data['created_count'], 2)
+        self.assertEqual(response.data['errors'], [
+            "第3行: 班级 '中一班' 在您的幼儿园中不存在",
+            '第4行: 出生日期格式不正确',
+            '第6行: 学号在导入文件中重复',
+        ])
+        self.assertTrue(Child.objects.filter(name='赵六', student_id='A1').exists())
+
+    def test_student_id_of_other_kindergarten_is_rejected(self):
+        other_class = Class.objects.get(name='中一班')
+        other = Child.objects.create(
+            name='别园幼儿', class_info=other_class, student_id='9001', parent_phone='13700000000'
+        )
+        response = self.post(self.principal, [
+            ['张三', '男', '2020-01-01', '大一班', 9001, '张爸爸', 13800138001, None],
+            ['李四', '女', '2020-01-01', '大一班', None, '', '', None],
+        ])
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual(response.data['errors'], ["第2行: 学号 '9001' 已被其他幼儿园的幼儿使用"])
+        self.assertEqual((response.data['created_count'], response.data['updated_count']), (1, 0))
+        other.refresh_from_db()
+        self.assertEqual(
+            (other.name, other.class_info, other.parent_phone), ('别园幼儿', other_class, '13700000000')
+        )
+
+    def test_invalid_avatar_keeps_row(self):
+        columns = ['幼儿姓名(*)', '性别(*)', '出生日期(*)', '班级名称(*)', '家长姓名', '家长手机号', '头像URL']
+        output = BytesIO()
+        pd.DataFrame([
+            ['张三', '男', '2020-01-01', '大一班', '', '', 'file:///不存在/头像.png'],
+            ['李四', '女', '2020-01-01', '大一班', '', '', 'http://example.com/a.png'],
+        ], columns=columns).to_excel(output, index=False)
+        client = APIClient()
+        client.force_authenticate(user=self.principal)
+        response = client.post(
+            '/api/children/import_data/', {'file': SimpleUploadedFile('children.xlsx', output.getvalue())},
+            format='multipart'
+        )
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual(response.data['created_count'], 2)
+        self.assertEqual(len(response.data['errors']), 2)
+        self.assertEqual(Child.objects.filter(name__in=['张三', '李四']).count(), 2)
+
+    def test_owner_needs_kindergarten_name(self):
+        response = self.post(self.owner, [['张三', '男', '2020-01-01', '大一班', None, '', '', None]])
+        self.assertEqual(response.data['errors'], ['第2行: 系统管理员需要提供幼儿园名称'])
+
+    def test_dry_run_does_not_write(self):
+        rows = [[f'幼儿{i}', '男', '2020-01-01', '大一班', f'S{i}', '', '', None] for i in range(50)]
+        response = self.post(self.principal, rows, dry_run='true')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data['dry_run'])
+        self.assertEqual(response.data['created_count'], 50)
+        self.assertFalse(Child.objects.filter(student_id__startswith='S').exists())
+
+    def test_query_count_does_not_grow_with_rows(self):
+        rows = [[f'幼儿{i}', '男', '2020-01-01', '大一班', f'S{i}', '', '', None] for i in range(200)]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.post(self.principal, rows)
+        # 读取只有加载班级和按学号匹配已有幼儿两条查询，写入按批次执行
+        selects = [query for query in queries.captured_queries if query['sql'].startswith('SELECT')]
+        self.assertEqual(len(selects), 2)
+        self.assertEqual(response.data['created_count'], 200)
+        self.assertEqual(Child.objects.filter(student_id__startswith='S').count(), 200)
+
+
+class ChildListQueryBudgetTests(TestCase):
+    """
+    幼儿列表接口查询次数测试
+    """
+    # 列表接口固定执行的查询次数：总数统计、当前页数据
+    LIST_QUERY_BUDGET = 2
+
+    @classmethod
+    def setUpTestData(cls):
+        from selections.models import SelectionArea, SelectionRecord
+
+        cls.kindergarten = Kindergarten.objects.create(name='阳光幼儿园')
+        cls.class_a = Class.objects.create(name='大一班', kindergarten=cls.kindergarten)
+        cls.area = SelectionArea.objects.create(name='建构区', class_info=cls.class_a)
+        cls.child = Child.objects.create(name='张三', class_info=cls.class_a, birth_date='2020-01-01')
+        SelectionRecord.objects.create(child=cls.child, selection_area=cls.area, date='2024-09-01')
+        SelectionRecord.objects.create(child=cls.child, selection_area=cls.area, date='2024-09-02')
+        Child.objects.create(name='无班级')
+        cls.principal = User.objects.create_user(
+            username='principal', password='pass', role='principal', kindergarten=cls.kindergarten
+        )
+        cls.owner = User.objects.create_user(username='owner', password='pass', role='owner')
+
+    def get_list(self, user, page_size):
+        client = APIClient()
+        client.force_authenticate(user=user)
+        with self.assertNumQueries(self.LIST_QUERY_BUDGET):
+            response = client.get('/api/children/', {'page_size': page_size})
+        self.assertEqual(response.status_code, 200)
+        return response.data['results']
+
+    def test_query_budget_does_not_grow_with_page_size(self):
+        self.get_list(self.principal, 10)
+        Child.objects.bulk_create([
+            Child(name=f'幼儿{i}', class_info=self.class_a, birth_date='2021-06-01') for i in range(50)
+        ])
+        self.assertEqual(len(self.get_list(self.principal, 100)), 51)
+
+    def test_list_fields(self):
+        items = {item['name']: item for item in self.get_list(self.owner, 10)}
+        child = items['张三']
+        self.assertEqual(child['selection_count'], 2)
+        self.assertEqual(child['class_name'], '大一班')
+        self.assertEqual(child['kindergarten']['name'], '阳光幼儿园')
+        self.assertIsNotNone(child['age'])
+        self.assertIsNone(items['无班级']['kindergarten'])
+        self.assertEqual(items['无班级']['selection_count'], 0)
+
+
+class ChildStatisticsTests(TestCase):
+    """
+    幼儿统计接口测试
+    """
+    # 统计接口固定执行的查询次数
+    STATS_QUERY_BUDGET = 4
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.kindergarten = Kindergarten.objects.create(name='阳光幼儿园')
+        cls.class_a = Class.objects.create(name='大一班', kindergarten=cls.kindergarten)
+        cls.owner = User.objects.create_user(username='owner', password='pass', role='owner')
+
+    def get_stats(self):
+        client = APIClient()
+        client.force_authenticate(user=self.owner)
+        with self.assertNumQueries(self.STATS_QUERY_BUDGET):
+            response = client.get('/api/children/statistics/')
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_age_buckets_match_get_age(self):
+        today = timezone.now().date()
+        birth_dates = [today - timedelta(days=days) for days in range(0, 10 * 366, 37)]
+        # 生日边界：恰好满3周岁和差一天满3周岁
+        boundary = _birth_date_cutoff(today, 3)
+        birth_dates += [boundary, boundary + timedelta(days=1)]
+        Child.objects.bulk_create([
+            Child(name=f'幼儿{i}', class_info=self.class_a, birth_date=birth_date)
+            for i, birth_date in enumerate(birth_dates)
+        ])
+        Child.objects.create(name='无生日', class_info=self.class_a)
+
+        expected = {}
+        for child in Child.objects.all():
+            age = child.get_age()
+            for min_age, max_age in AGE_RANGES:
+                if age is not None and min_age <= age < max_age:
+                    key = f'{min_age}-{max_age}岁'
+                    expected[key] = expected.get(key, 0) + 1
+
+        data = self.get_stats()
+        self.assertEqual({item['range']: item['count'] for item in data['age_stats'] if item['count']}, expected)
+        self.assertEqual(data['total_count'], len(birth_dates) + 1)
+
+    def test_admission_by_month(self):
+        Child.objects.create(name='张三', class_info=self.class_a, admission_date='2024-09-01')
+        Child.objects.create(name='李四', class_info=self.class_a, admission_date='2024-09-15')
+        Child.objects.create(name='王五', class_info=self.class_a, admission_date='2025-02-20')
+        Child.objects.create(name='赵六', class_info=self.class_a)
+
+        data = self.get_stats()
+        self.assertEqual(data['admission_stats'], [
+            {'month': '2024-09', 'count': 2},
+            {'month': '2025-02', 'count': 1},
+        ])
+        self.assertEqual(data['gender_stats'], {'male': 4})
+        self.assertEqual(list(data['class_stats']), [
+            {'class_info__name': '大一班', 'class_info__id': self.class_a.id, 'count': 4}
+        ])
+
+
+class ChildExportTests(TestCase):
+    """
+    幼儿数据导出接口测试
+    """
+    def test_export_status_column(self):
+        kindergarten = Kindergarten.objects.create(name='阳光幼儿园')
+        class_a = Class.objects.create(name='大一班', kindergarten=kindergarten)
+        Child.objects.create(name='张三', class_info=class_a)
+        Child.objects.create(name='李四', class_info=class_a, is_active=False)
+        client = APIClient()
+        client.force_authenticate(user=User.objects.create_user(username='owner', password='pass', role='owner'))
+
+        response = client.get('/api/children/export_data/')
+        self.assertEqual(response.status_code, 200)
+        df = pd.read_excel(BytesIO(response.content))
+        self.assertEqual(dict(zip(df['幼儿姓名'], df['状态'])), {'张三': '在读', '李四': '已毕业'})
+
+
+class ChildQueryPlanTests(QueryPlanAssertionsMixin, TestCase):
+    """
+    幼儿热点查询执行计划测试
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.kindergarten = Kindergarten.objects.create(name='阳光幼儿园')
+        cls.class_a = Class.objects.create(name='大一班', kindergarten=cls.kindergarten)
+        Child.objects.bulk_create([Child(name=f'幼儿{i}', class_info=cls.class_a) for i in range(20)])
+
+    def test_class_and_kindergarten_filters_use_index(self):
+        self.assertNoFullScan(Child.objects.filter(class_info_id=self.class_a.id, is_active=True))
+        self.assertNoFullScan(
+            Child.objects.filter(class_info__kindergarten_id=self.kindergarten.id, is_active=True)
+        )
+
+
+class ChildKeysetPaginationTests(TestCase):
+    """
+    幼儿列表游标分页测试
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.kindergarten = Kindergarten.objects.create(name='阳光幼儿园')
+        cls.class_a = Class.objects.create(name='大一班', kindergarten=cls.kindergarten)
+        created_at = timezone.now()
+        # 创建时间相同的幼儿依靠ID区分先后
+        Child.objects.bulk_create([
+            Child(name=f'幼儿{i}', class_info=cls.class_a, created_at=created_at) for i in range(12)
+        ])
+        cls.owner = User.objects.create_user(username='owner', password='pass', role='owner')
+
+    def test_walks_all_children(self):
+        client = APIClient()
+        client.force_authenticate(user=self.owner)
+        seen = []
+        params = {'pagination': 'cursor', 'page_size': 5}
+        while True:
+            with self.assertNumQueries(1):
+                response = client.get('/api/children/', params)
+            seen.extend(item['id'] for item in response.data['results'])
+            if not response.data['next_cursor']:
+                break
+            params = {'cursor': response.data['next_cursor'], 'page_size': 5}
+        self.assertEqual(seen, list(Child.objects.order_by('-created_at', '-id').values_list('id', flat=True)))
@@ -0,0 +1,140 @@
+from datetime import datetime
+from django.http import HttpResponse
+from rest_framework import status
+from rest_framework.response import Response
+import pandas as pd
+from .models import Class
+from .serializers import ClassImportSerializer
+from jobs.registry import register_task
+
+
+@register_task('classes.import_data')
+def import_classes(user, params, upload):
+    """
+    批量导入班级数据
+    """
+    data = params.copy()
+    data['file'] = upload
+    serializer = ClassImportSerializer(data=data)
+    serializer.is_valid(raise_exception=True)
+    
+    
+    try:
+        # 读取Excel文件
+        df = pd.read_excel(upload)
+        
+        # 检查必要的列
+        required_columns = ['班级名称(*)', '班级类型(*)']
+        if user.role == 'system_owner':
+            required_columns.append('幼儿园名称(*)')
+        
+        missing_columns = [col for col in required_columns if col not in df.columns]
+        if missing_columns:
+            return Response(
+                {'error': f'缺少必要的列: {missing_columns}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        created_count = 0
+        errors = []
+        
+        # 处理每一行数据
+        for index, row in df.iterrows():
+            try:
+                # 确定幼儿园ID
+                if user.role == 'system_owner':
+                    if '幼儿园名称(*)' not in row or pd.isna(row['幼儿园名称(*)']):
+                        errors.append(f"第{index+2}行: 幼儿园名称不能为空")
+                        continue
+                    from kindergartens.models import Kindergarten
+                    try:
+                        kindergarten = Kindergarten.objects.get(name=row['幼儿园名称(*)'])
+                        kindergarten_id = kindergarten.id
+                    except Kindergarten.DoesNotExist:
+                        errors.append(f"第{index+2}行: 幼儿园 '{row['幼儿园名称(*)']}' 不存在")
+                        continue
+                else:
+                    # 对于教师用户，从关联的教师记录中获取幼儿园信息
+                    if user.role == 'teacher' and hasattr(user, 'teacher') and user.teacher:
+                        kindergarten_id = user.teacher.kindergarten.id
+                    else:
+                        kindergarten_id = user.kindergarten.id
+                
+                # 检查班级是否已存在
+                if Class.objects.filter(name=row['班级名称(*)'], kindergarten_id=kindergarten_id).exists():
+                    errors.append(f"第{index+2}行: 班级 '{row['班级名称(*)']}' 已存在")
+                    continue
+                
+                # 转换类型
+                class_type_map = {
+                    '托儿所': 'nursery',
+                    '小班': 'small',
+                    '中班': 'middle',
+                    '大班': 'large',
+                    '学前班': 'pre_school'
+                }
+                class_type = class_type_map.get(row['班级类型(*)'], 'small')
+                
+                # 创建班级
+                class_data = {
+                    'name': row['班级名称(*)'],
+                    'class_type': class_type,
+                    'kindergarten_id': kindergarten_id
+                }
+                
+                # 处理可选字段
+                if '班级描述' in row and pd.notna(row['班级描述']):
+                    class_data['description'] = row['班级描述']
+                
+                Class.objects.create(**class_data)
+                created_count += 1
+                
+            except Exception as e:
+                errors.append(f"第{index+2}行: {str(e)}")
+        
+        result = {
+            'created_count': created_count,
+            'total_rows': len(df),
+            'errors': errors
+        }
+        
+        if errors:
+            return Response(result, status=status.HTTP_207_MULTI_STATUS)
+        else:
+            return Response(result, status=status.HTTP_201_CREATED)
+            
+    except Exception as e:
+        return Response(
+            {'error': f'导入失败: {str(e)}'},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+
+@register_task('classes.export_template')
+def export_class_template(user, params, upload):
+    """
+    导出班级数据导入模板
+    """
+    
+    # 创建模板数据
+    template_data = {
+        '班级名称(*)': ['大一班', '小一班'],
+        '班级类型(*)': ['大班', '小班'],  # 可选值：托儿所、小班、中班、大班、学前班
+        '班级描述': ['大班教室', '小班教室']  # 可选
+    }
+    
+    # 只有系统所有者需要选择幼儿园
+    if user.role == 'system_owner':
+        template_data['幼儿园名称(*)'] = ['幼儿园A', '幼儿园B']  # 示例名称
+    
+    df = pd.DataFrame(template_data)
+    
+    # 创建响应
+    response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+    response['Content-Disposition'] = f'attachment; filename=class_template_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
+    
+    # 保存到响应
+    with pd.ExcelWriter(response, engine='openpyxl') as writer:
+        df.to_excel(writer, index=False, sheet_name='班级信息')
+    
+    return response
@@ -1,3 +1,64 @@
+from django.core.cache import cache
 from django.test import TestCase
+from rest_framework.test import APIClient
+from kindergartens.models import Kindergarten
+from teachers.models import Teacher
+from users.models import User
+from users.serializers import CustomTokenObtainPairSerializer
+from .models import Class
 
-# Create your tests here.
+
+class ClassOptionsTests(TestCase):
+    """
+    班级选项列表（异步视图）测试
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.kindergarten = Kindergarten.objects.create(name='阳光幼儿园')
+        other_kindergarten = Kindergarten.objects.create(name='星星幼儿园')
+        cls.class_a = Class.objects.create(name='大一班', kindergarten=cls.kindergarten)
+        cls.class_b = Class.objects.create(name='小一班', kindergarten=cls.kindergarten)
+        Class.objects.create(name='中一班', kindergarten=other_kindergarten)
+        teacher = Teacher.objects.create(name='王老师', kindergarten=cls.kindergarten)
+        teacher.classes.add(cls.class_a)
+        cls.principal = User.objects.create_user(
+            username='principal', password='pass', role='principal', kindergarten=cls.kindergarten
+        )
+        cls.teacher_user = User.objects.create_user(
+            username='teacher', password='pass', role='teacher', kindergarten=cls.kindergarten, teacher=teacher
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def get_options(self, user, **headers):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {CustomTokenObtainPairSerializer.get_token(user).access_token}')
+        return client.get('/api/classes/options/', **headers)
+
+    def test_options_follow_user_scope(self):
+        response = self.get_options(self.principal)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual({item['id'] for item in response.json()}, {self.class_a.id, self.class_b.id})
+
+        response = self.get_options(self.teacher_user)
+        self.assertEqual([item['id'] for item in response.json()], [self.class_a.id])
+
+    def test_requires_authentication(self):
+        self.assertEqual(APIClient().get('/api/classes/options/').status_code, 401)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION='Bearer invalid')
+        self.assertEqual(client.get('/api/classes/options/').status_code, 401)
+        self.assertEqual(APIClient().post('/api/classes/options/').status_code, 405)
+
+    def test_unchanged_options_return_not_modified(self):
+        etag = self.get_options(self.principal)['ETag']
+        response = self.get_options(self.principal, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        # 班级变化后缓存失效
+        self.class_b.name = '小二班'
+        self.class_b.save()
+        response = self.get_options(self.principal, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('小二班', [item['name'] for item in response.json()])
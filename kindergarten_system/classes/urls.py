@@ -1,10 +1,12 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import ClassViewSet
+from .views import ClassViewSet, class_options
 
 router = DefaultRouter()
 router.register(r'', ClassViewSet, basename='class')
 
 urlpatterns = [
+    # 异步的选项列表接口，需在视图集路由之前匹配
+    path('options/', class_options, name='class-options'),
     path('', include(router.urls)),
 ]
\ No newline at end of file
@@ -7,8 +7,7 @@ from django_filters.rest_framework import DjangoFilterBackend
 from .models import Class
 from .serializers import (
     ClassSerializer,
-    ClassBriefSerializer,
-    ClassImportSerializer
+    ClassBriefSerializer
 )
 from users.permissions import (
     IsSystemOwner,
@@ -16,8 +15,42 @@ from users.permissions import (
     ClassDataPermission,
     TeacherDataPermission
 )
-import pandas as pd
-from datetime import datetime
+from users.scope import get_user_scope
+from common.async_views import async_api_view, json_response
+from common.cache import cached_response
+from jobs.registry import run_task
+
+def filter_classes(queryset, scope, params):
+    """
+    按用户数据范围和查询参数（name、class_type）过滤班级
+    """
+    # 系统所有者返回所有班级，园长返回自己幼儿园的班级，教师返回自己负责的班级
+    queryset = scope.filter(queryset, 'kindergarten_id', 'id')
+    
+    # 获取查询参数
+    name = params.get('name', None)
+    class_type = params.get('class_type', None)
+    
+    # 根据参数进行过滤
+    if name:
+        queryset = queryset.filter(name__icontains=name)
+        
+    if class_type:
+        queryset = queryset.filter(class_type=class_type)
+        
+    return queryset
+
+
+@async_api_view(permission_classes=[IsKindergartenOwnerOrSystemOwner])
+@cached_response(depends_on=('classes.Class',))
+async def class_options(request):
+    """
+    获取班级选项列表（用于下拉选择，异步）
+    """
+    queryset = filter_classes(Class.objects.all(), get_user_scope(request), request.GET)
+    serializer = ClassBriefSerializer([class_obj async for class_obj in queryset], many=True)
+    return json_response(serializer.data)
+
 
 class ClassViewSet(viewsets.ModelViewSet):
     queryset = Class.objects.all()
@@ -31,33 +64,7 @@ class ClassViewSet(viewsets.ModelViewSet):
         """
         根据用户角色过滤查询集
         """
-        queryset = super().get_queryset()
-        user = self.request.user
-        
-        # 如果是系统所有者，返回所有班级
-        if hasattr(user, 'role') and user.role == 'owner':
-            pass  # 不进行额外过滤
-        # 如果是园长，返回自己幼儿园的班级
-        elif hasattr(user, 'role') and user.role == 'principal' and user.kindergarten:
-            queryset = queryset.filter(kindergarten=user.kindergarten)
-        # 如果是教师，返回自己负责的班级
-        elif hasattr(user, 'role') and user.role == 'teacher' and user.teacher:
-            queryset = queryset.filter(id__in=user.teacher.classes.values_list('id', flat=True))
-        else:
-            queryset = queryset.none()
-        
-        # 获取查询参数
-        name = self.request.query_params.get('name', None)
-        class_type = self.request.query_params.get('class_type', None)
-        
-        # 根据参数进行过滤
-        if name:
-            queryset = queryset.filter(name__icontains=name)
-            
-        if class_type:
-            queryset = queryset.filter(class_type=class_type)
-            
-        return queryset
+        return filter_classes(super().get_queryset(), get_user_scope(self.request), self.request.query_params)
 
     def get_permissions(self):
         """
@@ -81,8 +88,8 @@ class ClassViewSet(viewsets.ModelViewSet):
         elif self.action in ['import_data', 'export_template', 'update_student_counts']:
             # 导入导出和更新学生数量功能允许系统所有者和园长
             return [IsKindergartenOwnerOrSystemOwner()]
-        elif self.action in ['active', 'options', 'stats']:
-            # 获取激活状态的班级、选项列表和统计信息允许系统所有者、园长和教师
+        elif self.action in ['active', 'stats']:
+            # 获取激活状态的班级和统计信息允许系统所有者、园长和教师
             return [IsKindergartenOwnerOrSystemOwner()]
         return super().get_permissions()
     
@@ -120,132 +127,14 @@ class ClassViewSet(viewsets.ModelViewSet):
         """
         批量导入班级数据
         """
-        serializer = ClassImportSerializer(data=request.data)
-        serializer.is_valid(raise_exception=True)
-        
-        file = request.FILES['file']
-        user = request.user
-        
-        try:
-            # 读取Excel文件
-            df = pd.read_excel(file)
-            
-            # 检查必要的列
-            required_columns = ['班级名称(*)', '班级类型(*)']
-            if user.role == 'system_owner':
-                required_columns.append('幼儿园名称(*)')
-            
-            missing_columns = [col for col in required_columns if col not in df.columns]
-            if missing_columns:
-                return Response(
-                    {'error': f'缺少必要的列: {missing_columns}'},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-            
-            created_count = 0
-            errors = []
-            
-            # 处理每一行数据
-            for index, row in df.iterrows():
-                try:
-                    # 确定幼儿园ID
-                    if user.role == 'system_owner':
-                        if '幼儿园名称(*)' not in row or pd.isna(row['幼儿园名称(*)']):
-                            errors.append(f"第{index+2}行: 幼儿园名称不能为空")
-                            continue
-                        from kindergartens.models import Kindergarten
-                        try:
-                            kindergarten = Kindergarten.objects.get(name=row['幼儿园名称(*)'])
-                            kindergarten_id = kindergarten.id
-                        except Kindergarten.DoesNotExist:
-                            errors.append(f"第{index+2}行: 幼儿园 '{row['幼儿园名称(*)']}' 不存在")
-                            continue
-                    else:
-                        # 对于教师用户，从关联的教师记录中获取幼儿园信息
-                        if user.role == 'teacher' and hasattr(user, 'teacher') and user.teacher:
-                            kindergarten_id = user.teacher.kindergarten.id
-                        else:
-                            kindergarten_id = user.kindergarten.id
-                    
-                    # 检查班级是否已存在
-                    if Class.objects.filter(name=row['班级名称(*)'], kindergarten_id=kindergarten_id).exists():
-                        errors.append(f"第{index+2}行: 班级 '{row['班级名称(*)']}' 已存在")
-                        continue
-                    
-                    # 转换类型
-                    class_type_map = {
-                        '托儿所': 'nursery',
-                        '小班': 'small',
-                        '中班': 'middle',
-                        '大班': 'large',
-                        '学前班': 'pre_school'
-                    }
-                    class_type = class_type_map.get(row['班级类型(*)'], 'small')
-                    
-                    # 创建班级
-                    class_data = {
-                        'name': row['班级名称(*)'],
-                        'class_type': class_type,
-                        'kindergarten_id': kindergarten_id
-                    }
-                    
-                    # 处理可选字段
-                    if '班级描述' in row and pd.notna(row['班级描述']):
-                        class_data['description'] = row['班级描述']
-                    
-                    Class.objects.create(**class_data)
-                    created_count += 1
-                    
-                except Exception as e:
-                    errors.append(f"第{index+2}行: {str(e)}")
-            
-            result = {
-                'created_count': created_count,
-                'total_rows': len(df),
-                'errors': errors
-            }
-            
-            if errors:
-                return Response(result, status=status.HTTP_207_MULTI_STATUS)
-            else:
-                return Response(result, status=status.HTTP_201_CREATED)
-                
-        except Exception as e:
-            return Response(
-                {'error': f'导入失败: {str(e)}'},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
+        return run_task(request, 'classes.import_data')
     
     @action(detail=False, methods=['get'], permission_classes=[IsKindergartenOwnerOrSystemOwner])
     def export_template(self, request):
         """
         导出班级数据导入模板
         """
-        user = request.user
-        
-        # 创建模板数据
-        template_data = {
-            '班级名称(*)': ['大一班', '小一班'],
-            '班级类型(*)': ['大班', '小班'],  # 可选值：托儿所、小班、中班、大班、学前班
-            '班级描述': ['大班教室', '小班教室']  # 可选
-        }
-        
-        # 只有系统所有者需要选择幼儿园
-        if user.role == 'system_owner':
-            template_data['幼儿园名称(*)'] = ['幼儿园A', '幼儿园B']  # 示例名称
-        
-        df = pd.DataFrame(template_data)
-        
-        # 创建响应
-        from django.http import HttpResponse
-        response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-        response['Content-Disposition'] = f'attachment; filename=class_template_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
-        
-        # 保存到响应
-        with pd.ExcelWriter(response, engine='openpyxl') as writer:
-            df.to_excel(writer, index=False, sheet_name='班级信息')
-        
-        return response
+        return run_task(request, 'classes.export_template')
     
     @action(detail=False, methods=['post'], permission_classes=[IsKindergartenOwnerOrSystemOwner])
     def update_student_counts(self, request):
@@ -264,15 +153,6 @@ class ClassViewSet(viewsets.ModelViewSet):
             'message': f'成功更新了{updated_count}个班级的学生数量'
         })
     
-    @action(detail=False, methods=['get'], permission_classes=[IsKindergartenOwnerOrSystemOwner])
-    def options(self, request):
-        """
-        获取班级选项列表（用于下拉选择）
-        """
-        queryset = self.get_queryset()
-        serializer = ClassBriefSerializer(queryset, many=True)
-        return Response(serializer.data)
-    
     @action(detail=False, methods=['get'], permission_classes=[IsKindergartenOwnerOrSystemOwner])
     def stats(self, request):
         """
@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+
+
+class CommonConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'common'
+
+    def ready(self):
+        # 注册响应缓存失效信号
+        from .cache import connect_invalidation_signals
+        connect_invalidation_signals()
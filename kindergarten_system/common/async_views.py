@@ -0,0 +1,65 @@
+from functools import wraps
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from django.http import Http404, HttpResponseNotAllowed, JsonResponse
+from rest_framework import exceptions
+from rest_framework.utils.encoders import JSONEncoder
+from users.authentication import authenticate_request_token
+from users.scope import get_user_scope
+
+
+def json_response(data, status=200):
+    """
+    返回与 DRF JSONRenderer 输出一致的 JSON 响应
+    """
+    return JsonResponse(
+        data, status=status, safe=False, encoder=JSONEncoder, json_dumps_params={'ensure_ascii': False}
+    )
+
+
+def _error(exception):
+    return json_response({'detail': str(exception.default_detail)}, status=exception.status_code)
+
+
+def async_api_view(permission_classes=()):
+    """
+    只读异步接口装饰器，用于读多写少、需要在 ASGI 下并发处理的热点接口
+
+    DRF 视图不支持异步，这里按 DRF 的方式完成认证和权限检查：
+    只允许 GET，读取 Authorization 请求头中的 JWT，
+    请求头无效时返回401，权限检查不通过时未登录返回401、已登录返回403，Http404 返回 JSON 格式的404。
+    认证和教师数据范围的加载在线程中执行，视图内只使用异步 ORM。
+
+    Args:
+        permission_classes: DRF 权限类，只调用 has_permission
+    """
+    def decorator(func):
+        @wraps(func)
+        async def view(request, *args, **kwargs):
+            if request.method != 'GET':
+                return HttpResponseNotAllowed(['GET'])
+
+            def prepare():
+                user = authenticate_request_token(request, query_param=None)
+                if user is None and 'HTTP_AUTHORIZATION' in request.META:
+                    return exceptions.AuthenticationFailed
+                # 不能用 user or ...，对令牌用户代理取布尔值会加载完整的用户记录
+                request.user = AnonymousUser() if user is None else user
+                for permission_class in permission_classes:
+                    if not permission_class().has_permission(request, None):
+                        return exceptions.NotAuthenticated if user is None else exceptions.PermissionDenied
+                scope = get_user_scope(request)
+                # 教师的班级ID集合可能需要查询数据库，提前加载
+                if scope.is_teacher:
+                    scope.class_ids
+                return None
+
+            error = await sync_to_async(prepare)()
+            if error is not None:
+                return _error(error)
+            try:
+                return await func(request, *args, **kwargs)
+            except Http404:
+                return _error(exceptions.NotFound)
+        return view
+    return decorator
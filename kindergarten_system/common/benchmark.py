@@ -0,0 +1,292 @@
+import io
+import statistics
+import time
+import tracemalloc
+from itertools import count
+import pandas as pd
+from django.core.cache import caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, transaction
+from rest_framework.test import APIClient
+from users.serializers import CustomTokenObtainPairSerializer
+
+
+# 以系统所有者身份请求的接口使用该账号，不存在时自动创建
+BENCHMARK_OWNER = 'benchmark_owner'
+# 以园长身份请求的接口使用第一个种子幼儿园的园长账号
+BENCHMARK_PRINCIPAL = 'seed0001_principal'
+
+# 每次导入的行数，导入规模固定，只比较数据库规模增长对导入的影响
+IMPORT_ROWS = 50
+
+# 与基线比较时的默认容差：查询数不允许增加，耗时和内存超过基线的比例且超过绝对值时视为退化
+DEFAULT_TOLERANCE = 0.5
+LATENCY_FLOOR_MS = 20.0
+MEMORY_FLOOR_KIB = 512.0
+
+
+def _excel_upload(rows, filename='benchmark.xlsx'):
+    buffer = io.BytesIO()
+    pd.DataFrame(rows).to_excel(buffer, index=False)
+    return SimpleUploadedFile(
+        filename, buffer.getvalue(),
+        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    )
+
+
+def _children_rows(context, number):
+    return [{
+        '幼儿姓名(*)': f'导入幼儿{i + 1}',
+        '性别(*)': '男' if i % 2 else '女',
+        '出生日期(*)': '2022-03-01',
+        '班级名称(*)': context['class_name'],
+        '家长姓名': f'导入家长{i + 1}',
+        '家长手机号': f'137{number % 10000:04d}{i:04d}',
+    } for i in range(IMPORT_ROWS)]
+
+
+def _teacher_rows(context, number):
+    return [{
+        '姓名(*)': f'导入教师{i + 1}',
+        '性别(*)': '女',
+        '职位(*)': '配班老师',
+        '手机号码(*)': f'136{number % 10000:04d}{i:04d}',
+    } for i in range(IMPORT_ROWS)]
+
+
+def _class_rows(context, number):
+    return [{'班级名称(*)': f'导入{number}-{i + 1}班', '班级类型(*)': '中班'} for i in range(IMPORT_ROWS)]
+
+
+def _kindergarten_rows(context, number):
+    return [{
+        '名称': f'导入幼儿园{number}-{i + 1}',
+        '类型': '公立',
+        '地址': '测试路1号',
+        '联系人': '联系人',
+        '联系电话': '01012345678',
+        '园长': '园长',
+        '最大学生数': 300,
+        '最大教师数': 30,
+    } for i in range(IMPORT_ROWS)]
+
+
+class BenchmarkCase:
+    """
+    一个被测接口
+
+    Args:
+        name: 用例名称，结果和基线按名称对应
+        group: 分组（list、stats、dashboard、export、import）
+        path: 接口路径，可包含 {class_id} 等上下文占位符
+        role: 请求身份，owner 为系统所有者，principal 为第一个种子幼儿园的园长
+        params: 查询参数
+        rows: 导入用例生成 Excel 行的函数，参数为上下文和递增的序号，保证每次导入的数据不重复
+        data: 导入时附带的表单字段
+    """
+
+    def __init__(self, name, group, path, role='owner', params=None, rows=None, data=None):
+        self.name = name
+        self.group = group
+        self.path = path
+        self.role = role
+        self.params = params or {}
+        self.rows = rows
+        self.data = data or {}
+
+    def request(self, client, context, number):
+        path = self.path.format(**context)
+        if self.rows is None:
+            return client.get(path, self.params)
+        payload = {**self.data, 'file': _excel_upload(self.rows(context, number))}
+        return client.post(path, payload, format='multipart')
+
+
+BENCHMARK_CASES = [
+    # 列表
+    BenchmarkCase('users.list', 'list', '/api/auth/users/'),
+    BenchmarkCase('kindergartens.list', 'list', '/api/kindergartens/'),
+    BenchmarkCase('kindergartens.active', 'list', '/api/kindergartens/active/'),
+    BenchmarkCase('classes.list', 'list', '/api/classes/'),
+    BenchmarkCase('classes.active', 'list', '/api/classes/active/'),
+    BenchmarkCase('classes.options', 'list', '/api/classes/options/'),
+    BenchmarkCase('teachers.list', 'list', '/api/teachers/'),
+    BenchmarkCase('teachers.active', 'list', '/api/teachers/active/'),
+    BenchmarkCase('teachers.by_position', 'list', '/api/teachers/by_position/'),
+    BenchmarkCase('children.list', 'list', '/api/children/'),
+    BenchmarkCase('children.active', 'list', '/api/children/active/'),
+    BenchmarkCase('selection_areas.list', 'list', '/api/selections/selection-areas/'),
+    BenchmarkCase('selection_records.list', 'list', '/api/selections/selection-records/'),
+    BenchmarkCase('selection_records.active', 'list', '/api/selections/selection-records/active/'),
+    BenchmarkCase('selections.recent_activities', 'list', '/api/selections/recent-activities/'),
+    BenchmarkCase('selections.class_board', 'list', '/api/selections/class-board/{class_id}/'),
+    BenchmarkCase('search', 'list', '/api/search/', params={'q': '王'}),
+    BenchmarkCase('search.prefix', 'list', '/api/search/prefix/', params={'q': '王'}),
+    BenchmarkCase('jobs.list', 'list', '/api/jobs/'),
+    # 统计
+    BenchmarkCase('kindergartens.stats', 'stats', '/api/kindergartens/stats/'),
+    BenchmarkCase('classes.stats', 'stats', '/api/classes/stats/'),
+    BenchmarkCase('teachers.stats', 'stats', '/api/teachers/stats/'),
+    BenchmarkCase('children.statistics', 'stats', '/api/children/statistics/'),
+    BenchmarkCase('children.attendance_statistics', 'stats', '/api/children/attendance_statistics/'),
+    # 仪表盘
+    BenchmarkCase('dashboard.7_days', 'dashboard', '/api/selections/dashboard-stats/', params={'days': 7}),
+    BenchmarkCase('dashboard.90_days', 'dashboard', '/api/selections/dashboard-stats/', params={'days': 90}),
+    # 导出
+    BenchmarkCase(
+        'selection_records.export_xlsx', 'export', '/api/selections/selection-records/export/',
+        params={'file_format': 'xlsx'}
+    ),
+    BenchmarkCase(
+        'selection_records.export_csv', 'export', '/api/selections/selection-records/export/',
+        params={'file_format': 'csv'}
+    ),
+    BenchmarkCase('children.export_data', 'export', '/api/children/export_data/'),
+    BenchmarkCase('children.export_template', 'export', '/api/children/export_template/', role='principal'),
+    BenchmarkCase('teachers.export_template', 'export', '/api/teachers/export_template/', role='principal'),
+    BenchmarkCase('classes.export_template', 'export', '/api/classes/export_template/', role='principal'),
+    BenchmarkCase('kindergartens.export_template', 'export', '/api/kindergartens/export_template/'),
+    # 导入，班级、教师和幼儿导入依赖园长所属的幼儿园
+    BenchmarkCase('children.import', 'import', '/api/children/import_data/', role='principal', rows=_children_rows),
+    BenchmarkCase(
+        'children.import_dry_run', 'import', '/api/children/import_data/', role='principal',
+        rows=_children_rows, data={'dry_run': 'true'}
+    ),
+    BenchmarkCase('teachers.import', 'import', '/api/teachers/import_data/', role='principal', rows=_teacher_rows),
+    BenchmarkCase('classes.import', 'import', '/api/classes/import_data/', role='principal', rows=_class_rows),
+    BenchmarkCase('kindergartens.import', 'import', '/api/kindergartens/import_data/', rows=_kindergarten_rows),
+]
+
+
+def benchmark_clients():
+    """
+    以访问令牌认证的客户端，异步视图不经过 DRF，不能使用 force_authenticate
+    """
+    from users.models import User
+
+    owner = User.objects.filter(username=BENCHMARK_OWNER).first()
+    if owner is None:
+        owner = User.objects.create_user(username=BENCHMARK_OWNER, password=None, role='owner')
+    principal = User.objects.select_related('kindergarten').get(username=BENCHMARK_PRINCIPAL)
+
+    clients = {}
+    for role, user in (('owner', owner), ('principal', principal)):
+        client = APIClient()
+        client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {CustomTokenObtainPairSerializer.get_token(user).access_token}'
+        )
+        clients[role] = client
+
+    first_class = principal.kindergarten.class_set.order_by('id').first()
+    context = {'class_id': first_class.id, 'class_name': first_class.name}
+    return clients, context
+
+
+def _call(case, client, context, number):
+    # 每次请求前清空缓存，测量未命中缓存时的查询和耗时；写入在请求结束后回滚，各轮数据相同
+    for cache in caches.all():
+        cache.clear()
+    with transaction.atomic():
+        response = case.request(client, context, number)
+        # 流式响应需要读完内容才完成查询和生成
+        if response.streaming:
+            size = sum(len(chunk) for chunk in response.streaming_content)
+        else:
+            size = len(response.content)
+        transaction.set_rollback(True)
+    return response.status_code, size
+
+
+def run_case(case, clients, context, rounds=5, numbers=None):
+    """
+    测量一个接口：查询数、耗时（毫秒）和峰值内存（KiB）
+
+    先请求一次预热并记录查询数，再计时请求 rounds 次，最后在 tracemalloc 下请求一次测量峰值内存。
+    """
+    numbers = numbers or count(1)
+    client = clients[case.role]
+
+    # 查询日志最多保留9000条，大规模数据下逐行查询的接口会超出，改为在执行时计数
+    query_count = 0
+
+    def count_query(execute, sql, params, many, context):
+        nonlocal query_count
+        # 不计入事务的保存点语句
+        if not sql.startswith(('SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK TO SAVEPOINT')):
+            query_count += 1
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(count_query):
+        status_code, size = _call(case, client, context, next(numbers))
+
+    latencies = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        _call(case, client, context, next(numbers))
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    tracemalloc.start()
+    try:
+        _call(case, client, context, next(numbers))
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'group': case.group,
+        'status': status_code,
+        'bytes': size,
+        'queries': query_count,
+        'latency_ms': {
+            'min': round(min(latencies), 2),
+            'median': round(statistics.median(latencies), 2),
+            'max': round(max(latencies), 2),
+        },
+        'peak_memory_kib': round(peak / 1024, 1),
+    }
+
+
+def run_benchmarks(cases=None, rounds=5, on_result=None):
+    """
+    在当前数据库上依次测量全部用例
+
+    Returns:
+        dict: 用例名称到测量结果的映射
+    """
+    clients, context = benchmark_clients()
+    numbers = count(1)
+    results = {}
+    for case in cases or BENCHMARK_CASES:
+        results[case.name] = run_case(case, clients, context, rounds, numbers)
+        if on_result:
+            on_result(case, results[case.name])
+    return results
+
+
+def compare_results(current, baseline, tolerance=DEFAULT_TOLERANCE,
+                    latency_floor=LATENCY_FLOOR_MS, memory_floor=MEMORY_FLOOR_KIB):
+    """
+    与基线比较，返回退化项的说明列表
+
+    current 和 baseline 的结构为 {规模: {用例名称: 测量结果}}，只比较两者都有的规模和用例。
+    状态码变化和查询数增加都视为退化；耗时（中位数）和峰值内存超过基线的 1 + tolerance 倍，
+    且增加量超过 latency_floor 毫秒或 memory_floor KiB 时视为退化，避免小接口的抖动误报。
+    """
+    regressions = []
+    for scale, results in current.items():
+        for name, result in results.items():
+            expected = baseline.get(scale, {}).get(name)
+            if expected is None:
+                continue
+            label = f'{scale}x {name}'
+            if result['status'] != expected['status']:
+                regressions.append(f"{label}: 状态码 {expected['status']} -> {result['status']}")
+            if result['queries'] > expected['queries']:
+                regressions.append(f"{label}: 查询数 {expected['queries']} -> {result['queries']}")
+            latency, expected_latency = result['latency_ms']['median'], expected['latency_ms']['median']
+            if latency > expected_latency * (1 + tolerance) and latency - expected_latency > latency_floor:
+                regressions.append(f'{label}: 耗时中位数 {expected_latency:.1f}ms -> {latency:.1f}ms')
+            memory, expected_memory = result['peak_memory_kib'], expected['peak_memory_kib']
+            if memory > expected_memory * (1 + tolerance) and memory - expected_memory > memory_floor:
+                regressions.append(f'{label}: 峰值内存 {expected_memory:.0f}KiB -> {memory:.0f}KiB')
+    return regressions
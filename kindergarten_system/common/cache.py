@@ -0,0 +1,226 @@
+import hashlib
+import json
+import time
+from functools import wraps
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.http import HttpResponseNotModified
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+from users.scope import get_user_scope
+from common.async_views import json_response
+
+
+# 缓存键前缀
+RESPONSE_CACHE_PREFIX = 'response_cache'
+MODEL_VERSION_PREFIX = 'response_cache_version'
+
+# 变化时需要使响应缓存失效的模型，由 common 应用启动时连接信号
+INVALIDATING_MODELS = (
+    'kindergartens.Kindergarten',
+    'classes.Class',
+    'teachers.Teacher',
+    'children.Child',
+    'selections.SelectionArea',
+    'selections.SelectionRecord',
+)
+
+
+def get_cache():
+    return caches[getattr(settings, 'RESPONSE_CACHE_ALIAS', 'default')]
+
+
+def _version_key(label):
+    return f'{MODEL_VERSION_PREFIX}:{label}'
+
+
+def get_model_versions(labels):
+    """
+    获取模型数据的当前版本号
+
+    版本号保存在缓存中且不过期；不存在时以当前纳秒时间戳初始化，
+    缓存被清空后重新生成的版本号不会与之前的版本号重复。
+    """
+    cache = get_cache()
+    keys = [_version_key(label) for label in labels]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, time.time_ns(), timeout=None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def _bump_versions(labels):
+    cache = get_cache()
+    for label in labels:
+        try:
+            cache.incr(_version_key(label))
+        except ValueError:
+            # 版本号不存在说明没有缓存过依赖该模型的响应
+            pass
+
+
+def bump_model_versions(*labels):
+    """
+    使依赖这些模型的响应缓存失效
+
+    立即递增一次版本号，并在事务提交后再递增一次，
+    避免并发请求在事务提交前按旧数据重新写入缓存。
+    """
+    if not labels:
+        return
+    _bump_versions(labels)
+    transaction.on_commit(lambda: _bump_versions(labels))
+
+
+def _etag(data):
+    content = json.dumps(data, cls=DjangoJSONEncoder, sort_keys=True, ensure_ascii=False)
+    return '"%s"' % hashlib.md5(content.encode('utf-8')).hexdigest()
+
+
+def _etag_matches(request, etag):
+    header = request.META.get('HTTP_IF_NONE_MATCH')
+    if not header:
+        return False
+    candidates = [item.strip() for item in header.split(',')]
+    # 忽略弱校验前缀
+    return '*' in candidates or etag in [item[2:] if item.startswith('W/') else item for item in candidates]
+
+
+def _with_headers(response, etag):
+    response['ETag'] = etag
+    # 响应按用户数据范围区分，只允许浏览器缓存，每次使用前需重新验证
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def _cache_key(name, request, args, kwargs, depends_on, daily):
+    params = sorted((key, value) for key, values in request.GET.lists() for value in values)
+    parts = [
+        name,
+        get_user_scope(request).cache_key,
+        json.dumps([args, kwargs, params], cls=DjangoJSONEncoder, sort_keys=True),
+        *[str(version) for version in get_model_versions(depends_on)],
+    ]
+    if daily:
+        parts.append(timezone.localdate().isoformat())
+    return f"{RESPONSE_CACHE_PREFIX}:{hashlib.md5('|'.join(parts).encode('utf-8')).hexdigest()}"
+
+
+def _cache_entry(data):
+    # 转换为普通的字典和列表后缓存，与重新查询得到的内容一致
+    data = json.loads(json.dumps(data, cls=DjangoJSONEncoder))
+    return {'data': data, 'etag': _etag(data)}
+
+
+def _timeout(timeout):
+    return timeout if timeout is not None else getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 300)
+
+
+def cached_response(depends_on, timeout=None, daily=False):
+    """
+    视图集操作的响应缓存装饰器，适用于变化较少、每个页面都会加载的参考数据
+
+    缓存键包含视图操作、用户数据范围、查询参数和依赖模型的版本号，
+    依赖模型的数据变化时版本号递增，旧缓存自然失效。
+    响应带 ETag，请求的 If-None-Match 与之相同时返回 304，不查询数据库也不返回内容。
+    也可以用于返回 JsonResponse 的异步视图函数，放在 async_api_view 之下。
+
+    Args:
+        depends_on: 响应内容依赖的模型，如 ('classes.Class',)，须在 INVALIDATING_MODELS 中
+        timeout: 缓存时间（秒），默认使用 RESPONSE_CACHE_TIMEOUT
+        daily: 响应内容随日期变化（如当天人数）时为 True，缓存键包含当天日期
+    """
+    depends_on = tuple(depends_on)
+    unknown = set(depends_on) - set(INVALIDATING_MODELS)
+    if unknown:
+        raise ValueError(f'模型变化不会使缓存失效：{", ".join(sorted(unknown))}')
+
+    def decorator(func):
+        if iscoroutinefunction(func):
+            return _async_cached_view(func, depends_on, timeout, daily)
+
+        @wraps(func)
+        def wrapper(self, request, *args, **kwargs):
+            name = f'{type(self).__module__}.{type(self).__name__}.{func.__name__}'
+            key = _cache_key(name, request, args, kwargs, depends_on, daily)
+            cache = get_cache()
+            cached = cache.get(key)
+            if cached is None:
+                response = func(self, request, *args, **kwargs)
+                if response.status_code != status.HTTP_200_OK:
+                    return response
+                cached = _cache_entry(response.data)
+                cache.set(key, cached, _timeout(timeout))
+            else:
+                response = Response(cached['data'])
+
+            if _etag_matches(request, cached['etag']):
+                return _with_headers(Response(status=status.HTTP_304_NOT_MODIFIED), cached['etag'])
+            return _with_headers(response, cached['etag'])
+        return wrapper
+    return decorator
+
+
+def _async_cached_view(func, depends_on, timeout, daily):
+    @wraps(func)
+    async def view(request, *args, **kwargs):
+        name = f'{func.__module__}.{func.__qualname__}'
+        cache = get_cache()
+
+        def lookup():
+            # 版本号和缓存在同一次线程切换中读取
+            key = _cache_key(name, request, args, kwargs, depends_on, daily)
+            return key, cache.get(key)
+
+        key, cached = await sync_to_async(lookup)()
+        if cached is None:
+            response = await func(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            cached = _cache_entry(json.loads(response.content))
+            await cache.aset(key, cached, _timeout(timeout))
+        else:
+            response = json_response(cached['data'])
+
+        if _etag_matches(request, cached['etag']):
+            return _with_headers(HttpResponseNotModified(), cached['etag'])
+        return _with_headers(response, cached['etag'])
+    return view
+
+
+def connect_invalidation_signals():
+    """
+    连接模型信号，模型保存、删除或多对多关系变化时使依赖它的响应缓存失效
+
+    批量写入不会发送信号，相应代码需要自行调用 bump_model_versions。
+    """
+    from django.apps import apps
+    from django.db.models.signals import m2m_changed, post_delete, post_save
+
+    def model_changed(sender, raw=False, **kwargs):
+        if not raw:
+            bump_model_versions(sender._meta.label)
+
+    def relation_changed(sender, action, **kwargs):
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            bump_model_versions(*labels_by_through[sender])
+
+    labels_by_through = {}
+    for label in INVALIDATING_MODELS:
+        model = apps.get_model(label)
+        post_save.connect(model_changed, sender=model, weak=False, dispatch_uid=f'response_cache_save:{label}')
+        post_delete.connect(model_changed, sender=model, weak=False, dispatch_uid=f'response_cache_delete:{label}')
+        for field in model._meta.many_to_many:
+            labels_by_through.setdefault(field.remote_field.through, set()).update(
+                {label, field.related_model._meta.label} & set(INVALIDATING_MODELS)
+            )
+    for through in labels_by_through:
+        m2m_changed.connect(
+            relation_changed, sender=through, weak=False, dispatch_uid=f'response_cache_m2m:{through._meta.label}'
+        )
@@ -0,0 +1,299 @@
+import asyncio
+import json
+import threading
+import time
+from collections import defaultdict
+from django.conf import settings
+from django.core.cache import caches
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+from common.logger import get_logger
+
+
+logger = get_logger(__name__)
+
+# 订阅者队列积压过多时发送的事件，客户端收到后应重新加载完整数据
+RESYNC_EVENT = {'type': 'resync'}
+
+
+class BaseBroker:
+    """
+    事件代理接口
+
+    publish 可以在任意线程中调用；subscribe 在事件循环中调用，返回 Subscription。
+    消息为可以转换为 JSON 的字典。多进程部署时需要使用跨进程的代理（如 CacheBroker），
+    并通过 EVENT_BROKER_BACKEND 配置。
+    """
+    def publish(self, channel, message):
+        raise NotImplementedError
+
+    def subscribe(self, channel):
+        raise NotImplementedError
+
+    def has_subscribers(self, channel=None):
+        """
+        频道（不指定时为任意频道）是否可能有订阅者，没有时发布方可以跳过生成消息
+        """
+        return True
+
+
+class Subscription:
+    """
+    频道订阅，作为上下文管理器使用，退出时取消订阅
+    """
+    def __init__(self, queue, on_close):
+        self.queue = queue
+        self._on_close = on_close
+
+    async def get(self, timeout=None):
+        """
+        等待下一条消息，超时返回 None
+        """
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        if self._on_close is not None:
+            self._on_close()
+            self._on_close = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class InProcessBroker(BaseBroker):
+    """
+    进程内事件代理，只能把消息发送给同一进程内的订阅者
+
+    每个订阅者有独立的有界队列，消息通过订阅者所在的事件循环投递；
+    队列已满时清空积压并发送 resync 事件，不阻塞发布方。
+    """
+    def __init__(self, max_queue_size=100):
+        self.max_queue_size = max_queue_size
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)
+
+    def publish(self, channel, message):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(self._deliver, queue, message)
+            except RuntimeError:
+                # 订阅者的事件循环已关闭
+                pass
+
+    @staticmethod
+    def _deliver(queue, message):
+        try:
+            queue.put_nowait(message)
+        except asyncio.QueueFull:
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait(RESYNC_EVENT)
+
+    def subscribe(self, channel):
+        entry = (asyncio.get_running_loop(), asyncio.Queue(maxsize=self.max_queue_size))
+        with self._lock:
+            self._subscribers[channel].add(entry)
+
+        def unsubscribe():
+            with self._lock:
+                subscribers = self._subscribers.get(channel)
+                if subscribers is not None:
+                    subscribers.discard(entry)
+                    if not subscribers:
+                        del self._subscribers[channel]
+
+        return Subscription(entry[1], unsubscribe)
+
+    def subscriber_count(self, channel):
+        with self._lock:
+            return len(self._subscribers.get(channel, ()))
+
+    def has_subscribers(self, channel=None):
+        with self._lock:
+            return bool(self._subscribers) if channel is None else channel in self._subscribers
+
+
+class CacheBroker(InProcessBroker):
+    """
+    通过共享缓存（数据库缓存、Redis 等）在进程间传递事件，适用于多个工作进程的部署
+
+    发布时递增频道的序号并以序号为键写入消息，消息保留 retention 秒。
+    每个进程的每个事件循环为有订阅者的频道启动一个轮询任务，按序号读取新消息，
+    再投递给本进程的订阅者；漏读（消息过期或序号被跳过）时发送 resync 事件。
+    轮询任务同时刷新订阅标记，发布方据此判断是否有任何进程在订阅。
+    本地内存缓存不能跨进程共享，使用本代理时缓存需配置为共享的后端。
+    """
+    KEY_PREFIX = 'event_broker'
+    # 并发发布抢到同一序号时的最大重试次数
+    MAX_PUBLISH_ATTEMPTS = 5
+
+    def __init__(self, max_queue_size=100, poll_interval=None, retention=60, cache_alias=None):
+        super().__init__(max_queue_size)
+        self.poll_interval = (
+            poll_interval if poll_interval is not None
+            else getattr(settings, 'EVENT_BROKER_POLL_INTERVAL', 0.5)
+        )
+        self.retention = retention
+        self.cache = caches[cache_alias or getattr(settings, 'EVENT_BROKER_CACHE_ALIAS', 'default')]
+        # 订阅标记的有效期，轮询任务按其三分之一的间隔刷新
+        self.listener_timeout = max(self.poll_interval * 6, 3)
+        self._pollers = {}
+
+    def _key(self, *parts):
+        return ':'.join((self.KEY_PREFIX, *[str(part) for part in parts]))
+
+    def publish(self, channel, message):
+        sequence_key = self._key(channel, 'sequence')
+        self.cache.add(sequence_key, 0, timeout=None)
+        for _ in range(self.MAX_PUBLISH_ATTEMPTS):
+            # 部分缓存后端的 incr 不是原子操作，用 add 确认序号没有被并发发布占用
+            sequence = self.cache.incr(sequence_key)
+            if self.cache.add(self._key(channel, sequence), message, timeout=self.retention):
+                return
+        logger.warning('事件序号冲突，消息未发布：%s', channel)
+
+    def has_subscribers(self, channel=None):
+        key = self._key('listeners') if channel is None else self._key(channel, 'listeners')
+        return super().has_subscribers(channel) or self.cache.get(key) is not None
+
+    def subscribe(self, channel):
+        loop = asyncio.get_running_loop()
+        subscription = super().subscribe(channel)
+        poller_key = (loop, channel)
+        with self._lock:
+            if poller_key not in self._pollers:
+                self._pollers[poller_key] = loop.create_task(self._poll(channel))
+        unsubscribe = subscription._on_close
+
+        def close():
+            unsubscribe()
+            with self._lock:
+                if not any(entry[0] is loop for entry in self._subscribers.get(channel, ())):
+                    task = self._pollers.pop(poller_key, None)
+                    if task is not None:
+                        task.cancel()
+
+        subscription._on_close = close
+        return subscription
+
+    def _deliver_local(self, loop, channel, message):
+        with self._lock:
+            queues = [queue for entry_loop, queue in self._subscribers.get(channel, ()) if entry_loop is loop]
+        for queue in queues:
+            self._deliver(queue, message)
+
+    async def _poll(self, channel):
+        loop = asyncio.get_running_loop()
+        sequence_key = self._key(channel, 'sequence')
+        listener_keys = [self._key('listeners'), self._key(channel, 'listeners')]
+        last = await self.cache.aget(sequence_key, 0)
+        refreshed_at = None
+        while True:
+            try:
+                if refreshed_at is None or time.monotonic() - refreshed_at > self.listener_timeout / 3:
+                    await self.cache.aset_many(
+                        {key: True for key in listener_keys}, timeout=self.listener_timeout
+                    )
+                    refreshed_at = time.monotonic()
+
+                current = await self.cache.aget(sequence_key, 0)
+                if current < last:
+                    # 序号被重置（缓存被清空），之前的消息已无法读取
+                    self._deliver_local(loop, channel, RESYNC_EVENT)
+                    last = current
+                elif current > last:
+                    if current - last > self.max_queue_size:
+                        self._deliver_local(loop, channel, RESYNC_EVENT)
+                        last = current - self.max_queue_size
+                    sequences = range(last + 1, current + 1)
+                    messages = await self.cache.aget_many([self._key(channel, sequence) for sequence in sequences])
+                    newest = max(
+                        (sequence for sequence in sequences if self._key(channel, sequence) in messages),
+                        default=None
+                    )
+                    for sequence in sequences:
+                        key = self._key(channel, sequence)
+                        if key in messages:
+                            self._deliver_local(loop, channel, messages[key])
+                        elif newest is not None and sequence < newest:
+                            # 之后的消息已写入，该序号的消息已过期或发布失败
+                            self._deliver_local(loop, channel, RESYNC_EVENT)
+                        else:
+                            # 发布方已递增序号但尚未写入消息，下次轮询再读取
+                            break
+                        last = sequence
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception('读取事件失败：%s', channel)
+            await asyncio.sleep(self.poll_interval)
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    """
+    获取 EVENT_BROKER_BACKEND 配置的事件代理，进程内共用一个实例
+    """
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                backend = getattr(settings, 'EVENT_BROKER_BACKEND', 'common.events.InProcessBroker')
+                _broker = import_string(backend)()
+    return _broker
+
+
+@receiver(setting_changed)
+def reset_broker(setting, **kwargs):
+    # 测试中修改配置后重新创建事件代理
+    global _broker
+    if setting == 'EVENT_BROKER_BACKEND':
+        _broker = None
+
+
+def publish_event(channel, message):
+    """
+    发布事件，代理出错时只记录日志，不影响已完成的写入
+    """
+    try:
+        get_broker().publish(channel, message)
+    except Exception:
+        logger.exception('发布事件失败：%s', channel)
+
+
+def format_sse(message):
+    """
+    按 Server-Sent Events 格式编码消息，消息的 type 作为事件名
+    """
+    data = json.dumps(message, cls=DjangoJSONEncoder, ensure_ascii=False)
+    return f"event: {message.get('type', 'message')}\ndata: {data}\n\n"
+
+
+async def sse_stream(channel, heartbeat=None):
+    """
+    订阅频道并以 Server-Sent Events 格式持续输出消息，需要在 ASGI 服务器下使用
+
+    没有消息时按心跳间隔发送注释行，使代理服务器不断开空闲连接，也能及时发现客户端断开。
+    """
+    if heartbeat is None:
+        heartbeat = getattr(settings, 'EVENT_STREAM_HEARTBEAT', 15)
+    with get_broker().subscribe(channel) as subscription:
+        # 断线后浏览器按此间隔（毫秒）自动重连
+        yield 'retry: 3000\n\n'
+        yield format_sse({'type': 'connected'})
+        while True:
+            message = await subscription.get(timeout=heartbeat)
+            yield ': keepalive\n\n' if message is None else format_sse(message)
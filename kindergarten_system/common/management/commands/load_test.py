@@ -0,0 +1,163 @@
+import asyncio
+from collections import Counter
+from urllib.parse import urlsplit
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from users.serializers import CustomTokenObtainPairSerializer
+
+
+# 默认压测的只读热点接口
+DEFAULT_PATHS = (
+    '/api/selections/dashboard-stats/',
+    '/api/selections/recent-activities/',
+    '/api/classes/options/',
+)
+
+
+def percentile(sorted_values, percent):
+    """
+    按最近秩法计算百分位数
+    """
+    if not sorted_values:
+        return 0.0
+    rank = max(int(len(sorted_values) * percent / 100 + 0.999999) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+async def _read_response(reader):
+    """
+    读取一个 HTTP/1.1 响应，返回（状态码，服务端是否保持连接）
+    """
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError('连接已关闭')
+    status = int(status_line.split()[1])
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+
+    if headers.get('transfer-encoding', '').lower() == 'chunked':
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    elif 'content-length' in headers:
+        await reader.readexactly(int(headers['content-length']))
+    elif status not in (204, 304):
+        await reader.read()
+        return status, False
+    return status, headers.get('connection', '').lower() != 'close'
+
+
+class Command(BaseCommand):
+    """
+    对只读接口进行并发压测，比较 WSGI 和 ASGI 服务方式的吞吐量和延迟
+
+    每个并发客户端使用一个保持连接（keep-alive），在压测时间内循环请求指定接口。
+    """
+    help = '并发压测只读接口，输出吞吐量和延迟百分位'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000', help='服务地址')
+        parser.add_argument(
+            '--path',
+            action='append',
+            help='压测的接口路径，可重复指定，默认为仪表盘统计、最近活动和班级选项'
+        )
+        parser.add_argument('--username', help='以该用户签发的访问令牌发送请求，不指定时不带令牌')
+        parser.add_argument('--concurrency', type=int, default=200, help='并发客户端数')
+        parser.add_argument('--duration', type=float, default=30.0, help='压测秒数')
+        parser.add_argument('--warmup', type=float, default=3.0, help='预热秒数，预热期间的请求不计入结果')
+        parser.add_argument('--timeout', type=float, default=30.0, help='单个请求的超时秒数')
+
+    def handle(self, *args, **options):
+        url = urlsplit(options['base_url'])
+        if url.scheme != 'http' or not url.hostname:
+            raise CommandError('只支持 http:// 地址')
+        if options['concurrency'] < 1 or options['duration'] <= 0:
+            raise CommandError('并发数和压测时间必须大于0')
+
+        headers = {'Host': url.netloc, 'Accept': 'application/json'}
+        if options['username']:
+            user = get_user_model().objects.filter(username=options['username']).first()
+            if user is None:
+                raise CommandError(f"用户不存在：{options['username']}")
+            headers['Authorization'] = f'Bearer {CustomTokenObtainPairSerializer.get_token(user).access_token}'
+
+        paths = options['path'] or list(DEFAULT_PATHS)
+        requests = [
+            (
+                f'GET {path} HTTP/1.1\r\n'
+                + ''.join(f'{name}: {value}\r\n' for name, value in headers.items())
+                + '\r\n'
+            ).encode('latin-1')
+            for path in paths
+        ]
+
+        self.stdout.write(
+            f"压测 {options['base_url']}：{options['concurrency']} 个并发客户端，"
+            f"{options['duration']:g} 秒（预热 {options['warmup']:g} 秒）"
+        )
+        for path in paths:
+            self.stdout.write(f'  {path}')
+
+        latencies, statuses, elapsed = asyncio.run(self.run(url, requests, options))
+        self.report(latencies, statuses, elapsed)
+
+    async def run(self, url, requests, options):
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        measure_from = started + options['warmup']
+        deadline = measure_from + options['duration']
+        latencies = []
+        statuses = Counter()
+
+        async def client(index):
+            reader = writer = None
+            # 各客户端从不同接口开始，使请求均匀分布
+            position = index
+            while loop.time() < deadline:
+                request = requests[position % len(requests)]
+                position += 1
+                begin = loop.time()
+                try:
+                    if writer is None:
+                        reader, writer = await asyncio.wait_for(
+                            asyncio.open_connection(url.hostname, url.port or 80), options['timeout']
+                        )
+                    writer.write(request)
+                    await writer.drain()
+                    status, keep_alive = await asyncio.wait_for(_read_response(reader), options['timeout'])
+                except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError, IndexError) as exc:
+                    status, keep_alive = type(exc).__name__, False
+                end = loop.time()
+                if begin >= measure_from and end <= deadline:
+                    latencies.append(end - begin)
+                    statuses[status] += 1
+                if not keep_alive and writer is not None:
+                    writer.close()
+                    reader = writer = None
+            if writer is not None:
+                writer.close()
+
+        await asyncio.gather(*(client(index) for index in range(options['concurrency'])))
+        return sorted(latencies), statuses, options['duration']
+
+    def report(self, latencies, statuses, elapsed):
+        total = len(latencies)
+        errors = sum(count for status, count in statuses.items() if not (isinstance(status, int) and status < 400))
+        self.stdout.write(f'请求数：{total}，错误数：{errors}')
+        self.stdout.write('状态：' + '，'.join(f'{status}={count}' for status, count in sorted(
+            statuses.items(), key=lambda item: str(item[0])
+        )))
+        self.stdout.write(f'吞吐量：{total / elapsed:.1f} 请求/秒')
+        self.stdout.write(
+            '延迟（毫秒）：'
+            + '，'.join(f'p{p}={percentile(latencies, p) * 1000:.1f}' for p in (50, 90, 99))
+            + f'，最大={(latencies[-1] if latencies else 0) * 1000:.1f}'
+        )
@@ -0,0 +1,125 @@
+import json
+import time
+from datetime import date
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+from common.benchmark import (
+    BENCHMARK_CASES, DEFAULT_TOLERANCE, compare_results, run_benchmarks,
+)
+from common.seed import seed_dataset
+
+
+DEFAULT_BASELINE = settings.BASE_DIR / 'benchmarks' / 'baseline.json'
+
+
+class Command(BaseCommand):
+    """
+    在临时测试数据库中按 1 倍、10 倍、100 倍等规模生成种子数据，
+    测量全部列表、统计、仪表盘、导出和导入接口的查询数、耗时和峰值内存，并与基线比较
+
+    规模按幼儿园数递增，每个规模只补充生成新增的幼儿园。
+    查询数增加或耗时、内存明显超过基线时命令失败，可用于持续集成中的性能回归检查。
+    """
+    help = '按多个数据规模测量接口性能并与基线比较'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scales', default='1,10,100', help='数据规模（幼儿园数），逗号分隔')
+        parser.add_argument('--rounds', type=int, default=3, help='每个接口计时请求的次数')
+        parser.add_argument('--group', action='append', help='只测量指定分组，可重复指定')
+        parser.add_argument('--case', action='append', help='只测量指定用例，可重复指定')
+        parser.add_argument('--seed', type=int, default=0, help='种子数据的随机数种子')
+        parser.add_argument('--end-date', help='种子数据的最后一天（YYYY-MM-DD），默认为当天')
+        parser.add_argument('--output', help='测量结果的输出文件')
+        parser.add_argument('--baseline', default=str(DEFAULT_BASELINE), help='基线文件')
+        parser.add_argument('--save-baseline', action='store_true', help='将本次结果保存为基线，不进行比较')
+        parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE, help='耗时和内存允许超过基线的比例')
+        parser.add_argument('--keepdb', action='store_true', help='保留测试数据库，下次运行时复用已生成的数据')
+
+    def handle(self, *args, **options):
+        try:
+            scales = sorted({int(scale) for scale in options['scales'].split(',') if scale.strip()})
+        except ValueError:
+            raise CommandError('--scales 应为逗号分隔的正整数')
+        if not scales or scales[0] < 1 or options['rounds'] < 1:
+            raise CommandError('规模和计时次数必须大于0')
+        try:
+            end_date = date.fromisoformat(options['end_date']) if options['end_date'] else None
+        except ValueError:
+            raise CommandError('--end-date 格式应为 YYYY-MM-DD')
+
+        cases = [
+            case for case in BENCHMARK_CASES
+            if (not options['group'] or case.group in options['group'])
+            and (not options['case'] or case.name in options['case'])
+        ]
+        if not cases:
+            raise CommandError('没有匹配的用例')
+
+        results = self.measure(scales, cases, options, end_date)
+        report = {
+            'scales': scales,
+            'rounds': options['rounds'],
+            'database': connection.vendor,
+            'results': results,
+        }
+        if options['output']:
+            self.write_json(options['output'], report)
+            self.stdout.write(f"测量结果已保存到 {options['output']}")
+
+        if options['save_baseline']:
+            self.write_json(options['baseline'], report)
+            self.stdout.write(self.style.SUCCESS(f"基线已保存到 {options['baseline']}"))
+            return
+
+        try:
+            with open(options['baseline'], encoding='utf-8') as file:
+                baseline = json.load(file)
+        except FileNotFoundError:
+            self.stdout.write(self.style.WARNING(f"基线文件不存在，跳过比较：{options['baseline']}"))
+            return
+        if baseline.get('database') != connection.vendor:
+            self.stdout.write(self.style.WARNING(
+                f"基线在 {baseline.get('database')} 上生成，当前为 {connection.vendor}，耗时和内存仅供参考"
+            ))
+
+        regressions = compare_results(results, baseline['results'], tolerance=options['tolerance'])
+        if regressions:
+            for item in regressions:
+                self.stderr.write(item)
+            raise CommandError(f'性能退化 {len(regressions)} 项')
+        self.stdout.write(self.style.SUCCESS('与基线相比没有性能退化'))
+
+    def measure(self, scales, cases, options, end_date):
+        # 在临时测试数据库中生成数据，不影响当前数据库；与测试运行器一样关闭 DEBUG，不记录全部查询
+        setup_test_environment(debug=False)
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=options['keepdb'])
+        try:
+            results = {}
+            for scale in scales:
+                started = time.perf_counter()
+                summary = seed_dataset(scale, seed=options['seed'], end_date=end_date)
+                self.stdout.write(
+                    f"{scale} 倍规模：新增 {summary['kindergartens']} 个幼儿园、{summary['children']} 名幼儿、"
+                    f"{summary['records']} 条选区记录，用时 {time.perf_counter() - started:.1f} 秒"
+                )
+                results[str(scale)] = run_benchmarks(cases, options['rounds'], on_result=self.report_case)
+            return results
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options['keepdb'])
+            teardown_test_environment()
+
+    def report_case(self, case, result):
+        latency = result['latency_ms']
+        self.stdout.write(
+            f"  {case.name:<36} {result['status']:>3}  查询 {result['queries']:>4}  "
+            f"耗时 {latency['median']:>9.1f}ms（{latency['min']:.1f}-{latency['max']:.1f}）  "
+            f"峰值内存 {result['peak_memory_kib']:>9.1f}KiB"
+        )
+
+    def write_json(self, path, report):
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+            file.write('\n')
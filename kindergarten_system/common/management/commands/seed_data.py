@@ -0,0 +1,43 @@
+from datetime import date
+from django.core.management.base import BaseCommand, CommandError
+from common.seed import DEFAULT_SEED_CONFIG, DEFAULT_SEED_PASSWORD, seed_dataset
+
+
+class Command(BaseCommand):
+    """
+    生成可重复的演示和压测数据，规模 = 幼儿园数 × 每园班级数 × 每班幼儿数 × 每园教师数 × 工作日数
+    """
+    help = '按指定规模生成确定性的种子数据'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', type=int, default=1, help='规模倍数，即生成的幼儿园数')
+        parser.add_argument('--kindergartens', type=int, help='幼儿园数，指定时忽略 --scale')
+        parser.add_argument('--classes', type=int, default=DEFAULT_SEED_CONFIG['classes'], help='每个幼儿园的班级数')
+        parser.add_argument('--children', type=int, default=DEFAULT_SEED_CONFIG['children'], help='每个班级的幼儿数')
+        parser.add_argument('--teachers', type=int, default=DEFAULT_SEED_CONFIG['teachers'], help='每个幼儿园的教师数')
+        parser.add_argument('--areas', type=int, default=DEFAULT_SEED_CONFIG['areas'], help='每个班级的选区数')
+        parser.add_argument('--days', type=int, default=DEFAULT_SEED_CONFIG['days'], help='选区记录的工作日数')
+        parser.add_argument('--seed', type=int, default=0, help='随机数种子')
+        parser.add_argument('--end-date', help='选区记录的最后一天（YYYY-MM-DD），默认为当天')
+        parser.add_argument('--password', default=DEFAULT_SEED_PASSWORD, help='生成账号的密码')
+
+    def handle(self, *args, **options):
+        kindergartens = options['kindergartens'] if options['kindergartens'] is not None else options['scale']
+        config = {key: options[key] for key in DEFAULT_SEED_CONFIG}
+        if kindergartens < 1 or any(value < 0 for value in config.values()):
+            raise CommandError('幼儿园数必须大于0，其他数量不能为负数')
+        try:
+            end_date = date.fromisoformat(options['end_date']) if options['end_date'] else None
+        except ValueError:
+            raise CommandError('--end-date 格式应为 YYYY-MM-DD')
+
+        summary = seed_dataset(
+            kindergartens, config, seed=options['seed'], end_date=end_date, password=options['password']
+        )
+        self.stdout.write(
+            f"新增 {summary['kindergartens']} 个幼儿园、{summary['children']} 名在园幼儿、"
+            f"{summary['records']} 条选区记录（已存在的种子幼儿园已跳过）"
+        )
+        if summary['kindergartens']:
+            self.stdout.write(f"园长和教师账号为 seed0001_principal、seed0001_teacher 等，密码：{options['password']}")
+        self.stdout.write(self.style.SUCCESS('种子数据生成完成'))
@@ -1,5 +1,10 @@
-from rest_framework.pagination import PageNumberPagination
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination, _positive_int
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 
 
 class CustomPageNumberPagination(PageNumberPagination):
@@ -26,4 +31,154 @@ class CustomPageNumberPagination(PageNumberPagination):
             'total_pages': self.page.paginator.num_pages,
             'current_page': self.page.number,
             'results': data
-        })
\ No newline at end of file
+        })
+
+
+class KeysetPagination(BasePagination):
+    """
+    游标分页类，按排序字段的值定位下一页
+
+    翻页时以上一页最后一行的排序字段值作为条件，查询耗时与页码无关，
+    适合持续增长的表和无限滚动的列表。总数默认不统计，传 with_count=true 时才执行 COUNT。
+    排序字段必须以唯一字段（如 id）结尾，保证位置唯一。
+    """
+    # 选择游标分页的参数名和取值
+    mode_query_param = 'pagination'
+    mode_query_value = 'cursor'
+    cursor_query_param = 'cursor'
+    count_query_param = 'with_count'
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
+    def __init__(self, ordering):
+        self.ordering = tuple(ordering)
+
+    @classmethod
+    def is_requested(cls, request):
+        """
+        判断请求是否选择游标分页
+        """
+        params = request.query_params
+        return params.get(cls.mode_query_param) == cls.mode_query_value or cls.cursor_query_param in params
+
+    def get_page_size(self, request):
+        try:
+            return _positive_int(
+                request.query_params[self.page_size_query_param], strict=True, cutoff=self.max_page_size
+            )
+        except (KeyError, ValueError):
+            return self.page_size
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.fields = [
+            queryset.model._meta.get_field(name.lstrip('-')) for name in self.ordering
+        ]
+        position, reverse = self.decode_cursor(request)
+
+        self.count = None
+        if request.query_params.get(self.count_query_param, '').lower() == 'true':
+            self.count = queryset.count()
+
+        ordering = [self._flip(name) for name in self.ordering] if reverse else list(self.ordering)
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self._after(ordering, position))
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if reverse:
+            results.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+
+        self.next_position = self._position(results[-1]) if results and self.has_next else None
+        self.previous_position = self._position(results[0]) if results and self.has_previous else None
+        return results
+
+    def get_paginated_response(self, data):
+        next_cursor = self.encode_cursor(self.next_position, False) if self.next_position else None
+        previous_cursor = self.encode_cursor(self.previous_position, True) if self.previous_position else None
+        return Response({
+            'links': {
+                'next': self._link(next_cursor),
+                'previous': self._link(previous_cursor)
+            },
+            'next_cursor': next_cursor,
+            'previous_cursor': previous_cursor,
+            'count': self.count,
+            'results': data
+        })
+
+    def decode_cursor(self, request):
+        """
+        解析游标，返回（排序字段值列表，是否向前翻页）
+        """
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            payload = json.loads(urlsafe_b64decode(encoded.encode('ascii')).decode('utf-8'))
+            values = payload['p']
+            if len(values) != len(self.fields):
+                raise ValueError
+            position = [field.to_python(value) for field, value in zip(self.fields, values)]
+            return position, bool(payload.get('r'))
+        except Exception:
+            raise NotFound('无效的游标')
+
+    def encode_cursor(self, position, reverse):
+        payload = {'p': position}
+        if reverse:
+            payload['r'] = 1
+        return urlsafe_b64encode(json.dumps(payload).encode('utf-8')).decode('ascii')
+
+    def _position(self, obj):
+        return [field.value_to_string(obj) for field in self.fields]
+
+    def _link(self, cursor):
+        if cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.mode_query_param, self.mode_query_value)
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    @staticmethod
+    def _flip(name):
+        return name[1:] if name.startswith('-') else f'-{name}'
+
+    @staticmethod
+    def _after(ordering, position):
+        """
+        构造“排在该位置之后”的条件：(a, b, c) 之后即 a 之后，或 a 相同且 b 之后，依此类推
+        """
+        condition = Q()
+        equal = {}
+        for name, value in zip(ordering, position):
+            field = name.lstrip('-')
+            lookup = 'lt' if name.startswith('-') else 'gt'
+            condition |= Q(**equal, **{f'{field}__{lookup}': value})
+            equal[field] = value
+        return condition
+
+
+class KeysetPaginationMixin:
+    """
+    视图集混入类，请求带 pagination=cursor 或 cursor 参数时改用游标分页，否则使用默认分页
+
+    视图集通过 keyset_ordering 指定游标分页的排序字段。
+    """
+    keyset_ordering = None
+
+    @property
+    def paginator(self):
+        if (
+            not hasattr(self, '_paginator') and self.keyset_ordering
+            and getattr(self, 'request', None) is not None and KeysetPagination.is_requested(self.request)
+        ):
+            self._paginator = KeysetPagination(self.keyset_ordering)
+        return super().paginator
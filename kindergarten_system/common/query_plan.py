@@ -0,0 +1,75 @@
+import re
+from django.db import connections
+
+
+def explain_queryset(queryset):
+    """
+    获取查询集的执行计划
+
+    Returns:
+        list: 执行计划的每一步，每项包含 table、full_scan、detail
+    """
+    connection = connections[queryset.db]
+    sql, params = queryset.query.sql_with_params()
+    vendor = connection.vendor
+    with connection.cursor() as cursor:
+        if vendor == 'sqlite':
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            return [_sqlite_step(row[-1]) for row in cursor.fetchall()]
+        if vendor == 'mysql':
+            cursor.execute(f'EXPLAIN {sql}', params)
+            columns = [column[0] for column in cursor.description]
+            return [_mysql_step(dict(zip(columns, row))) for row in cursor.fetchall()]
+        if vendor == 'postgresql':
+            cursor.execute(f'EXPLAIN {sql}', params)
+            return [_postgresql_step(row[0]) for row in cursor.fetchall()]
+    raise NotImplementedError(f'不支持的数据库类型：{vendor}')
+
+
+def _sqlite_step(detail):
+    # SCAN 表示逐行扫描整张表或整个索引，SEARCH 表示按索引定位
+    match = re.match(r'(SCAN|SEARCH) (?:TABLE )?(\w+)', detail)
+    if not match:
+        return {'table': None, 'full_scan': False, 'detail': detail}
+    return {'table': match.group(2), 'full_scan': match.group(1) == 'SCAN', 'detail': detail}
+
+
+def _mysql_step(row):
+    # type 为 ALL 表示全表扫描，index 表示全索引扫描
+    return {
+        'table': row.get('table'),
+        'full_scan': row.get('type') in ('ALL', 'index'),
+        'detail': f"type={row.get('type')} key={row.get('key')}",
+    }
+
+
+def _postgresql_step(detail):
+    match = re.search(r'Seq Scan on (\w+)', detail)
+    return {'table': match.group(1) if match else None, 'full_scan': bool(match), 'detail': detail}
+
+
+def find_full_scans(queryset, allowed_tables=()):
+    """
+    找出执行计划中的全表扫描
+
+    Args:
+        queryset: 待检查的查询集
+        allowed_tables: 允许全表扫描的表，例如本就需要返回全部行的主表
+
+    Returns:
+        list: 全表扫描步骤的说明
+    """
+    return [
+        step['detail'] for step in explain_queryset(queryset)
+        if step['full_scan'] and step['table'] not in allowed_tables
+    ]
+
+
+class QueryPlanAssertionsMixin:
+    """
+    测试用例混入类，断言热点查询按索引执行而非全表扫描
+    """
+    def assertNoFullScan(self, queryset, allowed_tables=()):
+        full_scans = find_full_scans(queryset, allowed_tables)
+        if full_scans:
+            self.fail(f'查询执行计划退化为全表扫描：{full_scans}\nSQL: {queryset.query}')
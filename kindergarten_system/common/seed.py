@@ -0,0 +1,251 @@
+import random
+from datetime import datetime, time, timedelta
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+
+
+# 1倍规模下每个幼儿园的数据量
+DEFAULT_SEED_CONFIG = {
+    'classes': 6,
+    'children': 25,
+    'teachers': 12,
+    'areas': 6,
+    'days': 20,
+}
+
+# 种子数据的名称前缀，用于识别已生成的数据，重复运行时跳过
+SEED_NAME_PREFIX = '种子'
+
+# 种子数据账号的默认密码
+DEFAULT_SEED_PASSWORD = 'seed123456'
+
+# 每批写入的行数
+SEED_BATCH_SIZE = 2000
+
+SURNAMES = '王李张刘陈杨黄赵吴周徐孙马朱胡郭何高林罗郑梁谢宋唐许韩冯邓曹彭曾肖田董袁潘'
+GIVEN_NAME_CHARS = '子涵浩宇欣怡梓萱一诺思远雨桐若汐俊熙语嫣嘉懿明轩佳琪皓然可馨晨阳梦瑶天佑芷若'
+AREA_NAMES = ['建构区', '美工区', '阅读区', '角色区', '益智区', '科学区', '音乐区', '沙水区', '种植区', '表演区']
+CLASS_TYPES = [('small', '小'), ('middle', '中'), ('large', '大')]
+KINDERGARTEN_TYPES = ['public', 'private', 'chain']
+REGIONS = ['朝阳区', '海淀区', '浦东新区', '天河区', '南山区', '武侯区', '西湖区', '江汉区']
+# 教师职务的分配顺序：每个班一名班主任和一名配班老师，其余为生活老师
+TEACHER_POSITIONS = ['head_teacher', 'assistant_teacher']
+
+
+def kindergarten_name(index):
+    return f'{SEED_NAME_PREFIX}{index + 1:04d}幼儿园'
+
+
+def school_days(end_date, days):
+    """
+    截至 end_date（含）最近 days 个工作日，按日期升序排列
+    """
+    result = []
+    current = end_date
+    while len(result) < days:
+        if current.weekday() < 5:
+            result.append(current)
+        current -= timedelta(days=1)
+    return result[::-1]
+
+
+def _person_name(rng):
+    return rng.choice(SURNAMES) + ''.join(rng.choice(GIVEN_NAME_CHARS) for _ in range(rng.choice((1, 2))))
+
+
+def _aware(day, hour, minute):
+    return timezone.make_aware(datetime.combine(day, time(hour, minute)))
+
+
+def _seed_kindergarten(index, config, seed, end_date, password_hash):
+    """
+    生成一个幼儿园的全部数据，随机数只取决于 seed 和幼儿园序号
+    """
+    from kindergartens.models import Kindergarten
+    from classes.models import Class
+    from teachers.models import Teacher
+    from children.models import Child
+    from selections.models import SelectionArea, SelectionRecord
+    from users.models import User
+
+    rng = random.Random(f'{seed}:{index}')
+    kindergarten = Kindergarten.objects.create(
+        name=kindergarten_name(index),
+        kindergarten_type=rng.choice(KINDERGARTEN_TYPES),
+        address=f'{rng.choice(REGIONS)}{rng.randint(1, 999)}号',
+        phone=f'010{rng.randint(10000000, 99999999)}',
+        principal_name=_person_name(rng),
+        region=rng.choice(REGIONS),
+    )
+
+    # 班级按小、中、大班轮流分配，班级名称在幼儿园内唯一
+    Class.objects.bulk_create([
+        Class(
+            name=f'{CLASS_TYPES[i % 3][1]}{i // 3 + 1}班',
+            class_type=CLASS_TYPES[i % 3][0],
+            kindergarten=kindergarten,
+            classroom_location=f'{i // 3 + 1}楼{i % 3 + 1:02d}室',
+        )
+        for i in range(config['classes'])
+    ])
+    # 部分数据库批量创建后不回填主键，按唯一字段重新读取
+    classes = list(Class.objects.filter(kindergarten=kindergarten).order_by('id'))
+
+    SelectionArea.objects.bulk_create([
+        SelectionArea(
+            name=AREA_NAMES[i % len(AREA_NAMES)] + (str(i // len(AREA_NAMES) + 1) if i >= len(AREA_NAMES) else ''),
+            class_info=class_obj,
+            max_selections=rng.randint(6, 10),
+        )
+        for class_obj in classes for i in range(config['areas'])
+    ], batch_size=SEED_BATCH_SIZE)
+    areas_by_class = {}
+    for area in SelectionArea.objects.filter(class_info__kindergarten=kindergarten).order_by('id'):
+        areas_by_class.setdefault(area.class_info_id, []).append(area)
+
+    Teacher.objects.bulk_create([
+        Teacher(
+            name=_person_name(rng),
+            gender='female' if rng.random() < 0.9 else 'male',
+            kindergarten=kindergarten,
+            position=TEACHER_POSITIONS[i // len(classes)] if i < 2 * len(classes) else 'life_teacher',
+            employee_id=f'T{index + 1:05d}{i + 1:03d}',
+            phone=f'139{index + 1:05d}{i + 1:03d}',
+            hire_date=end_date - timedelta(days=rng.randint(30, 3650)),
+        )
+        for i in range(config['teachers'])
+    ], batch_size=SEED_BATCH_SIZE)
+    teachers = list(Teacher.objects.filter(kindergarten=kindergarten).order_by('id'))
+    # 前两轮教师依次担任各班的班主任和配班老师
+    through = Teacher.classes.through
+    if classes:
+        through.objects.bulk_create([
+            through(teacher_id=teacher.id, class_id=classes[i % len(classes)].id)
+            for i, teacher in enumerate(teachers[:2 * len(classes)])
+        ], batch_size=SEED_BATCH_SIZE)
+
+    age_by_type = {'small': 3, 'middle': 4, 'large': 5}
+    Child.objects.bulk_create([
+        Child(
+            name=_person_name(rng),
+            gender=rng.choice(('male', 'female')),
+            birth_date=end_date - timedelta(days=365 * age_by_type[class_obj.class_type] + rng.randint(0, 364)),
+            class_info=class_obj,
+            student_id=f'S{index + 1:05d}{class_number + 1:03d}{i + 1:03d}',
+            admission_date=end_date - timedelta(days=rng.randint(30, 700)),
+            parent_name=_person_name(rng),
+            parent_phone=f'13{rng.randint(100000000, 999999999)}',
+            # 约3%的幼儿已离园
+            is_active=rng.random() >= 0.03,
+        )
+        for class_number, class_obj in enumerate(classes) for i in range(config['children'])
+    ], batch_size=SEED_BATCH_SIZE)
+    children = list(
+        Child.objects.filter(class_info__kindergarten=kindergarten, is_active=True)
+        .order_by('id').values_list('id', 'class_info_id')
+    )
+
+    principal = User.objects.create(
+        username=f'seed{index + 1:04d}_principal',
+        password=password_hash,
+        role='principal',
+        kindergarten=kindergarten,
+    )
+    if teachers:
+        User.objects.create(
+            username=f'seed{index + 1:04d}_teacher',
+            password=password_hash,
+            role='teacher',
+            kindergarten=kindergarten,
+            teacher=teachers[0],
+        )
+
+    # 每个工作日约九成幼儿入园并选择一个未满的选区，少量记录被提前结束
+    records = []
+    rollup_keys = set()
+    for day in school_days(end_date, config['days']):
+        occupancy = {}
+        for child_id, class_id in children:
+            if rng.random() >= 0.9:
+                continue
+            available = [
+                area for area in areas_by_class.get(class_id, ())
+                if occupancy.get(area.id, 0) < area.max_selections
+            ]
+            if not available:
+                continue
+            area = rng.choice(available)
+            occupancy[area.id] = occupancy.get(area.id, 0) + 1
+            select_time = _aware(day, 8 + rng.randint(0, 2), rng.randint(0, 59))
+            records.append(SelectionRecord(
+                child_id=child_id,
+                selection_area_id=area.id,
+                date=day,
+                select_time=select_time,
+                operated_by=principal,
+                is_active=rng.random() >= 0.05,
+                created_at=select_time,
+                updated_at=select_time,
+            ))
+            rollup_keys.add((day, area.id))
+    SelectionRecord.objects.bulk_create(records, batch_size=SEED_BATCH_SIZE)
+    return kindergarten, len(children), len(records), rollup_keys
+
+
+def seed_dataset(kindergartens, config=None, seed=0, end_date=None, password=DEFAULT_SEED_PASSWORD):
+    """
+    生成规模可配置的演示和压测数据：幼儿园 × 班级 × 幼儿 × 教师 × 若干工作日的选区记录
+
+    每个幼儿园的数据只由 seed 和幼儿园序号决定，相同参数生成的数据相同。
+    已存在的种子幼儿园会跳过，增加 kindergartens 后重复运行只生成新增的幼儿园，
+    规模可以从1倍逐步扩大到10倍、100倍。批量写入不发送信号，
+    生成后统一刷新每日汇总表、搜索词元和幼儿园统计字段，并使响应缓存失效。
+
+    Args:
+        kindergartens (int): 种子幼儿园总数
+        config (dict): 每个幼儿园的数据量，键同 DEFAULT_SEED_CONFIG
+        seed (int): 随机数种子
+        end_date (date): 选区记录的最后一天，默认为当天
+        password (str): 生成的园长和教师账号的密码
+
+    Returns:
+        dict: 本次新增的幼儿园、幼儿和选区记录数
+    """
+    from kindergartens.models import Kindergarten
+    from kindergartens.counters import refresh_kindergarten_counters
+    from search.index import SEARCH_ENTITIES, index_unindexed
+    from selections.rollup import refresh_daily_rollup
+    from common.cache import INVALIDATING_MODELS, bump_model_versions
+    from users.models import User
+    from users.scope import bump_scope_version
+
+    config = {**DEFAULT_SEED_CONFIG, **(config or {})}
+    end_date = end_date or timezone.localdate()
+    existing = set(Kindergarten.objects.filter(
+        name__in=[kindergarten_name(index) for index in range(kindergartens)]
+    ).values_list('name', flat=True))
+    password_hash = make_password(password)
+
+    summary = {'kindergartens': 0, 'children': 0, 'records': 0}
+    kindergarten_ids = []
+    for index in range(kindergartens):
+        if kindergarten_name(index) in existing:
+            continue
+        with transaction.atomic():
+            kindergarten, children, records, rollup_keys = _seed_kindergarten(
+                index, config, seed, end_date, password_hash
+            )
+            refresh_daily_rollup(rollup_keys)
+        kindergarten_ids.append(kindergarten.id)
+        summary['kindergartens'] += 1
+        summary['children'] += children
+        summary['records'] += records
+
+    if kindergarten_ids:
+        for entity in SEARCH_ENTITIES:
+            index_unindexed(entity)
+        refresh_kindergarten_counters(kindergarten_ids)
+        bump_model_versions(*INVALIDATING_MODELS)
+        bump_scope_version(User.objects.filter(kindergarten_id__in=kindergarten_ids).values_list('id', flat=True))
+    return summary
@@ -0,0 +1,104 @@
+from datetime import date
+from django.core.cache import cache
+from django.test import TestCase
+from children.models import Child
+from kindergartens.counters import find_counter_mismatches
+from kindergartens.models import Kindergarten
+from search.models import SearchToken
+from selections.models import SelectionRecord
+from selections.rollup import verify_daily_rollup
+from users.models import User
+from .benchmark import BENCHMARK_CASES, compare_results, run_benchmarks
+from .seed import school_days, seed_dataset
+
+
+SMALL_CONFIG = {'classes': 2, 'children': 5, 'teachers': 4, 'areas': 2, 'days': 3}
+END_DATE = date(2026, 3, 13)
+
+
+def snapshot():
+    return (
+        list(Child.objects.order_by('student_id').values_list('student_id', 'name', 'gender', 'birth_date')),
+        list(SelectionRecord.objects.order_by('child__student_id', 'date').values_list(
+            'child__student_id', 'date', 'selection_area__name', 'is_active'
+        )),
+    )
+
+
+class SeedDataTests(TestCase):
+    """
+    种子数据生成测试
+    """
+    def setUp(self):
+        cache.clear()
+
+    def test_same_seed_generates_same_data(self):
+        seed_dataset(2, SMALL_CONFIG, seed=7, end_date=END_DATE)
+        first = snapshot()
+        # 删除班级时幼儿不会级联删除
+        for model in (User, Child, Kindergarten):
+            model.objects.all().delete()
+
+        seed_dataset(2, SMALL_CONFIG, seed=7, end_date=END_DATE)
+        self.assertEqual(snapshot(), first)
+        self.assertTrue(first[1])
+
+    def test_scaling_up_only_adds_new_kindergartens(self):
+        seed_dataset(1, SMALL_CONFIG, end_date=END_DATE)
+        first = snapshot()
+
+        summary = seed_dataset(3, SMALL_CONFIG, end_date=END_DATE)
+        self.assertEqual(summary['kindergartens'], 2)
+        self.assertEqual(Kindergarten.objects.count(), 3)
+        children, records = snapshot()
+        self.assertTrue(set(first[0]) < set(children))
+        self.assertTrue(set(first[1]) < set(records))
+        self.assertEqual(seed_dataset(3, SMALL_CONFIG, end_date=END_DATE)['kindergartens'], 0)
+
+    def test_derived_data_is_consistent(self):
+        # 选区汇总在事务提交后刷新
+        with self.captureOnCommitCallbacks(execute=True):
+            seed_dataset(2, SMALL_CONFIG, end_date=END_DATE)
+        self.assertEqual(verify_daily_rollup(), [])
+        self.assertEqual(find_counter_mismatches(), [])
+        self.assertTrue(SearchToken.objects.exists())
+        # 选区记录只在工作日生成
+        self.assertLessEqual(
+            {record_date.weekday() for record_date in SelectionRecord.objects.values_list('date', flat=True)},
+            set(range(5))
+        )
+        self.assertEqual(school_days(END_DATE, 3), [date(2026, 3, 11), date(2026, 3, 12), date(2026, 3, 13)])
+
+
+class BenchmarkTests(TestCase):
+    """
+    接口性能测量测试
+    """
+    def test_measures_every_group(self):
+        seed_dataset(1, SMALL_CONFIG)
+        names = {'children.list', 'children.statistics', 'dashboard.7_days', 'children.export_data', 'children.import'}
+        results = run_benchmarks([case for case in BENCHMARK_CASES if case.name in names], rounds=1)
+
+        self.assertEqual(set(results), names)
+        for result in results.values():
+            self.assertLess(result['status'], 300)
+            self.assertGreater(result['queries'], 0)
+            self.assertGreater(result['peak_memory_kib'], 0)
+        # 导入在请求结束后回滚
+        self.assertEqual(Child.objects.count(), 10)
+
+    def test_compare_results(self):
+        baseline = {'1': {'a': {
+            'status': 200, 'queries': 5, 'latency_ms': {'median': 10.0}, 'peak_memory_kib': 100.0,
+        }}}
+
+        def result(**changes):
+            return {'1': {'a': {**baseline['1']['a'], **changes}}}
+
+        self.assertEqual(compare_results(result(queries=4, latency_ms={'median': 25.0}), baseline), [])
+        self.assertEqual(len(compare_results(result(queries=6), baseline)), 1)
+        self.assertEqual(len(compare_results(result(status=500), baseline)), 1)
+        self.assertEqual(len(compare_results(result(latency_ms={'median': 40.0}), baseline)), 1)
+        self.assertEqual(len(compare_results(result(peak_memory_kib=1000.0), baseline)), 1)
+        # 基线中没有的规模和用例不比较
+        self.assertEqual(compare_results({'10': result(queries=50)['1']}, baseline), [])
@@ -0,0 +1,43 @@
+"""
+gunicorn 配置
+
+SERVER_MODE 选择服务方式：
+- asgi（默认）：uvicorn 工作进程运行 asgi.py，异步视图（仪表盘、班级看板、选项列表）
+  在事件循环中并发处理，看板事件流等长连接不占用工作进程
+- wsgi：同步工作进程运行 wsgi.py，不支持事件流
+
+看板事件只能通过 EVENT_BROKER_BACKEND 配置的代理送达订阅者。默认的进程内代理不能跨进程，
+因此 asgi 模式下未配置跨进程代理（如 common.events.CacheBroker）时默认只启动一个工作进程；
+显式设置 GUNICORN_WORKERS 时以设置为准。
+
+用法：gunicorn -c gunicorn.conf.py
+"""
+import multiprocessing
+import os
+
+
+SERVER_MODE = os.environ.get('SERVER_MODE', 'asgi').lower()
+if SERVER_MODE not in ('asgi', 'wsgi'):
+    raise ValueError(f'SERVER_MODE 只能为 asgi 或 wsgi：{SERVER_MODE}')
+
+wsgi_app = f'kindergarten_system.{SERVER_MODE}:application'
+if SERVER_MODE == 'asgi':
+    worker_class = 'uvicorn_worker.UvicornWorker'
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+IN_PROCESS_BROKER = os.environ.get('EVENT_BROKER_BACKEND', 'common.events.InProcessBroker') == 'common.events.InProcessBroker'
+if SERVER_MODE == 'asgi' and IN_PROCESS_BROKER:
+    # 多个工作进程使用进程内代理时，写入请求所在进程之外的事件流连接收不到看板事件
+    default_workers = 1
+else:
+    default_workers = multiprocessing.cpu_count() * 2 + 1
+workers = int(os.environ.get('GUNICORN_WORKERS', default_workers))
+# 同步模式下每个工作进程的线程数，异步模式不使用
+threads = int(os.environ.get('GUNICORN_THREADS', 1))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
+# 工作进程处理一定数量的请求后重启，释放内存
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 100))
+
+accesslog = '-'
+errorlog = '-'
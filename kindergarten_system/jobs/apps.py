@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+
+
+class JobsConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'jobs'
+
+    def ready(self):
+        # 导入各应用的 tasks 模块，注册其中的后台任务
+        from django.utils.module_loading import autodiscover_modules
+        autodiscover_modules('tasks')
@@ -0,0 +1,61 @@
+import os
+import socket
+import time
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+from jobs.queue import claim_next_job, purge_finished_jobs, requeue_stale_jobs
+from jobs.runner import execute_job
+
+
+class Command(BaseCommand):
+    """
+    后台任务工作进程，轮询数据库中的等待中任务并逐个执行
+    """
+    help = '执行后台导入导出任务'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='执行完当前等待中的任务后退出')
+        parser.add_argument('--poll-interval', type=float, default=2.0, help='没有任务时的轮询间隔秒数')
+        parser.add_argument('--max-jobs', type=int, default=0, help='执行指定数量的任务后退出，0 表示不限')
+        parser.add_argument(
+            '--stale-after',
+            type=int,
+            default=3600,
+            help='执行中任务超过该秒数未更新进度时视为工作进程已退出'
+        )
+        parser.add_argument('--max-attempts', type=int, default=3, help='任务最多执行次数')
+        parser.add_argument('--purge-days', type=int, default=0, help='启动时删除结束超过该天数的任务，0 表示不删除')
+
+    def handle(self, *args, **options):
+        worker_name = f'{socket.gethostname()}:{os.getpid()}'
+        self.stdout.write(f'工作进程 {worker_name} 已启动')
+
+        if options['purge_days']:
+            purged = purge_finished_jobs(options['purge_days'])
+            self.stdout.write(f'已删除 {purged} 个过期任务')
+
+        processed = 0
+        while True:
+            # 与请求结束时一样清理失效的数据库连接，在外层事务中（如测试）运行时跳过
+            if not connection.in_atomic_block:
+                close_old_connections()
+            requeued, failed = requeue_stale_jobs(options['stale_after'], options['max_attempts'])
+            if requeued or failed:
+                self.stdout.write(f'超时任务：重新排队 {requeued} 个，标记失败 {failed} 个')
+
+            job = claim_next_job(worker_name)
+            if job is None:
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+                continue
+
+            self.stdout.write(f'开始执行任务 {job.pk} {job.name}')
+            job = execute_job(job)
+            self.stdout.write(f'任务 {job.pk} {job.get_status_display()} {job.message}')
+
+            processed += 1
+            if options['max_jobs'] and processed >= options['max_jobs']:
+                break
+
+        self.stdout.write(f'工作进程退出，共执行 {processed} 个任务')
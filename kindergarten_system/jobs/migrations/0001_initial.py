@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:41
+
+import django.core.serializers.json
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(help_text='如 children.import_data', max_length=100, verbose_name='任务名称')),
+                ('method', models.CharField(max_length=10, verbose_name='请求方法')),
+                ('path', models.CharField(max_length=255, verbose_name='请求路径')),
+                ('query_params', models.JSONField(blank=True, default=dict, verbose_name='查询参数')),
+                ('form_data', models.JSONField(blank=True, default=dict, verbose_name='表单数据')),
+                ('upload', models.FileField(blank=True, null=True, upload_to='jobs/uploads/%Y%m%d/', verbose_name='上传文件')),
+                ('upload_field', models.CharField(blank=True, default='', max_length=50, verbose_name='上传文件字段名')),
+                ('status', models.CharField(choices=[('pending', '等待执行'), ('running', '执行中'), ('succeeded', '已完成'), ('failed', '执行失败')], default='pending', max_length=20, verbose_name='任务状态')),
+                ('progress', models.PositiveSmallIntegerField(default=0, help_text='0-100', verbose_name='进度')),
+                ('message', models.CharField(blank=True, default='', max_length=255, verbose_name='进度说明')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='执行次数')),
+                ('worker', models.CharField(blank=True, default='', max_length=100, verbose_name='工作进程')),
+                ('status_code', models.PositiveSmallIntegerField(blank=True, null=True, verbose_name='响应状态码')),
+                ('result', models.JSONField(blank=True, encoder=django.core.serializers.json.DjangoJSONEncoder, null=True, verbose_name='结果数据')),
+                ('result_file', models.FileField(blank=True, null=True, upload_to='jobs/results/%Y%m%d/', verbose_name='结果文件')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='创建时间')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='开始时间')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='结束时间')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+                ('created_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='jobs', to=settings.AUTH_USER_MODEL, verbose_name='提交用户')),
+            ],
+            options={
+                'verbose_name': '后台任务',
+                'verbose_name_plural': '后台任务',
+                'db_table': 'background_jobs',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'created_at'], name='job_status_created_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,96 @@
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+from django.utils import timezone
+
+
+# 后台任务模型
+class Job(models.Model):
+    """
+    后台任务模型，数据库即任务队列
+
+    导入导出请求以任务的形式保存任务名称、请求参数和上传文件，
+    由 run_jobs 工作进程调用注册的任务函数执行，执行结果和生成的文件保存在任务中。
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_SUCCEEDED = 'succeeded'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, '等待执行'),
+        (STATUS_RUNNING, '执行中'),
+        (STATUS_SUCCEEDED, '已完成'),
+        (STATUS_FAILED, '执行失败'),
+    ]
+
+    # 任务名称，即注册的任务函数名称，格式为“应用名称.操作名称”
+    name = models.CharField(
+        '任务名称',
+        max_length=100,
+        help_text='如 children.import_data'
+    )
+
+    # 提交任务的请求信息，请求方法和路径仅用于记录
+    method = models.CharField('请求方法', max_length=10)
+    path = models.CharField('请求路径', max_length=255)
+    query_params = models.JSONField('查询参数', default=dict, blank=True)
+    form_data = models.JSONField('表单数据', default=dict, blank=True)
+    upload = models.FileField(
+        '上传文件',
+        upload_to='jobs/uploads/%Y%m%d/',
+        blank=True,
+        null=True
+    )
+    upload_field = models.CharField('上传文件字段名', max_length=50, blank=True, default='')
+
+    # 执行状态
+    status = models.CharField(
+        '任务状态',
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default=STATUS_PENDING
+    )
+    progress = models.PositiveSmallIntegerField('进度', default=0, help_text='0-100')
+    message = models.CharField('进度说明', max_length=255, blank=True, default='')
+    attempts = models.PositiveSmallIntegerField('执行次数', default=0)
+    worker = models.CharField('工作进程', max_length=100, blank=True, default='')
+
+    # 执行结果
+    status_code = models.PositiveSmallIntegerField('响应状态码', blank=True, null=True)
+    result = models.JSONField('结果数据', blank=True, null=True, encoder=DjangoJSONEncoder)
+    result_file = models.FileField(
+        '结果文件',
+        upload_to='jobs/results/%Y%m%d/',
+        blank=True,
+        null=True
+    )
+
+    # 提交任务的用户，工作进程以该用户身份执行
+    created_by = models.ForeignKey(
+        'users.User',
+        on_delete=models.CASCADE,
+        related_name='jobs',
+        verbose_name='提交用户'
+    )
+
+    # 时间戳
+    created_at = models.DateTimeField('创建时间', default=timezone.now)
+    started_at = models.DateTimeField('开始时间', blank=True, null=True)
+    finished_at = models.DateTimeField('结束时间', blank=True, null=True)
+    updated_at = models.DateTimeField('更新时间', auto_now=True)
+
+    class Meta:
+        db_table = 'background_jobs'
+        verbose_name = '后台任务'
+        verbose_name_plural = '后台任务'
+        ordering = ['-created_at']
+        indexes = [
+            # 工作进程按状态和创建时间领取任务
+            models.Index(fields=['status', 'created_at'], name='job_status_created_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.name} #{self.pk} ({self.get_status_display()})'
+
+    @property
+    def is_finished(self):
+        return self.status in (self.STATUS_SUCCEEDED, self.STATUS_FAILED)
@@ -0,0 +1,52 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.utils import timezone
+
+
+# 当前正在执行的任务，不在工作进程中执行时为 None
+_current_job = ContextVar('current_job', default=None)
+
+# 两次写入进度之间的最小间隔秒数
+PROGRESS_MIN_INTERVAL = 1.0
+
+
+@contextmanager
+def job_context(job):
+    """
+    在工作进程中执行任务时设置当前任务，供 report_progress 使用
+    """
+    token = _current_job.set({'job': job, 'last_report': 0.0})
+    try:
+        yield
+    finally:
+        _current_job.reset(token)
+
+
+def report_progress(progress=None, message=None, force=False):
+    """
+    报告当前任务的进度
+
+    在请求中直接执行时不做任何操作，因此导入导出代码可以无条件调用。
+    写入按时间间隔节流，不能在事务中调用，否则轮询方在事务提交前看不到进度。
+
+    Args:
+        progress (int): 进度百分比（0-100），为 None 时只更新说明
+        message (str): 进度说明
+        force (bool): 忽略节流立即写入
+    """
+    state = _current_job.get()
+    if state is None:
+        return
+    now = time.monotonic()
+    if not force and now - state['last_report'] < PROGRESS_MIN_INTERVAL:
+        return
+    state['last_report'] = now
+
+    job = state['job']
+    fields = {'updated_at': timezone.now()}
+    if progress is not None:
+        fields['progress'] = max(0, min(int(progress), 100))
+    if message is not None:
+        fields['message'] = message[:255]
+    type(job).objects.filter(pk=job.pk).update(**fields)
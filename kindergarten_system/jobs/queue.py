@@ -0,0 +1,129 @@
+import os
+from datetime import timedelta
+from django.db.models import F
+from django.http import QueryDict
+from django.utils import timezone
+from .models import Job
+
+
+# 请求中指定后台执行的参数名
+BACKGROUND_PARAM = 'background'
+
+
+def wants_background(request):
+    """
+    判断请求是否要求以后台任务执行，支持查询参数和表单字段
+    """
+    value = request.query_params.get(BACKGROUND_PARAM)
+    if value is None and isinstance(request.data, QueryDict):
+        value = request.data.get(BACKGROUND_PARAM)
+    return str(value).lower() in ('1', 'true', 'yes')
+
+
+def enqueue_job(name, request, query_params, form_data, upload_field=None, upload=None):
+    """
+    将任务保存到队列，由 run_jobs 工作进程执行
+
+    Args:
+        name (str): 已注册的任务名称
+        request: DRF 请求对象，记录请求方法、路径和提交任务的用户
+        query_params (dict): 查询参数，{名称: [值, ...]}
+        form_data (dict): 表单数据，{名称: [值, ...]}
+        upload_field (str): 上传文件的字段名
+        upload: 上传文件，保存到媒体目录供工作进程读取
+
+    Returns:
+        Job: 新建的任务
+    """
+    job = Job(
+        name=name,
+        method=request.method,
+        path=request.path,
+        query_params=query_params,
+        form_data=form_data,
+        created_by=request.user
+    )
+    if upload is not None:
+        job.upload_field = upload_field
+        job.upload.save(os.path.basename(upload.name), upload, save=False)
+    job.save()
+    return job
+
+
+def claim_next_job(worker_name):
+    """
+    领取最早创建的等待中任务
+
+    通过带状态条件的 UPDATE 领取，多个工作进程同时领取同一任务时只有一个会成功。
+
+    Returns:
+        Job: 领取到的任务，没有等待中的任务时返回 None
+    """
+    candidates = Job.objects.filter(status=Job.STATUS_PENDING).order_by('created_at', 'id').values_list(
+        'pk', flat=True
+    )[:10]
+    for pk in candidates:
+        now = timezone.now()
+        claimed = Job.objects.filter(pk=pk, status=Job.STATUS_PENDING).update(
+            status=Job.STATUS_RUNNING,
+            worker=worker_name,
+            attempts=F('attempts') + 1,
+            progress=0,
+            message='',
+            started_at=now,
+            updated_at=now
+        )
+        if claimed:
+            return Job.objects.select_related('created_by').get(pk=pk)
+    return None
+
+
+def requeue_stale_jobs(stale_after, max_attempts):
+    """
+    处理工作进程异常退出后遗留的执行中任务
+
+    超过 stale_after 秒没有更新进度的任务重新排队，执行次数达到上限的标记为失败。
+
+    Returns:
+        tuple: (重新排队数, 标记失败数)
+    """
+    now = timezone.now()
+    stale = Job.objects.filter(
+        status=Job.STATUS_RUNNING,
+        updated_at__lt=now - timedelta(seconds=stale_after)
+    )
+    failed = stale.filter(attempts__gte=max_attempts).update(
+        status=Job.STATUS_FAILED,
+        message='任务执行超时',
+        finished_at=now,
+        updated_at=now
+    )
+    requeued = stale.filter(attempts__lt=max_attempts).update(
+        status=Job.STATUS_PENDING,
+        worker='',
+        message='任务执行超时，重新排队',
+        updated_at=now
+    )
+    return requeued, failed
+
+
+def purge_finished_jobs(days):
+    """
+    删除结束超过指定天数的任务及其上传文件和结果文件
+
+    Returns:
+        int: 删除的任务数
+    """
+    cutoff = timezone.now() - timedelta(days=days)
+    jobs = Job.objects.filter(
+        status__in=[Job.STATUS_SUCCEEDED, Job.STATUS_FAILED],
+        finished_at__lt=cutoff
+    )
+    count = 0
+    for job in jobs.iterator():
+        for field in (job.upload, job.result_file):
+            if field:
+                field.delete(save=False)
+        job.delete()
+        count += 1
+    return count
@@ -0,0 +1,77 @@
+from django.http import QueryDict
+from rest_framework import status
+from rest_framework.response import Response
+from .queue import BACKGROUND_PARAM, enqueue_job, wants_background
+from .serializers import JobSerializer
+
+
+# 已注册的任务：任务名称 -> 任务函数
+_tasks = {}
+
+
+def register_task(name):
+    """
+    注册可以在后台执行的任务函数，任务名称为“应用名称.操作名称”，如 children.import_data
+
+    任务函数的参数为 (user, params, upload)，分别是执行操作的用户、请求参数（QueryDict）
+    和上传文件（没有时为 None），返回 DRF 响应或文件响应。
+    视图在请求中直接调用任务函数，run_jobs 工作进程以提交任务的用户身份调用同一函数。
+    """
+    def decorator(func):
+        _tasks[name] = func
+        return func
+    return decorator
+
+
+def get_task(name):
+    """
+    按名称获取已注册的任务函数
+    """
+    try:
+        return _tasks[name]
+    except KeyError:
+        raise LookupError(f'未注册的任务: {name}')
+
+
+def task_params(*sources):
+    """
+    将 {名称: [值, ...]} 形式的参数合并为任务函数使用的 QueryDict
+    """
+    params = QueryDict(mutable=True)
+    for source in sources:
+        for key, values in source.items():
+            params.setlist(key, list(values))
+    return params
+
+
+def _request_params(request):
+    """
+    获取请求的查询参数和表单数据，不含上传文件和 background 参数
+    """
+    query_params = {key: values for key, values in request.query_params.lists() if key != BACKGROUND_PARAM}
+    form_data = {}
+    if isinstance(request.data, QueryDict):
+        form_data = {
+            key: values
+            for key, values in request.data.lists()
+            if key != BACKGROUND_PARAM and key not in request.FILES
+        }
+    return query_params, form_data
+
+
+def run_task(request, name):
+    """
+    在视图中执行已注册的任务
+
+    请求带有 background=true 时保存为后台任务并立即返回任务信息（202），由 run_jobs 工作进程执行；
+    否则在请求中直接调用任务函数。认证和权限检查由视图完成。
+    """
+    query_params, form_data = _request_params(request)
+    # 导入接口只有一个上传文件
+    upload_field, upload = next(iter(request.FILES.items()), (None, None))
+
+    if wants_background(request):
+        job = enqueue_job(name, request, query_params, form_data, upload_field, upload)
+        serializer = JobSerializer(job, context={'request': request})
+        return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
+    return get_task(name)(request.user, task_params(query_params, form_data), upload)
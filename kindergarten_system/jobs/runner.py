@@ -0,0 +1,99 @@
+import os
+import re
+import tempfile
+from urllib.parse import unquote
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.utils import timezone
+from rest_framework.exceptions import APIException
+from rest_framework.response import Response
+from .models import Job
+from .progress import job_context
+from .registry import get_task, task_params
+from common.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def _attachment_filename(response, default):
+    """
+    从 Content-Disposition 中解析下载文件名
+    """
+    disposition = response.get('Content-Disposition', '')
+    match = re.search(r"filename\*=utf-8''([^;]+)", disposition, re.IGNORECASE)
+    if match:
+        return unquote(match.group(1))
+    match = re.search(r'filename="?([^";]+)"?', disposition)
+    if match:
+        return match.group(1)
+    return default
+
+
+def _error_message(data):
+    if isinstance(data, dict):
+        for key in ('error', 'detail', 'message'):
+            if key in data:
+                return str(data[key])
+    return str(data)
+
+
+def store_response(job, response):
+    """
+    保存操作的执行结果
+
+    DRF 响应保存响应数据，文件响应（含流式响应）逐块写入临时文件后保存为结果文件。
+    """
+    job.status_code = response.status_code
+    job.status = Job.STATUS_SUCCEEDED if response.status_code < 400 else Job.STATUS_FAILED
+
+    if isinstance(response, Response):
+        job.result = response.data
+        if job.status == Job.STATUS_FAILED:
+            job.message = _error_message(response.data)[:255]
+        return
+
+    filename = _attachment_filename(response, f'{job.name}-{job.pk}')
+    if response.streaming:
+        with tempfile.TemporaryFile() as output:
+            for chunk in response.streaming_content:
+                output.write(chunk)
+            output.seek(0)
+            job.result_file.save(filename, File(output), save=False)
+    else:
+        job.result_file.save(filename, ContentFile(response.content), save=False)
+    # 不调用 response.close()，它会发送 request_finished 信号关闭当前数据库连接；
+    # 文件响应持有的临时文件随响应对象回收时关闭
+
+
+def execute_job(job):
+    """
+    执行已领取的任务：以提交任务的用户身份调用注册的任务函数并保存结果
+    """
+    try:
+        task = get_task(job.name)
+        params = task_params(job.query_params, job.form_data)
+        upload = None
+        if job.upload:
+            upload = File(job.upload.open('rb'), name=os.path.basename(job.upload.name))
+        # 流式响应在保存结果时才真正执行，保存也需要在任务上下文中进行
+        with job_context(job):
+            try:
+                response = task(job.created_by, params, upload)
+            except APIException as e:
+                # 参数校验等错误与在请求中执行时一样记录状态码和错误信息
+                response = Response(e.detail, status=e.status_code)
+            store_response(job, response)
+    except Exception as e:
+        logger.exception(f'后台任务 {job.pk} 执行失败')
+        job.status = Job.STATUS_FAILED
+        job.message = f'任务执行失败: {str(e)}'[:255]
+    finally:
+        if job.upload:
+            job.upload.close()
+
+    job.finished_at = timezone.now()
+    if job.status == Job.STATUS_SUCCEEDED:
+        job.progress = 100
+        job.message = job.message or '任务已完成'
+    job.save()
+    return job
@@ -0,0 +1,30 @@
+from rest_framework import serializers
+from django.urls import reverse
+from .models import Job
+
+
+class JobSerializer(serializers.ModelSerializer):
+    """
+    后台任务序列化器
+    """
+    status_display = serializers.CharField(source='get_status_display', read_only=True)
+    download_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Job
+        fields = [
+            'id', 'name', 'status', 'status_display', 'progress', 'message',
+            'status_code', 'result', 'download_url',
+            'created_at', 'started_at', 'finished_at'
+        ]
+        read_only_fields = fields
+
+    def get_download_url(self, obj):
+        """
+        结果文件的下载地址，没有结果文件时为 None
+        """
+        if not obj.result_file:
+            return None
+        url = reverse('job-download', kwargs={'pk': obj.pk})
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
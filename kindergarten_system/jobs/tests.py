@@ -0,0 +1,171 @@
+import shutil
+import tempfile
+from datetime import timedelta
+from io import BytesIO, StringIO
+import pandas as pd
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from kindergartens.models import Kindergarten
+from classes.models import Class
+from children.models import Child
+from selections.models import SelectionArea, SelectionRecord
+from users.models import User
+from .models import Job
+from .queue import claim_next_job, requeue_stale_jobs
+
+
+class BackgroundJobTests(TestCase):
+    """
+    后台任务提交、执行、轮询和下载测试
+    """
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.media_root = tempfile.mkdtemp()
+        cls.media_override = override_settings(MEDIA_ROOT=cls.media_root)
+        cls.media_override.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.media_override.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+        super().tearDownClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.kindergarten = Kindergarten.objects.create(name='阳光幼儿园')
+        cls.class_obj = Class.objects.create(name='大一班', kindergarten=cls.kindergarten)
+        cls.principal = User.objects.create_user(
+            username='principal', password='pass', role='principal', kindergarten=cls.kindergarten
+        )
+        cls.other = User.objects.create_user(
+            username='other', password='pass', role='principal', kindergarten=cls.kindergarten
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.principal)
+
+    def run_worker(self):
+        call_command('run_jobs', '--once', stdout=StringIO())
+
+    def make_roster(self, count):
+        output = BytesIO()
+        pd.DataFrame({
+            '幼儿姓名(*)': [f'幼儿{i}' for i in range(count)],
+            '性别(*)': ['男'] * count,
+            '出生日期(*)': ['2020-01-01'] * count,
+            '班级名称(*)': ['大一班'] * count,
+            '家长姓名': [''] * count,
+            '家长手机号': [''] * count,
+        }).to_excel(output, index=False)
+        return SimpleUploadedFile('roster.xlsx', output.getvalue())
+
+    def test_import_runs_in_worker(self):
+        response = self.client.post(
+            '/api/children/import_data/',
+            {'file': self.make_roster(5), 'background': 'true'},
+            format='multipart'
+        )
+        self.assertEqual(response.status_code, 202)
+        job_id = response.data['id']
+        self.assertEqual(response.data['status'], Job.STATUS_PENDING)
+        self.assertFalse(Child.objects.exists())
+
+        self.run_worker()
+
+        response = self.client.get(f'/api/jobs/{job_id}/')
+        self.assertEqual(response.data['status'], Job.STATUS_SUCCEEDED)
+        self.assertEqual(response.data['progress'], 100)
+        self.assertEqual(response.data['status_code'], 201)
+        self.assertEqual(response.data['result']['created_count'], 5)
+        self.assertEqual(Child.objects.count(), 5)
+
+    def test_export_result_is_downloadable(self):
+        area = SelectionArea.objects.create(name='建构区', class_info=self.class_obj)
+        child = Child.objects.create(name='张三', class_info=self.class_obj)
+        SelectionRecord.objects.create(child=child, selection_area=area)
+
+        response = self.client.get(
+            '/api/selections/selection-records/export/', {'background': '1', 'file_format': 'csv'}
+        )
+        self.assertEqual(response.status_code, 202)
+        self.run_worker()
+
+        job = self.client.get(f"/api/jobs/{response.data['id']}/").data
+        self.assertEqual(job['status'], Job.STATUS_SUCCEEDED)
+        self.assertIsNotNone(job['download_url'])
+
+        download = self.client.get(f"/api/jobs/{job['id']}/download/")
+        content = b''.join(download.streaming_content).decode('utf-8-sig')
+        self.assertTrue(content.startswith('幼儿姓名,选区名称,所属班级,选择时间,备注'))
+        self.assertIn('张三,建构区,大一班', content)
+
+    def test_failed_action_marks_job_failed(self):
+        response = self.client.post(
+            '/api/children/import_data/',
+            {'file': SimpleUploadedFile('roster.xlsx', b'not an excel file'), 'background': 'true'},
+            format='multipart'
+        )
+        self.run_worker()
+        job = Job.objects.get(pk=response.data['id'])
+        self.assertEqual(job.status, Job.STATUS_FAILED)
+        self.assertEqual(job.status_code, 500)
+        self.assertIn('导入失败', job.message)
+
+    def test_worker_runs_registered_task_by_name(self):
+        # 工作进程按任务名称调用任务函数，不依赖保存的请求路径
+        job = Job.objects.create(name='children.export_template', method='GET', path='', created_by=self.principal)
+        self.run_worker()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.STATUS_SUCCEEDED)
+        self.assertTrue(job.result_file.name.endswith('.xlsx'))
+
+    def test_validation_error_is_recorded(self):
+        response = self.client.post('/api/children/import_data/', {'background': 'true'}, format='multipart')
+        self.assertEqual(response.status_code, 202)
+        self.run_worker()
+        job = Job.objects.get(pk=response.data['id'])
+        self.assertEqual(job.status, Job.STATUS_FAILED)
+        self.assertEqual(job.status_code, 400)
+        self.assertIn('file', job.result)
+
+    def test_export_uses_submitter_scope(self):
+        area = SelectionArea.objects.create(name='建构区', class_info=self.class_obj)
+        child = Child.objects.create(name='张三', class_info=self.class_obj)
+        SelectionRecord.objects.create(child=child, selection_area=area)
+        other_kindergarten = Kindergarten.objects.create(name='月亮幼儿园')
+        outsider = User.objects.create_user(
+            username='outsider', password='pass', role='principal', kindergarten=other_kindergarten
+        )
+        client = APIClient()
+        client.force_authenticate(user=outsider)
+
+        response = client.get('/api/selections/selection-records/export/', {'background': '1', 'file_format': 'csv'})
+        self.run_worker()
+        download = client.get(f"/api/jobs/{response.data['id']}/download/")
+        content = b''.join(download.streaming_content).decode('utf-8-sig')
+        self.assertNotIn('张三', content)
+
+    def test_jobs_are_visible_to_their_owner_only(self):
+        response = self.client.get('/api/selections/selection-records/export/', {'background': '1'})
+        other_client = APIClient()
+        other_client.force_authenticate(user=self.other)
+        self.assertEqual(other_client.get(f"/api/jobs/{response.data['id']}/").status_code, 404)
+
+    def test_job_is_claimed_once_and_stale_jobs_are_requeued(self):
+        job = Job.objects.create(name='test', method='GET', path='/api/jobs/', created_by=self.principal)
+        self.assertEqual(claim_next_job('worker-a').pk, job.pk)
+        self.assertIsNone(claim_next_job('worker-b'))
+
+        Job.objects.filter(pk=job.pk).update(updated_at=timezone.now() - timedelta(hours=2))
+        self.assertEqual(requeue_stale_jobs(stale_after=3600, max_attempts=3), (1, 0))
+        self.assertEqual(Job.objects.get(pk=job.pk).status, Job.STATUS_PENDING)
+
+        claim_next_job('worker-a')
+        Job.objects.filter(pk=job.pk).update(updated_at=timezone.now() - timedelta(hours=2), attempts=3)
+        self.assertEqual(requeue_stale_jobs(stale_after=3600, max_attempts=3), (0, 1))
+        self.assertEqual(Job.objects.get(pk=job.pk).status, Job.STATUS_FAILED)
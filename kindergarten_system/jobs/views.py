@@ -0,0 +1,41 @@
+import os
+from django.http import FileResponse
+from rest_framework import viewsets, status
+from rest_framework.decorators import action
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from .models import Job
+from .serializers import JobSerializer
+
+
+class JobViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    后台任务视图集，用于轮询任务进度和下载结果文件
+    """
+    queryset = Job.objects.all()
+    serializer_class = JobSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        """
+        系统所有者可以查看所有任务，其他用户只能查看自己提交的任务
+        """
+        queryset = super().get_queryset()
+        user = self.request.user
+        if hasattr(user, 'role') and user.role == 'owner':
+            return queryset
+        return queryset.filter(created_by=user)
+
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        """
+        下载任务的结果文件
+        """
+        job = self.get_object()
+        if job.status != Job.STATUS_SUCCEEDED or not job.result_file:
+            return Response({'error': '任务没有可下载的结果文件'}, status=status.HTTP_404_NOT_FOUND)
+        return FileResponse(
+            job.result_file.open('rb'),
+            as_attachment=True,
+            filename=os.path.basename(job.result_file.name)
+        )
@@ -3,6 +3,10 @@ ASGI config for kindergarten_system project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Real-time endpoints such as the class board event stream
+(``/api/selections/class-board/<class_id>/events/``) hold the connection
+open and must be served through this application by an ASGI server.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
 """
@@ -43,12 +43,15 @@ INSTALLED_APPS = [
     'rest_framework',
     'corsheaders',
     # 自定义应用
+    'common',
     'users',
     'kindergartens',
     'classes',
     'teachers',
     'children',
     'selections',
+    'jobs',
+    'search',
 ]
 
 MIDDLEWARE = [
@@ -180,7 +183,7 @@ CORS_ALLOW_ALL_ORIGINS = True
 # REST Framework配置
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'users.authentication.ClaimsJWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
@@ -197,12 +200,39 @@ REST_FRAMEWORK = {
 # 自定义用户模型
 AUTH_USER_MODEL = 'users.User'
 
+# 缓存配置，默认使用进程内缓存；多进程部署时需通过环境变量配置共享缓存，
+# 否则用户数据范围缓存的失效只在当前进程生效，认证时也不会信任令牌中的数据范围声明
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', 'kindergarten-system'),
+    }
+}
+
+# 用户数据范围（班级ID集合）缓存时间（秒）
+USER_SCOPE_CACHE_TIMEOUT = int(os.environ.get('USER_SCOPE_CACHE_TIMEOUT', 3600))
+
+# 参考数据接口的响应缓存使用的缓存别名和缓存时间（秒）
+# 本地内存缓存只在单个进程内有效，多进程部署时应配置数据库或文件缓存，使失效在进程间生效
+RESPONSE_CACHE_ALIAS = os.environ.get('RESPONSE_CACHE_ALIAS', 'default')
+RESPONSE_CACHE_TIMEOUT = int(os.environ.get('RESPONSE_CACHE_TIMEOUT', 300))
+
+# 实时事件（班级看板推送）使用的事件代理和事件流心跳间隔（秒）
+# 默认的进程内代理只能推送给同一进程的连接，多进程部署时应使用 common.events.CacheBroker，
+# 它通过共享缓存（不能是本地内存缓存）轮询传递事件
+EVENT_BROKER_BACKEND = os.environ.get('EVENT_BROKER_BACKEND', 'common.events.InProcessBroker')
+EVENT_BROKER_POLL_INTERVAL = float(os.environ.get('EVENT_BROKER_POLL_INTERVAL', 0.5))
+EVENT_STREAM_HEARTBEAT = int(os.environ.get('EVENT_STREAM_HEARTBEAT', 15))
+
 # JWT配置
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': datetime.timedelta(days=1),
     'REFRESH_TOKEN_LIFETIME': datetime.timedelta(days=7),
 }
 
+# 写入访问令牌的班级ID数量上限，超过时改由服务端缓存提供
+JWT_CLASS_IDS_CLAIM_LIMIT = 100
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
@@ -33,6 +33,10 @@ api_urlpatterns = [
     # 选区应用路由
     path('selections/', include('selections.urls')),
     path('children/', include('children.urls')),
+    # 后台任务路由
+    path('jobs/', include('jobs.urls')),
+    # 全局搜索路由
+    path('search/', include('search.urls')),
     # 其他应用的路由将在这里添加
 
 ]
@@ -48,7 +52,9 @@ def root_view(request):
             'classes': '/classes/',
             'teachers': '/teachers/',
             'selections': '/selections/',
-            'children': '/children/'
+            'children': '/children/',
+            'jobs': '/jobs/',
+            'search': '/search/'
         }
     }, json_dumps_params={'ensure_ascii': False})
 
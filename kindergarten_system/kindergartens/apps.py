@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class KindergartensConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'kindergartens'
+
+    def ready(self):
+        # 注册幼儿园统计字段的维护信号
+        from . import signals  # noqa: F401
@@ -0,0 +1,102 @@
+from django.db import models
+from django.db.models.functions import Coalesce
+from common.cache import bump_model_versions
+from .models import Kindergarten
+
+
+# 由数据变化维护的幼儿园统计字段
+COUNTER_FIELDS = ('total_classes', 'total_students', 'total_teachers')
+
+
+def _count_subquery(queryset, kindergarten_path):
+    count_subquery = queryset.filter(
+        **{kindergarten_path: models.OuterRef('pk')}
+    ).order_by().values(kindergarten_path).annotate(
+        count=models.Count('id')
+    ).values('count')
+    return Coalesce(models.Subquery(count_subquery, output_field=models.IntegerField()), 0)
+
+
+def counter_expressions():
+    """
+    按当前数据计算统计字段的子查询表达式
+
+    - total_classes：全部班级数
+    - total_students：班级属于该幼儿园的在读幼儿数
+    - total_teachers：在职教师数
+    """
+    from classes.models import Class
+    from children.models import Child
+    from teachers.models import Teacher
+
+    return {
+        'total_classes': _count_subquery(Class.objects.all(), 'kindergarten'),
+        'total_students': _count_subquery(Child.objects.filter(is_active=True), 'class_info__kindergarten'),
+        'total_teachers': _count_subquery(Teacher.objects.filter(is_active=True), 'kindergarten'),
+    }
+
+
+def refresh_kindergarten_counters(kindergarten_ids=None):
+    """
+    重新计算幼儿园的统计字段，一条 UPDATE 完成
+
+    只重算受影响的幼儿园，结果与数据一致且与调用次数无关，重复调用或漏调后再调用都能得到正确值。
+
+    Args:
+        kindergarten_ids: 需要重算的幼儿园ID，为 None 时重算全部
+
+    Returns:
+        int: 更新的幼儿园数
+    """
+    queryset = Kindergarten.objects.all()
+    if kindergarten_ids is not None:
+        kindergarten_ids = {pk for pk in kindergarten_ids if pk is not None}
+        if not kindergarten_ids:
+            return 0
+        queryset = queryset.filter(id__in=kindergarten_ids)
+    updated = queryset.update(**counter_expressions())
+    # 以 UPDATE 更新统计字段不发送信号，需要自行使依赖幼儿园的响应缓存失效
+    bump_model_versions('kindergartens.Kindergarten')
+    return updated
+
+
+def refresh_counters_for_classes(class_ids):
+    """
+    重新计算指定班级所属幼儿园的统计字段，班级到幼儿园的查找以子查询合并在 UPDATE 中
+    """
+    from classes.models import Class
+
+    class_ids = {pk for pk in class_ids if pk is not None}
+    if not class_ids:
+        return 0
+    updated = Kindergarten.objects.filter(
+        id__in=Class.objects.filter(id__in=class_ids).values('kindergarten_id')
+    ).update(**counter_expressions())
+    bump_model_versions('kindergartens.Kindergarten')
+    return updated
+
+
+def find_counter_mismatches():
+    """
+    将统计字段与实际数据逐个幼儿园比对
+
+    Returns:
+        list: 不一致的项，每项包含 id、name、field、expected、actual
+    """
+    expressions = counter_expressions()
+    rows = Kindergarten.objects.order_by('id').annotate(
+        **{f'expected_{field}': expression for field, expression in expressions.items()}
+    ).values('id', 'name', *COUNTER_FIELDS, *[f'expected_{field}' for field in COUNTER_FIELDS])
+
+    mismatches = []
+    for row in rows.iterator():
+        for field in COUNTER_FIELDS:
+            if row[field] != row[f'expected_{field}']:
+                mismatches.append({
+                    'id': row['id'],
+                    'name': row['name'],
+                    'field': field,
+                    'expected': row[f'expected_{field}'],
+                    'actual': row[field]
+                })
+    return mismatches
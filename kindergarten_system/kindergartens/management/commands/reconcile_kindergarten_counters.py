@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+from kindergartens.counters import find_counter_mismatches, refresh_kindergarten_counters
+
+
+class Command(BaseCommand):
+    """
+    核对幼儿园的班级数、学生数和教师数统计字段，并按实际数据修正
+    """
+    help = '核对并修正幼儿园统计字段'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify-only',
+            action='store_true',
+            help='只核对统计字段，不进行修正'
+        )
+
+    def handle(self, *args, **options):
+        mismatches = find_counter_mismatches()
+        for item in mismatches[:20]:
+            self.stderr.write(
+                f"不一致 {item['name']}({item['id']}) {item['field']}: "
+                f"期望 {item['expected']}，实际 {item['actual']}"
+            )
+
+        if options['verify_only']:
+            if mismatches:
+                raise CommandError(f'幼儿园统计字段与实际数据不一致，共 {len(mismatches)} 处')
+            self.stdout.write(self.style.SUCCESS('幼儿园统计字段与实际数据一致'))
+            return
+
+        if mismatches:
+            updated = refresh_kindergarten_counters({item['id'] for item in mismatches})
+            self.stdout.write(f'已修正 {updated} 所幼儿园的统计字段')
+        self.stdout.write(self.style.SUCCESS('幼儿园统计字段与实际数据一致'))
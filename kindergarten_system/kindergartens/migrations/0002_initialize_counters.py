@@ -0,0 +1,34 @@
+from django.db import migrations
+
+
+def initialize_counters(apps, schema_editor):
+    """
+    按现有数据初始化幼儿园的班级数、学生数和教师数统计字段
+    """
+    Kindergarten = apps.get_model('kindergartens', 'Kindergarten')
+    Class = apps.get_model('classes', 'Class')
+    Child = apps.get_model('children', 'Child')
+    Teacher = apps.get_model('teachers', 'Teacher')
+
+    for kindergarten in Kindergarten.objects.all().iterator():
+        Kindergarten.objects.filter(pk=kindergarten.pk).update(
+            total_classes=Class.objects.filter(kindergarten_id=kindergarten.pk).count(),
+            total_students=Child.objects.filter(
+                class_info__kindergarten_id=kindergarten.pk, is_active=True
+            ).count(),
+            total_teachers=Teacher.objects.filter(kindergarten_id=kindergarten.pk, is_active=True).count()
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kindergartens', '0001_initial'),
+        ('classes', '0001_initial'),
+        ('children', '0001_initial'),
+        ('teachers', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(initialize_counters, migrations.RunPython.noop),
+    ]
@@ -23,30 +23,29 @@ class KindergartenSerializer(serializers.ModelSerializer):
             'class_count', 'student_count', 'teacher_count', 
             'created_at', 'updated_at'
         ]
+        # 统计字段由班级、幼儿和教师的变化自动维护，不接受写入
+        read_only_fields = ['total_students', 'total_teachers', 'total_classes']
         extra_kwargs = {
             'kindergarten_type': {'default': 'private'},
-            'total_students': {'default': 0},
-            'total_teachers': {'default': 0},
-            'total_classes': {'default': 0},
         }
     
     def get_class_count(self, obj):
         """
         获取班级数量
         """
-        return obj.get_class_count()
+        return obj.total_classes
     
     def get_student_count(self, obj):
         """
         获取学生数量
         """
-        return obj.get_student_count()
+        return obj.total_students
     
     def get_teacher_count(self, obj):
         """
         获取教师数量
         """
-        return obj.get_teacher_count()
+        return obj.total_teachers
     
     def to_representation(self, instance):
         """
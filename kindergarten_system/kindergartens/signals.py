@@ -0,0 +1,89 @@
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from classes.models import Class
+from children.models import Child
+from teachers.models import Teacher
+from .counters import refresh_kindergarten_counters, refresh_counters_for_classes
+
+
+def _remember(instance, fields):
+    """
+    保存前记录影响统计字段的原值，新建对象记为 None
+    """
+    previous = None
+    if instance.pk is not None:
+        previous = type(instance).objects.filter(pk=instance.pk).values(*fields).first()
+    instance._counter_previous = previous
+
+
+def _changed(instance, fields, created):
+    previous = getattr(instance, '_counter_previous', None)
+    if created or previous is None:
+        return True
+    return any(previous[field] != getattr(instance, field) for field in fields)
+
+
+@receiver(pre_save, sender=Class)
+def remember_class(sender, instance, raw=False, **kwargs):
+    if not raw:
+        _remember(instance, ('kindergarten_id',))
+
+
+@receiver(post_save, sender=Class)
+def class_saved(sender, instance, created, raw=False, **kwargs):
+    """
+    新建班级或班级更换幼儿园时，重算相关幼儿园的班级数和学生数
+    """
+    if raw or not _changed(instance, ('kindergarten_id',), created):
+        return
+    previous = instance._counter_previous or {}
+    refresh_kindergarten_counters([instance.kindergarten_id, previous.get('kindergarten_id')])
+
+
+@receiver(post_delete, sender=Class)
+def class_deleted(sender, instance, **kwargs):
+    refresh_kindergarten_counters([instance.kindergarten_id])
+
+
+@receiver(pre_save, sender=Child)
+def remember_child(sender, instance, raw=False, **kwargs):
+    if not raw:
+        _remember(instance, ('class_info_id', 'is_active'))
+
+
+@receiver(post_save, sender=Child)
+def child_saved(sender, instance, created, raw=False, **kwargs):
+    """
+    新建幼儿、转班或在读状态变化时，重算相关幼儿园的学生数
+    """
+    if raw or not _changed(instance, ('class_info_id', 'is_active'), created):
+        return
+    previous = instance._counter_previous or {}
+    refresh_counters_for_classes([instance.class_info_id, previous.get('class_info_id')])
+
+
+@receiver(post_delete, sender=Child)
+def child_deleted(sender, instance, **kwargs):
+    refresh_counters_for_classes([instance.class_info_id])
+
+
+@receiver(pre_save, sender=Teacher)
+def remember_teacher(sender, instance, raw=False, **kwargs):
+    if not raw:
+        _remember(instance, ('kindergarten_id', 'is_active'))
+
+
+@receiver(post_save, sender=Teacher)
+def teacher_saved(sender, instance, created, raw=False, **kwargs):
+    """
+    新建教师、更换幼儿园或在职状态变化时，重算相关幼儿园的教师数
+    """
+    if raw or not _changed(instance, ('kindergarten_id', 'is_active'), created):
+        return
+    previous = instance._counter_previous or {}
+    refresh_kindergarten_counters([instance.kindergarten_id, previous.get('kindergarten_id')])
+
+
+@receiver(post_delete, sender=Teacher)
+def teacher_deleted(sender, instance, **kwargs):
+    refresh_kindergarten_counters([instance.kindergarten_id])
@@ -0,0 +1,124 @@
+from datetime import datetime
+from django.http import HttpResponse
+from rest_framework import status
+from rest_framework.response import Response
+import pandas as pd
+from .models import Kindergarten
+from .serializers import KindergartenImportSerializer
+from jobs.registry import register_task
+
+
+@register_task('kindergartens.import_data')
+def import_kindergartens(user, params, upload):
+    """
+    批量导入幼儿园数据
+    """
+    data = params.copy()
+    data['file'] = upload
+    serializer = KindergartenImportSerializer(data=data)
+    serializer.is_valid(raise_exception=True)
+    
+    try:
+        # 读取Excel文件
+        df = pd.read_excel(upload)
+        
+        # 检查必要的列
+        required_columns = ['名称', '类型', '地址', '联系人', '联系电话', '园长', '最大学生数', '最大教师数']
+        missing_columns = [col for col in required_columns if col not in df.columns]
+        if missing_columns:
+            return Response(
+                {'error': f'缺少必要的列: {missing_columns}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        created_count = 0
+        errors = []
+        
+        # 处理每一行数据
+        for index, row in df.iterrows():
+            try:
+                # 检查幼儿园是否已存在
+                if Kindergarten.objects.filter(name=row['名称']).exists():
+                    errors.append(f"第{index+2}行: 幼儿园 '{row['名称']}' 已存在")
+                    continue
+                
+                # 转换类型
+                kindergarten_type_map = {
+                    '公立': 'public',
+                    '私立': 'private',
+                    '普惠': 'inclusive'
+                }
+                kindergarten_type = kindergarten_type_map.get(row['类型'], 'private')
+                
+                # 创建幼儿园
+                kindergarten_data = {
+                    'name': row['名称'],
+                    'kindergarten_type': kindergarten_type,
+                    'address': row['地址'],
+                    'contact_person': row['联系人'],
+                    'contact_phone': row['联系电话'],
+                    'principal': row['园长'],
+                    'max_students': int(row['最大学生数']),
+                    'max_teachers': int(row['最大教师数'])
+                }
+                
+                # 处理可选字段
+                if '成立日期' in row and pd.notna(row['成立日期']):
+                    kindergarten_data['established_date'] = row['成立日期']
+                if '描述' in row and pd.notna(row['描述']):
+                    kindergarten_data['description'] = row['描述']
+                
+                Kindergarten.objects.create(**kindergarten_data)
+                created_count += 1
+                
+            except Exception as e:
+                errors.append(f"第{index+2}行: {str(e)}")
+        
+        result = {
+            'created_count': created_count,
+            'total_rows': len(df),
+            'errors': errors
+        }
+        
+        if errors:
+            return Response(result, status=status.HTTP_207_MULTI_STATUS)
+        else:
+            return Response(result, status=status.HTTP_201_CREATED)
+            
+    except Exception as e:
+        return Response(
+            {'error': f'导入失败: {str(e)}'},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+
+@register_task('kindergartens.export_template')
+def export_kindergarten_template(user, params, upload):
+    """
+    导出幼儿园数据导入模板
+    """
+    # 创建模板数据
+    template_data = {
+        '名称': ['示例幼儿园1', '示例幼儿园2'],
+        '类型': ['公立', '私立'],  # 可选值：公立、私立、普惠
+        '地址': ['北京市朝阳区XX路1号', '上海市浦东新区YY路2号'],
+        '联系人': ['张三', '李四'],
+        '联系电话': ['13800138001', '13900139002'],
+        '园长': ['王五', '赵六'],
+        '最大学生数': [300, 200],
+        '最大教师数': [30, 20],
+        '成立日期': ['2020-01-01', '2021-02-02'],  # 可选
+        '描述': ['这是一所公立幼儿园', '这是一所私立幼儿园']  # 可选
+    }
+    
+    df = pd.DataFrame(template_data)
+    
+    # 创建响应
+    response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+    response['Content-Disposition'] = f'attachment; filename=kindergarten_template_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
+    
+    # 保存到响应
+    with pd.ExcelWriter(response, engine='openpyxl') as writer:
+        df.to_excel(writer, index=False, sheet_name='幼儿园信息')
+    
+    return response
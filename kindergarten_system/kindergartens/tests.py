@@ -1,3 +1,106 @@
+from io import StringIO
+import pandas as pd
+from django.core.management import call_command
+from django.core.management.base import CommandError
 from django.test import TestCase
+from rest_framework.test import APIClient
+from classes.models import Class
+from children.models import Child
+from children.importers import ChildImporter
+from teachers.models import Teacher
+from users.models import User
+from .counters import find_counter_mismatches
+from .models import Kindergarten
 
-# Create your tests here.
+
+class KindergartenCounterTests(TestCase):
+    """
+    幼儿园统计字段维护测试
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.kindergarten = Kindergarten.objects.create(name='阳光幼儿园')
+        cls.other = Kindergarten.objects.create(name='星星幼儿园')
+        cls.owner = User.objects.create_user(username='owner', password='pass', role='owner')
+
+    def counters(self, kindergarten):
+        kindergarten.refresh_from_db()
+        return kindergarten.total_classes, kindergarten.total_students, kindergarten.total_teachers
+
+    def test_counters_follow_changes(self):
+        class_a = Class.objects.create(name='大一班', kindergarten=self.kindergarten)
+        child = Child.objects.create(name='张三', class_info=class_a)
+        Child.objects.create(name='李四', class_info=class_a)
+        teacher = Teacher.objects.create(name='王老师', kindergarten=self.kindergarten)
+        self.assertEqual(self.counters(self.kindergarten), (1, 2, 1))
+
+        child.is_active = False
+        child.save()
+        teacher.is_active = False
+        teacher.save()
+        self.assertEqual(self.counters(self.kindergarten), (1, 1, 0))
+
+        # 班级更换幼儿园时学生数随之转移
+        class_a.kindergarten = self.other
+        class_a.save()
+        self.assertEqual(self.counters(self.kindergarten), (0, 0, 0))
+        self.assertEqual(self.counters(self.other), (1, 1, 0))
+
+        # 删除班级后幼儿的班级被置空，不再计入学生数
+        class_a.delete()
+        self.assertEqual(self.counters(self.other), (0, 0, 0))
+        self.assertEqual(find_counter_mismatches(), [])
+
+    def test_import_updates_counters(self):
+        Class.objects.create(name='大一班', kindergarten=self.kindergarten)
+        frame = pd.DataFrame({
+            '幼儿姓名(*)': ['张三', '李四'],
+            '性别(*)': ['男', '女'],
+            '出生日期(*)': ['2020-01-01', '2020-02-02'],
+            '班级名称(*)': ['大一班', '大一班'],
+            '幼儿园名称': ['阳光幼儿园', '阳光幼儿园'],
+            '家长姓名': ['', ''],
+            '家长手机号': ['', ''],
+        })
+        result = ChildImporter(self.owner).run(frame)
+        self.assertEqual(result['created_count'], 2, result['errors'])
+        self.assertEqual(self.counters(self.kindergarten), (1, 2, 0))
+
+    def test_reconcile_command_fixes_drift(self):
+        class_a = Class.objects.create(name='大一班', kindergarten=self.kindergarten)
+        Child.objects.create(name='张三', class_info=class_a)
+        Kindergarten.objects.filter(pk=self.kindergarten.pk).update(total_students=99, total_classes=0)
+
+        with self.assertRaises(CommandError):
+            call_command('reconcile_kindergarten_counters', '--verify-only', stdout=StringIO(), stderr=StringIO())
+        call_command('reconcile_kindergarten_counters', stdout=StringIO(), stderr=StringIO())
+        self.assertEqual(self.counters(self.kindergarten), (1, 1, 0))
+
+    def test_endpoints_read_counters(self):
+        class_a = Class.objects.create(name='大一班', kindergarten=self.kindergarten)
+        Child.objects.create(name='张三', class_info=class_a)
+        Teacher.objects.create(name='王老师', kindergarten=self.other)
+
+        client = APIClient()
+        client.force_authenticate(user=self.owner)
+        with self.assertNumQueries(2):
+            response = client.get('/api/kindergartens/stats/')
+        self.assertEqual(
+            (response.data['total_count'], response.data['total_classes'],
+             response.data['total_students'], response.data['total_teachers']),
+            (2, 1, 1, 1)
+        )
+
+        with self.assertNumQueries(2):
+            response = client.get('/api/kindergartens/')
+        items = {item['name']: item for item in response.data['results']}
+        self.assertEqual(
+            (items['阳光幼儿园']['class_count'], items['阳光幼儿园']['student_count']), (1, 1)
+        )
+        self.assertEqual(items['星星幼儿园']['teacher_count'], 1)
+
+        # 统计字段不接受写入
+        client.patch(
+            f'/api/kindergartens/{self.kindergarten.pk}/', {'total_students': 50}, format='json'
+        )
+        self.assertEqual(self.counters(self.kindergarten)[1], 1)
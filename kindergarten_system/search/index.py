@@ -0,0 +1,344 @@
+import re
+from django.apps import apps
+from django.db import models
+from django.db.models.functions import Length
+from .models import SearchToken
+
+try:
+    from pypinyin import lazy_pinyin
+except ImportError:  # 未安装 pypinyin 时不生成拼音词元，拼音搜索不可用
+    lazy_pinyin = None
+
+
+# 各类字段切分的 n-gram 长度：姓名按单字和双字切分，电话号码按三位切分
+NAME_GRAMS = (1, 2)
+PHONE_GRAMS = (3,)
+
+# 拼音词元的最大长度，与 SearchToken.token 字段长度一致
+PINYIN_MAX_LENGTH = 32
+# 拼音词元保存的字段名后缀：全拼前缀和首字母前缀
+PINYIN_SUFFIXES = ('_pinyin', '_initials')
+
+# 参与搜索的对象及字段，字段顺序即排序时的优先级；pinyin_fields 中的字段额外生成拼音前缀词元
+SEARCH_ENTITIES = {
+    SearchToken.ENTITY_CHILD: {
+        'model': 'children.Child',
+        'fields': {'name': NAME_GRAMS, 'parent_name': NAME_GRAMS, 'parent_phone': PHONE_GRAMS},
+        'pinyin_fields': ('name',),
+    },
+    SearchToken.ENTITY_TEACHER: {
+        'model': 'teachers.Teacher',
+        'fields': {'name': NAME_GRAMS, 'phone': PHONE_GRAMS},
+        'pinyin_fields': ('name',),
+    },
+    SearchToken.ENTITY_AREA: {
+        'model': 'selections.SelectionArea',
+        'fields': {'name': NAME_GRAMS},
+    },
+}
+
+# 匹配方式，由高到低排序
+MATCH_KINDS = ('exact', 'prefix', 'contains')
+
+
+def normalize(text):
+    """
+    规范化文本：去掉空白并转为小写
+    """
+    return ''.join(str(text).split()).lower()
+
+
+def make_tokens(text, sizes):
+    """
+    将文本切分为指定长度的 n-gram 词元
+    """
+    text = normalize(text or '')
+    return {text[i:i + size] for size in sizes for i in range(len(text) - size + 1)}
+
+
+def query_tokens(query, sizes):
+    """
+    将查询词切分为词元，取不超过查询长度的最大 n-gram 长度
+
+    查询词是字段值的子串时，这些词元必然都出现在字段值的词元中。
+    查询词短于最小 n-gram 长度时无法使用索引，返回 None。
+    """
+    text = normalize(query)
+    usable = [size for size in sizes if size <= len(text)]
+    if not usable:
+        return None
+    return make_tokens(text, (max(usable),))
+
+
+def pinyin_keys(text):
+    """
+    返回文本的全拼和首字母，如“张三”返回 ('zhangsan', 'zs')，未安装 pypinyin 时返回 None
+    """
+    if lazy_pinyin is None or not text:
+        return None
+    syllables = [re.sub(r'[^0-9a-z]', '', item.lower()) for item in lazy_pinyin(str(text))]
+    syllables = [item for item in syllables if item]
+    if not syllables:
+        return None
+    return ''.join(syllables), ''.join(item[0] for item in syllables)
+
+
+def prefixes(text):
+    return {text[:length] for length in range(1, min(len(text), PINYIN_MAX_LENGTH) + 1)}
+
+
+def is_pinyin_query(query):
+    """
+    判断查询词是否为拼音或首字母
+    """
+    return bool(re.fullmatch(r'[a-z]+', normalize(query)))
+
+
+def get_entity_model(entity):
+    return apps.get_model(SEARCH_ENTITIES[entity]['model'])
+
+
+def entity_for_model(model):
+    """
+    根据模型类返回对象类型，不参与搜索的模型返回 None
+    """
+    label = model._meta.label
+    for entity, config in SEARCH_ENTITIES.items():
+        if config['model'] == label:
+            return entity
+    return None
+
+
+def tokens_for_values(entity, object_id, values):
+    """
+    根据字段值生成对象的全部词元
+
+    Args:
+        values: 字段名到字段值的映射
+    """
+    config = SEARCH_ENTITIES[entity]
+    tokens = [
+        SearchToken(entity=entity, object_id=object_id, field=field, token=token)
+        for field, sizes in config['fields'].items()
+        for token in make_tokens(values.get(field), sizes)
+    ]
+    for field in config.get('pinyin_fields', ()):
+        keys = pinyin_keys(values.get(field))
+        if keys is None:
+            continue
+        for suffix, key in zip(PINYIN_SUFFIXES, keys):
+            tokens.extend(
+                SearchToken(entity=entity, object_id=object_id, field=f'{field}{suffix}', token=token)
+                for token in prefixes(key)
+            )
+    return tokens
+
+
+def index_instances(entity, instances, batch_size=1000):
+    """
+    按内存中的对象分批重建其词元，不需要再查询对象本身
+
+    Returns:
+        int: 写入的词元数
+    """
+    fields = SEARCH_ENTITIES[entity]['fields']
+    instances = [instance for instance in instances if instance.pk is not None]
+    total = 0
+    for start in range(0, len(instances), batch_size):
+        batch = instances[start:start + batch_size]
+        remove_objects(entity, [instance.pk for instance in batch])
+        tokens = []
+        for instance in batch:
+            tokens.extend(tokens_for_values(
+                entity, instance.pk, {field: getattr(instance, field) for field in fields}
+            ))
+        SearchToken.objects.bulk_create(tokens, batch_size=batch_size)
+        total += len(tokens)
+    return total
+
+
+def index_queryset(entity, queryset=None, batch_size=1000):
+    """
+    按主键分批重建查询集内对象的词元，queryset 为 None 时重建该类型的全部词元
+
+    Returns:
+        int: 处理的对象数
+    """
+    fields = list(SEARCH_ENTITIES[entity]['fields'])
+    if queryset is None:
+        SearchToken.objects.filter(entity=entity).delete()
+        queryset = get_entity_model(entity).objects.all()
+        rebuild_all = True
+    else:
+        rebuild_all = False
+
+    total = 0
+    last_id = 0
+    queryset = queryset.order_by('pk').values('pk', *fields)
+    while True:
+        rows = list(queryset.filter(pk__gt=last_id)[:batch_size])
+        if not rows:
+            return total
+        if not rebuild_all:
+            remove_objects(entity, [row['pk'] for row in rows])
+        tokens = []
+        for row in rows:
+            tokens.extend(tokens_for_values(entity, row['pk'], row))
+        SearchToken.objects.bulk_create(tokens, batch_size=batch_size)
+        total += len(rows)
+        last_id = rows[-1]['pk']
+
+
+def index_unindexed(entity):
+    """
+    为还没有词元的对象建立词元，用于 bulk_create 不回填主键的数据库
+    """
+    indexed = SearchToken.objects.filter(entity=entity).values('object_id')
+    return index_queryset(entity, get_entity_model(entity).objects.exclude(pk__in=indexed))
+
+
+def remove_objects(entity, object_ids):
+    """
+    删除对象的全部词元
+    """
+    object_ids = [pk for pk in object_ids if pk is not None]
+    if object_ids:
+        SearchToken.objects.filter(entity=entity, object_id__in=object_ids).delete()
+
+
+def matching_ids(entity, field, query):
+    """
+    返回包含查询词全部词元的对象ID子查询，查询词过短无法使用索引时返回 None
+    """
+    tokens = query_tokens(query, SEARCH_ENTITIES[entity]['fields'][field])
+    if tokens is None:
+        return None
+    return SearchToken.objects.filter(
+        entity=entity, field=field, token__in=tokens
+    ).order_by().values('object_id').annotate(
+        matched=models.Count('token', distinct=True)
+    ).filter(matched=len(tokens)).values('object_id')
+
+
+def pinyin_matching_ids(entity, field, query):
+    """
+    返回全拼或首字母以查询词开头的对象ID子查询，查询词不是拼音时返回 None
+    """
+    if field not in SEARCH_ENTITIES[entity].get('pinyin_fields', ()) or not is_pinyin_query(query):
+        return None
+    return SearchToken.objects.filter(
+        entity=entity,
+        field__in=[f'{field}{suffix}' for suffix in PINYIN_SUFFIXES],
+        token=normalize(query)[:PINYIN_MAX_LENGTH]
+    ).values('object_id')
+
+
+def search_q(entity, query, fields=None, prefix='', fallback=True):
+    """
+    构造搜索条件：先按词元索引找出候选对象，再以 icontains 精确核对
+
+    支持拼音的字段，查询词为字母时同时匹配全拼或首字母以其开头的对象，如 zs 匹配“张三”。
+
+    Args:
+        entity: 对象类型
+        query: 查询词
+        fields: 参与匹配的字段，默认全部字段，任一字段匹配即可
+        prefix: 从查询集模型到搜索对象的关联路径，如 'child__'
+        fallback: 查询词过短无法使用索引时是否退回 icontains
+
+    Returns:
+        Q: 搜索条件，没有可用条件时返回 None
+    """
+    query = (query or '').strip()
+    if not query:
+        return None
+    condition = None
+    for field in fields or SEARCH_ENTITIES[entity]['fields']:
+        ids = matching_ids(entity, field, query)
+        if ids is not None:
+            field_condition = models.Q(**{f'{prefix}pk__in': ids, f'{prefix}{field}__icontains': query})
+        elif fallback:
+            field_condition = models.Q(**{f'{prefix}{field}__icontains': query})
+        else:
+            field_condition = None
+        pinyin_ids = pinyin_matching_ids(entity, field, query)
+        if pinyin_ids is not None:
+            pinyin_condition = models.Q(**{f'{prefix}pk__in': pinyin_ids})
+            field_condition = pinyin_condition if field_condition is None else field_condition | pinyin_condition
+        if field_condition is None:
+            continue
+        condition = field_condition if condition is None else condition | field_condition
+    return condition
+
+
+def search_filter(queryset, entity, query, fields=None, prefix=''):
+    """
+    按查询词过滤查询集，用于列表接口的名称、电话筛选
+    """
+    condition = search_q(entity, query, fields=fields, prefix=prefix)
+    return queryset if condition is None else queryset.filter(condition)
+
+
+def rank_expression(entity, query, fields=None):
+    """
+    匹配排名表达式：字段优先级在前，同一字段内完全匹配 > 前缀匹配 > 包含匹配
+
+    Returns:
+        tuple: (排名表达式, 排名值到（字段、匹配方式）的映射)，排名值越大越靠前
+    """
+    fields = list(fields or SEARCH_ENTITIES[entity]['fields'])
+    lookups = {'exact': 'iexact', 'prefix': 'istartswith', 'contains': 'icontains'}
+    whens = []
+    labels = {}
+    rank = len(fields) * len(MATCH_KINDS)
+    for field in fields:
+        for kind in MATCH_KINDS:
+            whens.append(models.When(**{f'{field}__{lookups[kind]}': query}, then=models.Value(rank)))
+            labels[rank] = (field, kind)
+            rank -= 1
+    # 只有拼音匹配的对象排在最后
+    pinyin_fields = [field for field in fields if field in SEARCH_ENTITIES[entity].get('pinyin_fields', ())]
+    labels[0] = (pinyin_fields[0] if pinyin_fields else fields[0], 'pinyin')
+    return models.Case(*whens, default=models.Value(0), output_field=models.IntegerField()), labels
+
+
+def ranked_search(queryset, entity, query, limit, fields=None):
+    """
+    在查询集中搜索并按匹配程度排序，同等匹配时较短的名称在前
+
+    Returns:
+        list: (对象, 匹配字段, 匹配方式) 列表
+    """
+    fields = list(fields or SEARCH_ENTITIES[entity]['fields'])
+    condition = search_q(entity, query, fields=fields, fallback=False)
+    if condition is None:
+        return []
+    rank, labels = rank_expression(entity, query.strip(), fields)
+    queryset = queryset.filter(condition).annotate(match_rank=rank).order_by(
+        '-match_rank', Length(fields[0]), 'pk'
+    )[:limit]
+    return [(obj, *labels[obj.match_rank]) for obj in queryset]
+
+
+def prefix_search(queryset, entity, query, limit, field='name'):
+    """
+    按名称前缀搜索，字母查询词匹配全拼或首字母前缀，其他查询词匹配名称前缀
+
+    拼音查询只需按词元索引精确查找一次，适合平板上逐字输入时的即时提示。
+
+    Returns:
+        list: 按名称长度和名称排序的对象列表
+    """
+    query = (query or '').strip()
+    if not query:
+        return []
+    pinyin_ids = pinyin_matching_ids(entity, field, query)
+    if pinyin_ids is not None:
+        # 名称中的英文字母也会生成拼音词元，字母查询只需查词元
+        condition = models.Q(pk__in=pinyin_ids)
+    else:
+        ids = matching_ids(entity, field, query)
+        condition = models.Q(**{f'{field}__istartswith': query})
+        if ids is not None:
+            condition &= models.Q(pk__in=ids)
+    return list(queryset.filter(condition).order_by(Length(field), field, 'pk')[:limit])
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from search.index import SEARCH_ENTITIES, index_queryset
+
+
+class Command(BaseCommand):
+    """
+    从幼儿、教师、选区表重建搜索词元表
+    """
+    help = '重建搜索词元表'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--entity',
+            choices=list(SEARCH_ENTITIES),
+            action='append',
+            help='只重建指定类型，可重复指定，默认重建全部'
+        )
+        parser.add_argument('--batch-size', type=int, default=1000, help='每批处理的对象数')
+
+    def handle(self, *args, **options):
+        for entity in options['entity'] or SEARCH_ENTITIES:
+            count = index_queryset(entity, batch_size=options['batch_size'])
+            self.stdout.write(f'{entity}: 已重建 {count} 个对象的词元')
+        self.stdout.write(self.style.SUCCESS('搜索词元表重建完成'))
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entity', models.CharField(choices=[('child', '幼儿'), ('teacher', '教师'), ('area', '选区')], max_length=20, verbose_name='对象类型')),
+                ('object_id', models.BigIntegerField(verbose_name='对象ID')),
+                ('field', models.CharField(max_length=30, verbose_name='字段')),
+                ('token', models.CharField(max_length=10, verbose_name='词元')),
+            ],
+            options={
+                'verbose_name': '搜索词元',
+                'verbose_name_plural': '搜索词元管理',
+                'indexes': [models.Index(fields=['entity', 'field', 'token', 'object_id'], name='search_token_lookup_idx'), models.Index(fields=['entity', 'object_id'], name='search_token_object_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,52 @@
+from django.db import migrations
+
+
+# 迁移时的搜索字段和词元规则，与 search.index 当时的定义一致；
+# 之后修改 search.index 不影响本迁移，规则变化时在新迁移中重建词元
+SEARCH_ENTITIES = {
+    'child': ('children.Child', {'name': (1, 2), 'parent_name': (1, 2), 'parent_phone': (3,)}),
+    'teacher': ('teachers.Teacher', {'name': (1, 2), 'phone': (3,)}),
+    'area': ('selections.SelectionArea', {'name': (1, 2)}),
+}
+
+
+def make_tokens(text, sizes):
+    """
+    去掉空白并转为小写后，将文本切分为指定长度的 n-gram 词元
+    """
+    text = ''.join(str(text or '').split()).lower()
+    return {text[i:i + size] for size in sizes for i in range(len(text) - size + 1)}
+
+
+def build_search_index(apps, schema_editor):
+    """
+    为已有的幼儿、教师、选区建立搜索词元
+    """
+    SearchToken = apps.get_model('search', 'SearchToken')
+    for entity, (model_label, fields) in SEARCH_ENTITIES.items():
+        model = apps.get_model(model_label)
+        tokens = []
+        for row in model.objects.order_by('pk').values('pk', *fields).iterator():
+            tokens.extend(
+                SearchToken(entity=entity, object_id=row['pk'], field=field, token=token)
+                for field, sizes in fields.items()
+                for token in make_tokens(row[field], sizes)
+            )
+            if len(tokens) >= 5000:
+                SearchToken.objects.bulk_create(tokens)
+                tokens = []
+        SearchToken.objects.bulk_create(tokens)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0001_initial'),
+        ('children', '0003_child_child_created_idx'),
+        ('teachers', '0002_teacher_teacher_kg_active_idx'),
+        ('selections', '0006_selectionrecord_sel_rec_keyset_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(build_search_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:08
+
+import re
+from django.db import migrations, models
+
+
+# 迁移时的拼音词元规则，与 search.index 当时的定义一致；
+# 之后修改 search.index 不影响本迁移，规则变化时在新迁移中重建词元
+PINYIN_ENTITIES = {
+    'child': ('children.Child', ('name',)),
+    'teacher': ('teachers.Teacher', ('name',)),
+}
+PINYIN_SUFFIXES = ('_pinyin', '_initials')
+PINYIN_MAX_LENGTH = 32
+
+
+def pinyin_keys(lazy_pinyin, text):
+    """
+    返回文本的全拼和首字母，如“张三”返回 ('zhangsan', 'zs')
+    """
+    if not text:
+        return None
+    syllables = [re.sub(r'[^0-9a-z]', '', item.lower()) for item in lazy_pinyin(str(text))]
+    syllables = [item for item in syllables if item]
+    if not syllables:
+        return None
+    return ''.join(syllables), ''.join(item[0] for item in syllables)
+
+
+def build_pinyin_tokens(apps, schema_editor):
+    """
+    为已有的幼儿、教师姓名生成拼音前缀词元，未安装 pypinyin 时不生成
+    """
+    try:
+        from pypinyin import lazy_pinyin
+    except ImportError:
+        return
+
+    SearchToken = apps.get_model('search', 'SearchToken')
+    for entity, (model_label, fields) in PINYIN_ENTITIES.items():
+        SearchToken.objects.filter(
+            entity=entity, field__in=[f'{field}{suffix}' for field in fields for suffix in PINYIN_SUFFIXES]
+        ).delete()
+        model = apps.get_model(model_label)
+        tokens = []
+        for row in model.objects.order_by('pk').values('pk', *fields).iterator():
+            for field in fields:
+                keys = pinyin_keys(lazy_pinyin, row[field])
+                if keys is None:
+                    continue
+                for suffix, key in zip(PINYIN_SUFFIXES, keys):
+                    tokens.extend(
+                        SearchToken(entity=entity, object_id=row['pk'], field=f'{field}{suffix}', token=key[:length])
+                        for length in range(1, min(len(key), PINYIN_MAX_LENGTH) + 1)
+                    )
+            if len(tokens) >= 5000:
+                SearchToken.objects.bulk_create(tokens)
+                tokens = []
+        SearchToken.objects.bulk_create(tokens)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0002_build_search_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='searchtoken',
+            name='token',
+            field=models.CharField(max_length=32, verbose_name='词元'),
+        ),
+        migrations.RunPython(build_pinyin_tokens, migrations.RunPython.noop),
+    ]
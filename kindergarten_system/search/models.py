@@ -0,0 +1,36 @@
+from django.db import models
+
+
+# 搜索词元模型
+class SearchToken(models.Model):
+    """
+    搜索词元模型，保存姓名、电话等字段切分出的 n-gram 词元，以及姓名的全拼、首字母前缀
+
+    按词元查找候选对象可以走索引，避免 icontains 生成的前置通配符 LIKE 全表扫描。
+    """
+    ENTITY_CHILD = 'child'
+    ENTITY_TEACHER = 'teacher'
+    ENTITY_AREA = 'area'
+    ENTITY_CHOICES = [
+        (ENTITY_CHILD, '幼儿'),
+        (ENTITY_TEACHER, '教师'),
+        (ENTITY_AREA, '选区'),
+    ]
+
+    entity = models.CharField('对象类型', max_length=20, choices=ENTITY_CHOICES)
+    object_id = models.BigIntegerField('对象ID')
+    field = models.CharField('字段', max_length=30)
+    token = models.CharField('词元', max_length=32)
+
+    class Meta:
+        verbose_name = '搜索词元'
+        verbose_name_plural = '搜索词元管理'
+        indexes = [
+            # 按词元查找候选对象，包含对象ID可直接从索引得到结果
+            models.Index(fields=['entity', 'field', 'token', 'object_id'], name='search_token_lookup_idx'),
+            # 对象变化时删除其全部词元
+            models.Index(fields=['entity', 'object_id'], name='search_token_object_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.entity}:{self.object_id} {self.field}={self.token}'
@@ -0,0 +1,26 @@
+from django.db.models.signals import post_save, post_delete
+from .index import SEARCH_ENTITIES, entity_for_model, index_instances, remove_objects
+
+
+def reindex_saved_object(sender, instance, raw=False, update_fields=None, **kwargs):
+    """
+    幼儿、教师、选区保存后重建其搜索词元，只更新了无关字段时跳过
+    """
+    entity = entity_for_model(sender)
+    if raw:
+        return
+    if update_fields is not None and not set(SEARCH_ENTITIES[entity]['fields']) & set(update_fields):
+        return
+    index_instances(entity, [instance])
+
+
+def remove_deleted_object(sender, instance, **kwargs):
+    """
+    幼儿、教师、选区删除后删除其搜索词元
+    """
+    remove_objects(entity_for_model(sender), [instance.pk])
+
+
+for entity, config in SEARCH_ENTITIES.items():
+    post_save.connect(reindex_saved_object, sender=config['model'], dispatch_uid=f'search_index_{entity}')
+    post_delete.connect(remove_deleted_object, sender=config['model'], dispatch_uid=f'search_remove_{entity}')
@@ -0,0 +1,221 @@
+from io import StringIO
+import pandas as pd
+from django.core.management import call_command
+from django.db import connection
+from unittest import skipIf
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from common.query_plan import QueryPlanAssertionsMixin
+from kindergartens.models import Kindergarten
+from classes.models import Class
+from children.importers import ChildImporter
+from children.models import Child
+from selections.models import SelectionArea
+from teachers.models import Teacher
+from users.models import User
+from .index import lazy_pinyin, make_tokens, prefix_search, query_tokens, search_filter
+from .models import SearchToken
+
+
+class SearchIndexTests(QueryPlanAssertionsMixin, TestCase):
+    """
+    搜索词元维护和列表筛选测试
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.kindergarten = Kindergarten.objects.create(name='阳光幼儿园')
+        cls.class_a = Class.objects.create(name='大一班', kindergarten=cls.kindergarten)
+        cls.owner = User.objects.create_user(username='owner', password='pass', role='owner')
+
+    def tokens(self, entity, obj, field):
+        return set(SearchToken.objects.filter(
+            entity=entity, object_id=obj.pk, field=field
+        ).values_list('token', flat=True))
+
+    def test_tokenizer(self):
+        self.assertEqual(make_tokens('张 三丰', (1, 2)), {'张', '三', '丰', '张三', '三丰'})
+        self.assertEqual(query_tokens('张三丰', (1, 2)), {'张三', '三丰'})
+        self.assertEqual(query_tokens('13', (3,)), None)
+
+    def test_tokens_follow_changes(self):
+        child = Child.objects.create(name='张三', class_info=self.class_a, parent_phone='13800001111')
+        self.assertEqual(self.tokens('child', child, 'name'), {'张', '三', '张三'})
+        self.assertIn('138', self.tokens('child', child, 'parent_phone'))
+
+        child.name = '李四'
+        child.save()
+        self.assertEqual(self.tokens('child', child, 'name'), {'李', '四', '李四'})
+        # 只更新无关字段时不重建词元
+        with CaptureQueriesContext(connection) as queries:
+            child.save(update_fields=['is_active'])
+        self.assertFalse([query for query in queries if SearchToken._meta.db_table in query['sql']])
+
+        child_id = child.pk
+        child.delete()
+        self.assertFalse(SearchToken.objects.filter(entity='child', object_id=child_id).exists())
+
+    def test_filter_matches_icontains(self):
+        names = ['张三', '张三丰', '李张三', '张小三', '王五', 'Tom Lee']
+        for name in names:
+            Child.objects.create(name=name, class_info=self.class_a)
+        for query in ['张三', '张', '三丰', '张小三', 'tom', 'm L', '赵']:
+            self.assertEqual(
+                set(search_filter(Child.objects.all(), 'child', query, fields=['name']).values_list('name', flat=True)),
+                set(Child.objects.filter(name__icontains=query.strip()).values_list('name', flat=True)),
+                query
+            )
+
+    def test_filter_uses_token_index(self):
+        Child.objects.create(name='张三', class_info=self.class_a)
+        self.assertNoFullScan(search_filter(Child.objects.all(), 'child', '张三', fields=['name']))
+
+    def test_list_endpoints_filter_by_tokens(self):
+        child = Child.objects.create(name='张三', class_info=self.class_a, parent_phone='13800001111')
+        Child.objects.create(name='李四', class_info=self.class_a, parent_phone='13900002222')
+        Teacher.objects.create(name='王老师', kindergarten=self.kindergarten, phone='13700003333')
+        client = APIClient()
+        client.force_authenticate(user=self.owner)
+
+        response = client.get('/api/children/', {'parent_phone': '0001'})
+        self.assertEqual([item['id'] for item in response.data['results']], [child.id])
+        response = client.get('/api/teachers/', {'phone': '3333'})
+        self.assertEqual([item['name'] for item in response.data['results']], ['王老师'])
+
+    def test_import_and_rebuild(self):
+        frame = pd.DataFrame({
+            '幼儿姓名(*)': ['张三', '李四'],
+            '性别(*)': ['男', '女'],
+            '出生日期(*)': ['2020-01-01', '2020-02-02'],
+            '班级名称(*)': ['大一班', '大一班'],
+            '幼儿园名称': ['阳光幼儿园', '阳光幼儿园'],
+            '家长姓名': ['', ''],
+            '家长手机号': ['', ''],
+        })
+        result = ChildImporter(self.owner).run(frame)
+        self.assertEqual(result['created_count'], 2, result['errors'])
+        self.assertEqual(search_filter(Child.objects.all(), 'child', '李四', fields=['name']).count(), 1)
+
+        SearchToken.objects.all().delete()
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(self.tokens('child', Child.objects.get(name='张三'), 'name'), {'张', '三', '张三'})
+
+
+class SearchEndpointTests(TestCase):
+    """
+    全局搜索接口测试
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.kindergarten = Kindergarten.objects.create(name='阳光幼儿园')
+        cls.other = Kindergarten.objects.create(name='星星幼儿园')
+        cls.class_a = Class.objects.create(name='大一班', kindergarten=cls.kindergarten)
+        cls.other_class = Class.objects.create(name='小一班', kindergarten=cls.other)
+        for name in ['李张三', '张三丰', '张三']:
+            Child.objects.create(name=name, class_info=cls.class_a)
+        Child.objects.create(name='王五', class_info=cls.class_a, parent_name='张三')
+        Child.objects.create(name='张三', class_info=cls.other_class)
+        Teacher.objects.create(name='张三老师', kindergarten=cls.kindergarten)
+        SelectionArea.objects.create(name='张三的书架', class_info=cls.class_a)
+        cls.principal = User.objects.create_user(
+            username='principal', password='pass', role='principal', kindergarten=cls.kindergarten
+        )
+
+    def search(self, params):
+        client = APIClient()
+        client.force_authenticate(user=self.principal)
+        return client.get('/api/search/', params)
+
+    def test_ranked_results_within_scope(self):
+        response = self.search({'q': '张三'})
+        self.assertEqual(response.status_code, 200)
+        children = response.data['results']['child']
+        self.assertEqual(
+            [(item['name'], item['matched_field'], item['match']) for item in children],
+            [
+                ('张三', 'name', 'exact'),
+                ('张三丰', 'name', 'prefix'),
+                ('李张三', 'name', 'contains'),
+                ('王五', 'parent_name', 'exact'),
+            ]
+        )
+        self.assertEqual(children[0]['description'], '大一班')
+        self.assertEqual(response.data['results']['teacher'][0]['description'], '阳光幼儿园')
+        self.assertEqual(len(response.data['results']['area']), 1)
+
+    def test_types_limit_and_validation(self):
+        response = self.search({'q': '张', 'types': 'child', 'limit': 2})
+        self.assertEqual(list(response.data['results']), ['child'])
+        self.assertEqual(len(response.data['results']['child']), 2)
+        self.assertEqual(self.search({'q': ' '}).status_code, 400)
+        self.assertEqual(self.search({'q': '张', 'types': 'class'}).status_code, 400)
+
+
+@skipIf(lazy_pinyin is None, '未安装 pypinyin')
+class PinyinSearchTests(QueryPlanAssertionsMixin, TestCase):
+    """
+    拼音、首字母搜索测试
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.kindergarten = Kindergarten.objects.create(name='阳光幼儿园')
+        cls.class_a = Class.objects.create(name='大一班', kindergarten=cls.kindergarten)
+        cls.class_b = Class.objects.create(name='小一班', kindergarten=cls.kindergarten)
+        cls.zhangsan = Child.objects.create(name='张三', class_info=cls.class_a)
+        cls.zhangsi = Child.objects.create(name='张思远', class_info=cls.class_a)
+        Child.objects.create(name='李四', class_info=cls.class_a)
+        Child.objects.create(name='赵森', class_info=cls.class_b)
+        Teacher.objects.create(name='周珊', kindergarten=cls.kindergarten)
+        cls.principal = User.objects.create_user(
+            username='principal', password='pass', role='principal', kindergarten=cls.kindergarten
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.principal)
+
+    def prefix(self, params, queries=1):
+        with self.assertNumQueries(queries):
+            response = self.client.get('/api/search/prefix/', params)
+        self.assertEqual(response.status_code, 200)
+        return {entity: [item['name'] for item in items] for entity, items in response.data['results'].items()}
+
+    def test_tokens_include_pinyin_prefixes(self):
+        tokens = set(SearchToken.objects.filter(
+            entity='child', object_id=self.zhangsan.pk
+        ).values_list('field', 'token'))
+        self.assertTrue({('name_initials', 'z'), ('name_initials', 'zs'), ('name_pinyin', 'zhangsan')} <= tokens)
+
+    def test_prefix_endpoint(self):
+        self.assertEqual(self.prefix({'q': 'zs'}), {'child': ['张三', '赵森', '张思远']})
+        self.assertEqual(self.prefix({'q': 'ZHANG'}), {'child': ['张三', '张思远']})
+        self.assertEqual(self.prefix({'q': 'zs', 'class_id': self.class_a.id}), {'child': ['张三', '张思远']})
+        self.assertEqual(self.prefix({'q': '张'}), {'child': ['张三', '张思远']})
+        self.assertEqual(
+            self.prefix({'q': 'zs', 'types': 'child,teacher'}, queries=2),
+            {'child': ['张三', '赵森', '张思远'], 'teacher': ['周珊']}
+        )
+
+    def test_prefix_lookup_uses_index(self):
+        queryset = Child.objects.filter(class_info__kindergarten_id=self.kindergarten.id)
+        self.assertEqual(prefix_search(queryset, 'child', 'zsy', 10), [self.zhangsi])
+        self.assertNoFullScan(
+            Child.objects.filter(pk__in=SearchToken.objects.filter(
+                entity='child', field__in=['name_pinyin', 'name_initials'], token='zs'
+            ).values('object_id'))
+        )
+
+    def test_name_filters_accept_pinyin(self):
+        response = self.client.get('/api/children/', {'name': 'zs'})
+        self.assertEqual({item['name'] for item in response.data['results']}, {'张三', '赵森', '张思远'})
+        response = self.client.get('/api/search/', {'q': 'zhangs', 'types': 'child'})
+        self.assertEqual(
+            [(item['name'], item['match']) for item in response.data['results']['child']],
+            [('张三', 'pinyin'), ('张思远', 'pinyin')]
+        )
+
+    def test_rename_updates_pinyin(self):
+        self.zhangsan.name = '王小明'
+        self.zhangsan.save()
+        self.assertEqual(prefix_search(Child.objects.all(), 'child', 'wxm', 10), [self.zhangsan])
+        self.assertNotIn(self.zhangsan, prefix_search(Child.objects.all(), 'child', 'zs', 10))
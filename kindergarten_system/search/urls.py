@@ -0,0 +1,7 @@
+from django.urls import path
+from .views import SearchView, PrefixSearchView
+
+urlpatterns = [
+    path('', SearchView.as_view(), name='search'),
+    path('prefix/', PrefixSearchView.as_view(), name='search-prefix'),
+]
@@ -0,0 +1,140 @@
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from children.models import Child
+from selections.models import SelectionArea
+from teachers.models import Teacher
+from users.scope import get_user_scope
+from .index import SEARCH_ENTITIES, prefix_search, ranked_search
+from .models import SearchToken
+
+
+class SearchViewMixin:
+    """
+    搜索接口的公共方法：按用户数据范围取查询集、解析参数和生成补充说明
+    """
+    permission_classes = [IsAuthenticated]
+    default_limit = 10
+    max_limit = 50
+    # 可搜索的对象类型和未指定时的默认类型
+    allowed_entities = tuple(SEARCH_ENTITIES)
+    default_entities = tuple(SEARCH_ENTITIES)
+
+    def get_querysets(self):
+        """
+        按用户数据范围返回各类对象的查询集，范围与各列表接口一致
+        """
+        scope = get_user_scope(self.request)
+        if scope.is_teacher:
+            teachers = Teacher.objects.filter(id=scope.teacher_id)
+        else:
+            teachers = scope.filter(Teacher.objects.all(), 'kindergarten_id')
+        return {
+            SearchToken.ENTITY_CHILD: scope.filter(
+                Child.objects.select_related('class_info'), 'class_info__kindergarten_id', 'class_info_id'
+            ),
+            SearchToken.ENTITY_TEACHER: teachers.select_related('kindergarten'),
+            SearchToken.ENTITY_AREA: scope.filter(
+                SelectionArea.objects.select_related('class_info'), 'class_info__kindergarten_id', 'class_info_id'
+            ),
+        }
+
+    def parse_params(self, request):
+        """
+        解析搜索关键词、对象类型和条数，参数错误时返回错误响应
+        """
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return None, Response({'error': '请输入搜索关键词'}, status=status.HTTP_400_BAD_REQUEST)
+
+        types = request.query_params.get('types')
+        entities = [item.strip() for item in types.split(',')] if types else list(self.default_entities)
+        invalid = [entity for entity in entities if entity not in self.allowed_entities]
+        if invalid:
+            return None, Response(
+                {'error': f'不支持的搜索类型：{", ".join(invalid)}'}, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            limit = min(max(int(request.query_params.get('limit', self.default_limit)), 1), self.max_limit)
+        except ValueError:
+            limit = self.default_limit
+        return (query, entities, limit), None
+
+    def describe(self, entity, obj):
+        """
+        返回搜索结果的补充说明：幼儿和选区为所属班级，教师为所属幼儿园
+        """
+        if entity == SearchToken.ENTITY_TEACHER:
+            related = obj.kindergarten
+        else:
+            related = obj.class_info
+        return related.name if related else None
+
+
+class SearchView(SearchViewMixin, APIView):
+    """
+    全局搜索接口，按姓名、电话搜索幼儿、教师和选区，结果按匹配程度排序
+
+    查询参数：
+        q: 搜索关键词，字母可匹配姓名拼音或首字母
+        types: 搜索的对象类型，多个以逗号分隔，默认全部（child、teacher、area）
+        limit: 每类最多返回的条数，默认10，最大50
+    """
+    def get(self, request):
+        params, error = self.parse_params(request)
+        if error is not None:
+            return error
+        query, entities, limit = params
+
+        querysets = self.get_querysets()
+        results = {}
+        for entity in entities:
+            results[entity] = [
+                {
+                    'id': obj.pk,
+                    'name': obj.name,
+                    'description': self.describe(entity, obj),
+                    'matched_field': field,
+                    'matched_value': getattr(obj, field),
+                    'match': kind,
+                }
+                for obj, field, kind in ranked_search(querysets[entity], entity, query, limit)
+            ]
+        return Response({'query': query, 'results': results})
+
+
+class PrefixSearchView(SearchViewMixin, APIView):
+    """
+    姓名前缀搜索接口，用于选区分配时快速选择幼儿
+
+    查询参数：
+        q: 姓名前缀，字母匹配全拼或首字母前缀，如 zs、zhang 匹配“张三”
+        types: child、teacher，默认 child
+        class_id: 只搜索指定班级的幼儿
+        limit: 每类最多返回的条数，默认20，最大50
+    """
+    default_limit = 20
+    allowed_entities = (SearchToken.ENTITY_CHILD, SearchToken.ENTITY_TEACHER)
+    default_entities = (SearchToken.ENTITY_CHILD,)
+
+    def get(self, request):
+        params, error = self.parse_params(request)
+        if error is not None:
+            return error
+        query, entities, limit = params
+
+        querysets = self.get_querysets()
+        class_id = request.query_params.get('class_id')
+        if class_id:
+            querysets[SearchToken.ENTITY_CHILD] = querysets[SearchToken.ENTITY_CHILD].filter(
+                class_info_id=class_id
+            )
+        results = {}
+        for entity in entities:
+            results[entity] = [
+                {'id': obj.pk, 'name': obj.name, 'description': self.describe(entity, obj)}
+                for obj in prefix_search(querysets[entity], entity, query, limit)
+            ]
+        return Response({'query': query, 'results': results})
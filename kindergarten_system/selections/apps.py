@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class SelectionsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'selections'
+
+    def ready(self):
+        # 注册选区汇总表的维护信号
+        from . import signals  # noqa: F401
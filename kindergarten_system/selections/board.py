@@ -0,0 +1,114 @@
+from django.db import models
+from django.http import Http404
+from django.utils import timezone
+from .models import SelectionArea, SelectionRecord
+from .events import record_version
+from children.models import Child
+from classes.models import Class
+
+
+def _file_url(request, field):
+    """
+    返回文件字段的完整地址，与 DRF 的 ImageField 输出一致
+    """
+    if not field:
+        return None
+    return request.build_absolute_uri(field.url) if request is not None else field.url
+
+
+def class_board_querysets(scope, class_id, today):
+    """
+    班级看板的3个查询集：按数据范围查找的班级、选区（以子查询注解当天人数）、
+    幼儿（以子查询注解当天在本班选区的记录）
+
+    同步和异步视图共用，分别以普通方式和异步 ORM 执行。
+    """
+    classes = scope.filter(Class.objects.filter(pk=class_id), 'kindergarten_id', 'id').only('id', 'name')
+
+    areas = SelectionArea.objects.filter(class_info_id=class_id).with_current_selections(
+        today
+    ).only('id', 'name', 'max_selections', 'image')
+
+    # 同一幼儿同一天只有一条记录，取当天在本班选区的有效记录
+    record = SelectionRecord.objects.filter(
+        child=models.OuterRef('pk'), date=today, is_active=True, selection_area__class_info_id=class_id
+    ).order_by()[:1]
+    children = Child.objects.filter(class_info_id=class_id, is_active=True).annotate(
+        record_id=models.Subquery(record.values('id')),
+        record_area_id=models.Subquery(record.values('selection_area_id')),
+        record_updated_at=models.Subquery(record.values('updated_at')),
+    ).only('id', 'name', 'gender', 'avatar').order_by('-created_at', '-id')
+    return classes, areas, children
+
+
+def format_class_board(request, class_obj, areas, children, today):
+    """
+    将查询结果整理为看板数据
+    """
+    roster = []
+    assignments = []
+    for child in children:
+        roster.append({
+            'id': child.id,
+            'name': child.name,
+            'gender': child.gender,
+            'avatar': _file_url(request, child.avatar),
+        })
+        if child.record_id is not None:
+            assignments.append({
+                'id': child.record_id,
+                'child': child.id,
+                'selection_area': child.record_area_id,
+                'updated_at': record_version(child.record_updated_at),
+            })
+
+    return {
+        'class': {'id': class_obj.id, 'name': class_obj.name},
+        'date': today.isoformat(),
+        'areas': [
+            {
+                'id': area.id,
+                'name': area.name,
+                'max_selections': area.max_selections,
+                'current_selections': area.current_selections_count,
+                'image': _file_url(request, area.image),
+            }
+            for area in areas
+        ],
+        'children': roster,
+        'assignments': assignments,
+    }
+
+
+def build_class_board(request, scope, class_id, today=None):
+    """
+    构建选区操作页面的班级看板：选区及当天人数、在园幼儿名单和当天的分配
+
+    无论选区和幼儿数量多少，都只执行固定的3条查询。
+
+    Args:
+        request: 当前请求，用于生成图片的完整地址
+        scope: 当前用户的数据范围
+        class_id: 班级ID，不在数据范围内时返回404
+        today: 看板日期，默认为当天
+    """
+    today = today or timezone.now().date()
+    classes, areas, children = class_board_querysets(scope, class_id, today)
+    class_obj = classes.first()
+    if class_obj is None:
+        raise Http404
+    return format_class_board(request, class_obj, list(areas), list(children), today)
+
+
+async def abuild_class_board(request, scope, class_id, today=None):
+    """
+    build_class_board 的异步版本，使用异步 ORM 执行查询
+    """
+    today = today or timezone.now().date()
+    classes, areas, children = class_board_querysets(scope, class_id, today)
+    class_obj = await classes.afirst()
+    if class_obj is None:
+        raise Http404
+    areas = [area async for area in areas]
+    children = [child async for child in children]
+    return format_class_board(request, class_obj, areas, children, today)
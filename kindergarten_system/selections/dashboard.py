@@ -0,0 +1,187 @@
+from datetime import timedelta
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+from .models import SelectionArea, SelectionDailyRollup
+from children.models import Child
+from classes.models import Class
+from teachers.models import Teacher
+
+
+# 趋势数据允许的最大天数
+MAX_TREND_DAYS = 90
+# 趋势数据的默认天数
+DEFAULT_TREND_DAYS = 7
+
+
+class DashboardScope:
+    """
+    仪表盘数据范围
+    - 系统所有者（及未登录用户）：全部数据
+    - 园长：本幼儿园数据
+    - 教师：本人负责班级的数据
+    """
+    def __init__(self, kindergarten_id=None, teacher_id=None, empty=False):
+        self.kindergarten_id = kindergarten_id
+        self.teacher_id = teacher_id
+        self.empty = empty
+
+    @classmethod
+    def for_user(cls, user):
+        """
+        根据用户角色构建数据范围，只读取外键ID，不产生额外查询
+        """
+        role = getattr(user, 'role', None)
+        if role == 'principal':
+            kindergarten_id = getattr(user, 'kindergarten_id', None)
+            return cls(kindergarten_id=kindergarten_id, empty=kindergarten_id is None)
+        if role == 'teacher':
+            teacher_id = getattr(user, 'teacher_id', None)
+            return cls(teacher_id=teacher_id, empty=teacher_id is None)
+        return cls()
+
+    def class_ids(self):
+        """
+        教师负责班级的ID子查询
+        """
+        return Class.objects.filter(teachers__id=self.teacher_id).values('id')
+
+    def apply(self, queryset, class_path, kindergarten_path=None):
+        """
+        将数据范围应用到查询集
+
+        Args:
+            queryset: 需要过滤的查询集
+            class_path (str): 指向班级的查询路径，班级本身传入 'id'
+            kindergarten_path (str): 指向幼儿园ID的查询路径，默认为 class_path 下的 kindergarten_id
+        """
+        if self.empty:
+            return queryset.none()
+        if self.kindergarten_id is not None:
+            if kindergarten_path is None:
+                kindergarten_path = f'{class_path}__kindergarten_id'
+            return queryset.filter(**{kindergarten_path: self.kindergarten_id})
+        if self.teacher_id is not None:
+            return queryset.filter(**{f'{class_path}__in': self.class_ids()})
+        return queryset
+
+
+def normalize_days(days_param):
+    """
+    解析趋势天数参数，非法值使用默认值，超过上限时截断
+    """
+    try:
+        days = int(days_param)
+    except (TypeError, ValueError):
+        return DEFAULT_TREND_DAYS
+    if days > MAX_TREND_DAYS:
+        return MAX_TREND_DAYS
+    if days < 1:
+        return DEFAULT_TREND_DAYS
+    return days
+
+
+def dashboard_querysets(user, days=DEFAULT_TREND_DAYS):
+    """
+    仪表盘的5条聚合查询：幼儿总数、选区总数、教师总数、班级统计、从每日汇总表读取的选区趋势
+
+    同步和异步视图共用，分别以普通方式和异步 ORM 执行。
+
+    Returns:
+        tuple: (查询集字典, 趋势开始日期, 当天日期)
+    """
+    scope = DashboardScope.for_user(user)
+    today = timezone.now().date()
+    start_date = today - timedelta(days=days - 1)
+
+    teachers_queryset = scope.apply(
+        Teacher.objects.all(), 'classes', kindergarten_path='kindergarten_id'
+    )
+    if scope.teacher_id is not None:
+        teachers_queryset = teachers_queryset.distinct()
+
+    querysets = {
+        'children': scope.apply(Child.objects.all(), 'class_info'),
+        'selection_areas': scope.apply(SelectionArea.objects.all(), 'class_info'),
+        'teachers': teachers_queryset,
+        # 班级统计：一次分组查询同时得到班级列表和在读学生数
+        'classes': scope.apply(
+            Class.objects.all(), 'id', kindergarten_path='kindergarten_id'
+        ).values('id', 'name').annotate(
+            student_count=Count('children', filter=Q(children__is_active=True))
+        ),
+        # 选区趋势：从每日汇总表按日期求和，同一幼儿每天只有一条记录，
+        # 因此有效记录数之和即已分配选区的幼儿数
+        'trend': scope.apply(
+            SelectionDailyRollup.objects.filter(date__gte=start_date, date__lte=today),
+            'class_info'
+        ).order_by().values('date').annotate(count=Sum('active_count')),
+    }
+    return querysets, start_date, today
+
+
+def format_dashboard_stats(totals, class_rows, trend_rows, start_date, today, days):
+    """
+    将查询结果整理为仪表盘数据
+
+    Args:
+        totals: 幼儿、选区、教师总数字典
+        class_rows: 班级统计行
+        trend_rows: 选区趋势行
+    """
+    class_stats = [
+        {
+            'class_id': row['id'],
+            'class_name': row['name'],
+            'student_count': row['student_count'],
+        }
+        for row in class_rows
+    ]
+
+    daily_counts = {row['date']: row['count'] for row in trend_rows}
+    selection_trend = []
+    for i in range(days):
+        date_point = start_date + timedelta(days=i)
+        selection_trend.append({
+            'date': date_point.strftime('%Y-%m-%d'),
+            'count': daily_counts.get(date_point, 0)
+        })
+
+    # 今天已分配选区的幼儿数即趋势数据的最后一天
+    total_children = totals['children']
+    assigned_children = daily_counts.get(today, 0)
+    unassigned_children = total_children - assigned_children if total_children > assigned_children else 0
+
+    return {
+        'total_children': total_children,
+        'total_selection_areas': totals['selection_areas'],
+        'assigned_children': assigned_children,
+        'unassigned_children': unassigned_children,
+        'selection_trend': selection_trend,
+        'total_classes': len(class_stats),
+        'total_teachers': totals['teachers'],
+        'class_statistics': class_stats
+    }
+
+
+def build_dashboard_stats(user, days=DEFAULT_TREND_DAYS):
+    """
+    计算仪表盘统计数据
+
+    无论班级数量和天数多少，都只执行固定的5条聚合查询。
+    """
+    querysets, start_date, today = dashboard_querysets(user, days)
+    totals = {name: querysets[name].count() for name in ('children', 'selection_areas', 'teachers')}
+    return format_dashboard_stats(
+        totals, list(querysets['classes']), list(querysets['trend']), start_date, today, days
+    )
+
+
+async def abuild_dashboard_stats(user, days=DEFAULT_TREND_DAYS):
+    """
+    build_dashboard_stats 的异步版本，使用异步 ORM 执行查询
+    """
+    querysets, start_date, today = dashboard_querysets(user, days)
+    totals = {name: await querysets[name].acount() for name in ('children', 'selection_areas', 'teachers')}
+    class_rows = [row async for row in querysets['classes']]
+    trend_rows = [row async for row in querysets['trend']]
+    return format_dashboard_stats(totals, class_rows, trend_rows, start_date, today, days)
@@ -0,0 +1,131 @@
+from collections import defaultdict
+from django.db import transaction
+from rest_framework import serializers
+from .models import SelectionArea
+from common.events import get_broker, publish_event
+from common.logger import get_logger
+
+
+logger = get_logger(__name__)
+
+
+# 选区记录的变化类型
+RECORD_CREATED = 'created'
+RECORD_MOVED = 'moved'
+RECORD_ENDED = 'ended'
+RECORD_DELETED = 'deleted'
+
+
+def board_channel(class_id):
+    """
+    班级看板的事件频道
+    """
+    return f'class-board:{class_id}'
+
+
+def record_version(updated_at):
+    """
+    记录的版本号：按接口的时间格式输出更新时间并保留微秒，
+    客户端批量调整选区时原样作为前置条件提交
+    """
+    return serializers.DateTimeField().to_representation(updated_at) if updated_at is not None else None
+
+
+def record_change(record, action, previous_area_id=None):
+    """
+    描述一条选区记录的变化
+
+    Args:
+        record: 变化后的选区记录（删除时为删除前的记录）
+        action: 变化类型
+        previous_area_id: 调整选区前所在的有效选区ID
+    """
+    return {
+        'action': action,
+        'id': record.pk,
+        'child': record.child_id,
+        'date': record.date,
+        'selection_area': record.selection_area_id,
+        'previous_selection_area': previous_area_id,
+        'updated_at': record_version(record.updated_at),
+    }
+
+
+def build_board_events(changes, channel_filter=None):
+    """
+    将记录变化按（班级、日期）分组，生成看板事件
+
+    每个事件包含受影响选区当天的有效人数和记录变化，每个日期执行一次查询。
+
+    Args:
+        changes: 记录变化列表
+        channel_filter: 判断频道是否需要生成事件的函数，先查出选区所属班级，
+            只统计需要生成事件的班级的选区人数
+
+    Returns:
+        list: (频道, 事件) 列表
+    """
+    area_ids_by_date = defaultdict(set)
+    for change in changes:
+        for area_id in (change['selection_area'], change['previous_selection_area']):
+            if area_id is not None:
+                area_ids_by_date[change['date']].add(area_id)
+
+    if channel_filter is not None:
+        all_area_ids = set().union(*area_ids_by_date.values())
+        class_ids = dict(SelectionArea.objects.filter(id__in=all_area_ids).values_list('id', 'class_info_id'))
+        wanted = {class_id for class_id in set(class_ids.values()) if channel_filter(board_channel(class_id))}
+        area_ids_by_date = {
+            record_date: {area_id for area_id in area_ids if class_ids.get(area_id) in wanted}
+            for record_date, area_ids in area_ids_by_date.items()
+        }
+
+    events = {}
+    class_by_area = {}
+    for record_date, area_ids in area_ids_by_date.items():
+        if not area_ids:
+            continue
+        areas = SelectionArea.objects.filter(id__in=area_ids).with_current_selections(
+            record_date
+        ).order_by('id').values('id', 'class_info_id', 'current_selections_count')
+        for area in areas:
+            class_by_area[area['id']] = area['class_info_id']
+            event = events.setdefault((area['class_info_id'], record_date), {
+                'type': 'occupancy',
+                'class_id': area['class_info_id'],
+                'date': record_date.isoformat(),
+                'areas': [],
+                'changes': [],
+            })
+            event['areas'].append({'id': area['id'], 'current_selections': area['current_selections_count']})
+
+    for change in changes:
+        key = (class_by_area.get(change['selection_area']), change['date'])
+        if key in events:
+            events[key]['changes'].append({**change, 'date': change['date'].isoformat()})
+    return [(board_channel(class_id), event) for (class_id, _), event in events.items()]
+
+
+def publish_record_changes(changes):
+    """
+    在事务提交后向相关班级看板广播选区人数和记录变化，回滚时不广播
+    """
+    changes = list(changes)
+    if not changes:
+        return
+
+    def publish():
+        broker = get_broker()
+        # 没有看板连接时不查询选区人数
+        if not broker.has_subscribers():
+            return
+        try:
+            events = build_board_events(changes, channel_filter=broker.has_subscribers)
+        except Exception:
+            # 数据已提交，广播失败时客户端在下次加载看板时得到最新数据
+            logger.exception('生成看板事件失败')
+            return
+        for channel, event in events:
+            publish_event(channel, event)
+
+    transaction.on_commit(publish)
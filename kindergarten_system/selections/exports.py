@@ -0,0 +1,107 @@
+import csv
+import tempfile
+from django.http import FileResponse, StreamingHttpResponse
+from openpyxl import Workbook
+from rest_framework import serializers
+from jobs.progress import report_progress
+
+
+# 导出列：（表头，查询字段）
+EXPORT_COLUMNS = [
+    ('幼儿姓名', 'child__name'),
+    ('选区名称', 'selection_area__name'),
+    ('所属班级', 'selection_area__class_info__name'),
+    ('选择时间', 'select_time'),
+    ('备注', 'notes'),
+]
+# 每次从数据库读取的行数
+EXPORT_CHUNK_SIZE = 2000
+# 支持的导出格式
+EXPORT_FORMATS = ('xlsx', 'csv')
+
+
+def iter_export_rows(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    按块读取选区记录并逐行生成导出数据
+
+    只查询导出列，不构建模型实例，内存占用与记录总数无关。
+    选择时间与接口返回的格式保持一致。
+    """
+    time_field = serializers.DateTimeField()
+    fields = [field for _, field in EXPORT_COLUMNS]
+    for count, (child_name, area_name, class_name, select_time, notes) in enumerate(
+        queryset.values_list(*fields).iterator(chunk_size=chunk_size), start=1
+    ):
+        if count % chunk_size == 0:
+            report_progress(message=f'已导出 {count} 行')
+        yield [
+            child_name,
+            area_name,
+            class_name,
+            time_field.to_representation(select_time) if select_time else '',
+            notes or '',
+        ]
+
+
+def build_xlsx_response(queryset, filename):
+    """
+    以 openpyxl 只写模式生成Excel文件
+
+    只写模式逐行写入临时文件，生成完成后以文件流返回，不在内存中保留整个工作簿。
+    """
+    workbook = Workbook(write_only=True)
+    worksheet = workbook.create_sheet('选区记录')
+    worksheet.append([title for title, _ in EXPORT_COLUMNS])
+    for row in iter_export_rows(queryset):
+        worksheet.append(row)
+
+    # 临时文件在响应发送完毕关闭后自动删除
+    output = tempfile.TemporaryFile()
+    workbook.save(output)
+    output.seek(0)
+    return FileResponse(
+        output,
+        as_attachment=True,
+        filename=f'{filename}.xlsx',
+        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    )
+
+
+class _Echo:
+    """
+    csv.writer 使用的伪文件对象，直接返回写入的内容
+    """
+    def write(self, value):
+        return value
+
+
+def build_csv_response(queryset, filename):
+    """
+    以流式响应逐行输出CSV文件
+    """
+    writer = csv.writer(_Echo())
+
+    def stream():
+        # 添加BOM，Excel打开时能正确识别UTF-8编码
+        yield '\ufeff'
+        yield writer.writerow([title for title, _ in EXPORT_COLUMNS])
+        for row in iter_export_rows(queryset):
+            yield writer.writerow(row)
+
+    response = StreamingHttpResponse(stream(), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{filename}.csv"'
+    return response
+
+
+def build_export_response(queryset, filename, file_format='xlsx'):
+    """
+    按格式生成导出响应
+
+    Args:
+        queryset: 选区记录查询集（已筛选和排序）
+        filename (str): 不含扩展名的文件名
+        file_format (str): 导出格式，xlsx 或 csv
+    """
+    if file_format == 'csv':
+        return build_csv_response(queryset, filename)
+    return build_xlsx_response(queryset, filename)
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+from selections.rollup import rebuild_daily_rollup, verify_daily_rollup
+
+
+class Command(BaseCommand):
+    """
+    从选区记录表重建选区每日汇总表，并与原始记录逐行核对
+    """
+    help = '重建选区每日汇总表并与选区记录核对'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date-from', help='起始日期（YYYY-MM-DD），默认不限')
+        parser.add_argument('--date-to', help='结束日期（YYYY-MM-DD），默认不限')
+        parser.add_argument(
+            '--verify-only',
+            action='store_true',
+            help='只核对汇总表，不进行重建'
+        )
+        parser.add_argument('--batch-size', type=int, default=1000, help='每批写入的汇总行数')
+
+    def handle(self, *args, **options):
+        date_from = options['date_from']
+        date_to = options['date_to']
+
+        if not options['verify_only']:
+            created = rebuild_daily_rollup(date_from, date_to, batch_size=options['batch_size'])
+            self.stdout.write(f'已重建 {created} 条汇总记录')
+
+        mismatches = verify_daily_rollup(date_from, date_to)
+        if mismatches:
+            for item in mismatches[:20]:
+                self.stderr.write(
+                    f"不一致 {item['key']}: 期望 {item['expected']}，实际 {item['actual']}"
+                )
+            raise CommandError(f'汇总表与选区记录不一致，共 {len(mismatches)} 处')
+
+        self.stdout.write(self.style.SUCCESS('汇总表与选区记录一致'))
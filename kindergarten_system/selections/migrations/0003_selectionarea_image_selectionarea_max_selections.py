@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('selections', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='selectionarea',
+            name='image',
+            field=models.ImageField(blank=True, help_text='选区的图片', null=True, upload_to='selection_areas/', verbose_name='选区图片'),
+        ),
+        migrations.AddField(
+            model_name='selectionarea',
+            name='max_selections',
+            field=models.PositiveIntegerField(default=10, help_text='该选区最多可容纳的幼儿数量', verbose_name='最大选区数'),
+        ),
+    ]
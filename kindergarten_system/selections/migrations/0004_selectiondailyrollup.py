@@ -0,0 +1,54 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, F, Q
+
+
+def populate_rollup(apps, schema_editor):
+    """
+    根据已有的选区记录初始化每日汇总表
+    """
+    SelectionRecord = apps.get_model('selections', 'SelectionRecord')
+    SelectionDailyRollup = apps.get_model('selections', 'SelectionDailyRollup')
+    rows = SelectionRecord.objects.order_by().values(
+        'date', 'selection_area_id', class_info_id=F('selection_area__class_info_id')
+    ).annotate(
+        active_count=Count('id', filter=Q(is_active=True)),
+        child_count=Count('child', distinct=True)
+    )
+    SelectionDailyRollup.objects.bulk_create(
+        [SelectionDailyRollup(**row) for row in rows.iterator()],
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('classes', '0001_initial'),
+        ('selections', '0003_selectionarea_image_selectionarea_max_selections'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SelectionDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='汇总日期')),
+                ('active_count', models.PositiveIntegerField(default=0, verbose_name='有效记录数')),
+                ('child_count', models.PositiveIntegerField(default=0, verbose_name='幼儿数')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+                ('class_info', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='selection_rollups', to='classes.class', verbose_name='所属班级')),
+                ('selection_area', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_rollups', to='selections.selectionarea', verbose_name='选区')),
+            ],
+            options={
+                'verbose_name': '选区每日汇总',
+                'verbose_name_plural': '选区每日汇总',
+                'db_table': 'selection_daily_rollups',
+                'ordering': ['-date', 'selection_area'],
+                'unique_together': {('date', 'class_info', 'selection_area')},
+            },
+        ),
+        migrations.RunPython(populate_rollup, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:59
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('children', '0002_child_child_class_active_idx'),
+        ('selections', '0004_selectiondailyrollup'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='selectionrecord',
+            index=models.Index(fields=['date', 'is_active', 'child'], name='sel_rec_date_active_child_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='selectionrecord',
+            index=models.Index(fields=['selection_area', 'date', 'is_active'], name='sel_rec_area_date_active_idx'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:02
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('children', '0003_child_child_created_idx'),
+        ('selections', '0005_selectionrecord_hot_path_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='selectionrecord',
+            index=models.Index(fields=['date', 'select_time', 'id'], name='sel_rec_keyset_idx'),
+        ),
+    ]
@@ -1,7 +1,34 @@
 from django.db import models
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 from classes.models import Class
 
+class SelectionAreaQuerySet(models.QuerySet):
+    """
+    选区查询集
+    """
+    def with_current_selections(self, date=None):
+        """
+        以子查询注解指定日期（默认当天）的有效选择人数，避免逐行统计
+
+        注解字段为 current_selections_count
+        """
+        if date is None:
+            date = timezone.now().date()
+        count_subquery = SelectionRecord.objects.filter(
+            selection_area=models.OuterRef('pk'),
+            date=date,
+            is_active=True
+        ).order_by().values('selection_area').annotate(
+            count=models.Count('id')
+        ).values('count')
+        return self.annotate(
+            current_selections_count=Coalesce(
+                models.Subquery(count_subquery, output_field=models.IntegerField()), 0
+            )
+        )
+
+
 class SelectionArea(models.Model):
     """
     选区定义模型
@@ -58,6 +85,8 @@ class SelectionArea(models.Model):
         auto_now=True
     )
     
+    objects = SelectionAreaQuerySet.as_manager()
+    
     class Meta:
         db_table = 'selection_areas'
         verbose_name = '选区定义'
@@ -162,6 +191,14 @@ class SelectionRecord(models.Model):
         ordering = ['-date', '-select_time']
         # 确保在同一天内，一个幼儿只能在一个选区
         unique_together = ('child', 'date')
+        indexes = [
+            # 按日期统计有效选择，包含幼儿ID可直接从索引得到结果
+            models.Index(fields=['date', 'is_active', 'child'], name='sel_rec_date_active_child_idx'),
+            # 统计每个选区当天的有效选择人数
+            models.Index(fields=['selection_area', 'date', 'is_active'], name='sel_rec_area_date_active_idx'),
+            # 列表默认排序及游标分页
+            models.Index(fields=['date', 'select_time', 'id'], name='sel_rec_keyset_idx'),
+        ]
     
     def __str__(self):
         return f'{self.child.name} - {self.selection_area.name} - {self.date}'
@@ -178,4 +215,57 @@ class SelectionRecord(models.Model):
         """
         获取选区所在的幼儿园
         """
-        return self.selection_area.class_info.kindergarten
\ No newline at end of file
+        return self.selection_area.class_info.kindergarten
+
+# 选区每日汇总模型
+class SelectionDailyRollup(models.Model):
+    """
+    选区每日汇总模型，按（日期、班级、选区）预先汇总选区记录，
+    供趋势图和仪表盘直接读取，避免扫描选区记录表
+    """
+    # 汇总日期
+    date = models.DateField('汇总日期')
+
+    # 所属班级
+    class_info = models.ForeignKey(
+        'classes.Class',
+        on_delete=models.CASCADE,
+        related_name='selection_rollups',
+        verbose_name='所属班级'
+    )
+
+    # 选区
+    selection_area = models.ForeignKey(
+        'SelectionArea',
+        on_delete=models.CASCADE,
+        related_name='daily_rollups',
+        verbose_name='选区'
+    )
+
+    # 有效记录数
+    active_count = models.PositiveIntegerField(
+        '有效记录数',
+        default=0
+    )
+
+    # 选择过该选区的幼儿数（去重，包含已结束的记录）
+    child_count = models.PositiveIntegerField(
+        '幼儿数',
+        default=0
+    )
+
+    # 更新时间
+    updated_at = models.DateTimeField(
+        '更新时间',
+        auto_now=True
+    )
+
+    class Meta:
+        db_table = 'selection_daily_rollups'
+        verbose_name = '选区每日汇总'
+        verbose_name_plural = '选区每日汇总'
+        unique_together = ('date', 'class_info', 'selection_area')
+        ordering = ['-date', 'selection_area']
+
+    def __str__(self):
+        return f'{self.date} - {self.selection_area.name} - {self.active_count}'
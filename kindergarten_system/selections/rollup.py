@@ -0,0 +1,138 @@
+from collections import defaultdict
+from django.db import transaction
+from django.db.models import Count, F, Q
+from .models import SelectionArea, SelectionRecord, SelectionDailyRollup
+
+
+def aggregate_records(records):
+    """
+    按（日期、班级、选区）分组汇总选区记录
+
+    Args:
+        records: 选区记录查询集
+
+    Returns:
+        QuerySet: 每行包含 date、class_info_id、selection_area_id、active_count、child_count
+    """
+    return records.order_by().values(
+        'date', 'selection_area_id', class_info_id=F('selection_area__class_info_id')
+    ).annotate(
+        active_count=Count('id', filter=Q(is_active=True)),
+        child_count=Count('child', distinct=True)
+    )
+
+
+def _build_rollups(rows):
+    return [
+        SelectionDailyRollup(
+            date=row['date'],
+            class_info_id=row['class_info_id'],
+            selection_area_id=row['selection_area_id'],
+            active_count=row['active_count'],
+            child_count=row['child_count']
+        )
+        for row in rows
+    ]
+
+
+def refresh_daily_rollup(keys):
+    """
+    增量维护汇总表：在事务提交后重新计算指定（日期、选区ID）的汇总行
+
+    重算在提交后的新事务中进行，先按主键顺序锁定相关选区，同一选区的重算依次执行；
+    锁定后的统计能看到先前已提交的全部变化，并发的结束、删除不会按旧快照覆盖彼此的结果。
+    不在事务中时立即重算。
+
+    Args:
+        keys: 可迭代的 (date, selection_area_id) 元组
+    """
+    areas_by_date = defaultdict(set)
+    for record_date, area_id in keys:
+        if record_date is not None and area_id is not None:
+            areas_by_date[record_date].add(area_id)
+    if not areas_by_date:
+        return
+    # 重算失败时数据已提交，记录日志，由 rebuild_selection_rollup 命令修复
+    transaction.on_commit(lambda: _recompute_daily_rollup(areas_by_date), robust=True)
+
+
+def _recompute_daily_rollup(areas_by_date):
+    with transaction.atomic():
+        area_ids = sorted(set().union(*areas_by_date.values()))
+        list(SelectionArea.objects.select_for_update().filter(pk__in=area_ids).order_by('pk').values_list('pk'))
+        for record_date, area_ids in areas_by_date.items():
+            rows = aggregate_records(
+                SelectionRecord.objects.filter(date=record_date, selection_area_id__in=area_ids)
+            )
+            SelectionDailyRollup.objects.filter(
+                date=record_date, selection_area_id__in=area_ids
+            ).delete()
+            SelectionDailyRollup.objects.bulk_create(_build_rollups(rows))
+
+
+def refresh_rollup_for_records(records):
+    """
+    根据选区记录刷新对应的汇总行
+    """
+    refresh_daily_rollup((record.date, record.selection_area_id) for record in records)
+
+
+def _date_range_filter(date_from=None, date_to=None):
+    condition = Q()
+    if date_from:
+        condition &= Q(date__gte=date_from)
+    if date_to:
+        condition &= Q(date__lte=date_to)
+    return condition
+
+
+def rebuild_daily_rollup(date_from=None, date_to=None, batch_size=1000):
+    """
+    从选区记录表全量重建汇总表
+
+    Returns:
+        int: 写入的汇总行数
+    """
+    date_filter = _date_range_filter(date_from, date_to)
+    rows = aggregate_records(SelectionRecord.objects.filter(date_filter))
+    created = 0
+    with transaction.atomic():
+        SelectionDailyRollup.objects.filter(date_filter).delete()
+        batch = []
+        for row in rows.iterator(chunk_size=batch_size):
+            batch.append(row)
+            if len(batch) >= batch_size:
+                created += len(SelectionDailyRollup.objects.bulk_create(_build_rollups(batch)))
+                batch = []
+        if batch:
+            created += len(SelectionDailyRollup.objects.bulk_create(_build_rollups(batch)))
+    return created
+
+
+def verify_daily_rollup(date_from=None, date_to=None):
+    """
+    将汇总表与选区记录表逐行比对
+
+    Returns:
+        list: 不一致的行，每项包含 key、expected、actual
+    """
+    date_filter = _date_range_filter(date_from, date_to)
+    expected = {
+        (row['date'], row['class_info_id'], row['selection_area_id']): (row['active_count'], row['child_count'])
+        for row in aggregate_records(SelectionRecord.objects.filter(date_filter)).iterator()
+    }
+    actual = {
+        (row['date'], row['class_info_id'], row['selection_area_id']): (row['active_count'], row['child_count'])
+        for row in SelectionDailyRollup.objects.filter(date_filter).values(
+            'date', 'class_info_id', 'selection_area_id', 'active_count', 'child_count'
+        ).iterator()
+    }
+    mismatches = []
+    for key in sorted(set(expected) | set(actual), key=str):
+        if expected.get(key) != actual.get(key):
+            mismatches.append({
+                'key': key,
+                'expected': expected.get(key),
+                'actual': actual.get(key)
+            })
+    return mismatches
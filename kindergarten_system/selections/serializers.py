@@ -4,8 +4,13 @@ from .models import SelectionArea, SelectionRecord
 from children.models import Child
 from classes.models import Class
 from users.models import User
+from django.db import transaction
 from django.utils import timezone
 from datetime import date
+from .events import (
+    RECORD_CREATED, RECORD_DELETED, RECORD_MOVED, publish_record_changes, record_change
+)
+from .rollup import refresh_daily_rollup
 
 class SelectionAreaSerializer(serializers.ModelSerializer):
     """
@@ -30,6 +35,10 @@ class SelectionAreaSerializer(serializers.ModelSerializer):
         """
         获取该选区当天已选择的人数
         """
+        # 优先使用查询集注解的人数，未注解的实例才单独查询
+        annotated_count = getattr(obj, 'current_selections_count', None)
+        if annotated_count is not None:
+            return annotated_count
         today = timezone.now().date()
         return SelectionRecord.objects.filter(
             selection_area=obj,
@@ -187,46 +196,38 @@ class SelectionRecordCreateSerializer(serializers.ModelSerializer):
     
     def create(self, validated_data):
         """
-        创建选区记录
+        创建选区记录，同一幼儿同一天已有记录时更新原记录
         """
-        # 获取关联的对象
-        child = Child.objects.get(id=validated_data.pop('child_id'))
-        selection_area = SelectionArea.objects.get(id=validated_data.pop('selection_area_id'))
-        
-        # 验证幼儿和选区属于同一个班级
-        if child.class_info != selection_area.class_info:
-            raise serializers.ValidationError('幼儿和选区不属于同一个班级')
-        
-        # 设置选择时间
-        select_time = validated_data.get('select_time') or timezone.now()
-        
-        # 从选择时间中提取日期
-        record_date = select_time.date()
-        
-        # 检查是否已存在该幼儿在该日期的记录
-        try:
-            existing_record = SelectionRecord.objects.get(
-                child=child,
-                date=record_date
-            )
-            # 如果存在，更新现有记录而不是创建新记录
-            existing_record.selection_area = selection_area
-            existing_record.select_time = select_time
-            existing_record.is_active = True
-            existing_record.notes = validated_data.get('notes', existing_record.notes)
-            existing_record.operated_by = validated_data.get('operated_by', existing_record.operated_by)
-            existing_record.updated_at = timezone.now()
-            existing_record.save()
-            return existing_record
-        except SelectionRecord.DoesNotExist:
-            # 如果不存在，创建新记录
-            validated_data['date'] = record_date
-            validated_data['child'] = child
-            validated_data['selection_area'] = selection_area
-            validated_data['is_active'] = True
-            validated_data['select_time'] = select_time
-            
-            return super().create(validated_data)
+        # 在方法内导入，避免与 services 模块循环引用
+        from .services import assign_selection_area
+        return assign_selection_area(
+            validated_data.pop('child_id'),
+            validated_data.pop('selection_area_id'),
+            validated_data.pop('select_time', None),
+            **validated_data
+        )
+
+
+class SelectionRecordBatchItemSerializer(serializers.Serializer):
+    """
+    批量创建选区记录时单条记录的序列化器
+    只做字段格式校验，幼儿、选区等关联对象由批量服务统一加载和校验
+    """
+    child_id = serializers.IntegerField()
+    selection_area_id = serializers.IntegerField()
+    select_time = serializers.DateTimeField(required=False)
+    notes = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+    operated_by = serializers.IntegerField(required=False, allow_null=True)
+
+
+class SelectionRecordMoveItemSerializer(serializers.Serializer):
+    """
+    批量调整选区时单条调整的序列化器
+    updated_at 为客户端读取记录时的更新时间，作为乐观并发控制的前置条件
+    """
+    id = serializers.IntegerField()
+    selection_area_id = serializers.IntegerField()
+    updated_at = serializers.DateTimeField()
 
 
 class SelectionRecordUpdateSerializer(serializers.ModelSerializer):
@@ -290,7 +291,30 @@ class SelectionRecordUpdateSerializer(serializers.ModelSerializer):
             # 从选择时间中提取日期并设置date字段
             validated_data['date'] = select_time.date()
         
-        return super().update(instance, validated_data)
+        # 记录更新前的日期和选区，用于刷新每日汇总
+        previous_key = (instance.date, instance.selection_area_id)
+        record_date = validated_data.get('date', instance.date)
+        with transaction.atomic():
+            # 有效记录移动到其他选区或日期时，锁定目标选区并检查容量
+            if instance.is_active and (record_date, selection_area.id) != previous_key:
+                from .services import reserve_area_capacity
+                reserve_area_capacity(selection_area.id, record_date, child.id)
+            instance = super().update(instance, validated_data)
+            refresh_daily_rollup([previous_key, (instance.date, instance.selection_area_id)])
+            # 有效记录的变化广播到班级看板，调整日期视为从原日期删除、在新日期创建
+            if instance.is_active:
+                if instance.date == previous_key[0]:
+                    changes = [record_change(instance, RECORD_MOVED, previous_key[1])]
+                else:
+                    changes = [
+                        {
+                            **record_change(instance, RECORD_DELETED),
+                            'date': previous_key[0], 'selection_area': previous_key[1]
+                        },
+                        record_change(instance, RECORD_CREATED),
+                    ]
+                publish_record_changes(changes)
+        return instance
 
 class SelectionFilterSerializer(serializers.Serializer):
     """
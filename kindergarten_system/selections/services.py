@@ -0,0 +1,501 @@
+import random
+import time
+from collections import Counter
+from django.db import connections, transaction, IntegrityError, OperationalError
+from django.db.models import Count
+from django.utils import timezone
+from rest_framework import serializers
+from .models import SelectionArea, SelectionRecord
+from .events import RECORD_CREATED, RECORD_MOVED, publish_record_changes, record_change, record_version
+from .rollup import refresh_daily_rollup
+from .serializers import SelectionRecordBatchItemSerializer, SelectionRecordMoveItemSerializer
+from children.models import Child
+from users.models import User
+from common.cache import bump_model_versions
+
+
+# 批量写入时每次提交的记录数
+BULK_BATCH_SIZE = 500
+# 并发冲突（唯一约束冲突、死锁、数据库锁等待超时）时的最大尝试次数
+ASSIGN_MAX_ATTEMPTS = 5
+# 重试前的基础等待秒数，每次重试翻倍并加入随机抖动
+ASSIGN_RETRY_DELAY = 0.02
+
+
+class BatchSelectionError(Exception):
+    """
+    批量创建选区记录校验失败，errors 为按记录序号列出的错误
+    """
+    def __init__(self, errors):
+        super().__init__('批量创建选区记录失败')
+        self.errors = errors
+
+
+class SelectionMoveConflict(Exception):
+    """
+    批量调整选区时记录已被其他操作修改或删除，conflicts 为冲突记录及其当前状态
+    """
+    def __init__(self, conflicts):
+        super().__init__('选区记录已被修改')
+        self.conflicts = conflicts
+
+
+def reserve_area_capacity(selection_area_id, record_date, child_id):
+    """
+    锁定选区并检查指定日期的剩余容量，必须在事务中调用
+
+    选区行使用 select_for_update 加锁，同一选区的分配请求在此排队，
+    锁定后统计的占用人数不会被其他事务并发修改。
+
+    Args:
+        selection_area_id (int): 选区ID
+        record_date (date): 记录日期
+        child_id (int): 幼儿ID，该幼儿在当天已有的记录不计入占用人数
+
+    Returns:
+        SelectionArea: 已加锁的选区
+
+    Raises:
+        serializers.ValidationError: 选区不存在或人数已满
+    """
+    try:
+        selection_area = SelectionArea.objects.select_for_update().get(pk=selection_area_id)
+    except SelectionArea.DoesNotExist:
+        raise serializers.ValidationError({'selection_area_id': ['指定的选区不存在']})
+
+    occupied = SelectionRecord.objects.filter(
+        selection_area_id=selection_area.id,
+        date=record_date,
+        is_active=True
+    ).exclude(child_id=child_id).count()
+    if occupied >= selection_area.max_selections:
+        raise serializers.ValidationError(
+            {'selection_area_id': [f'选区“{selection_area.name}”人数已满']}
+        )
+    return selection_area
+
+
+def _assign(child_id, selection_area_id, select_time, fields):
+    record_date = select_time.date()
+    try:
+        child = Child.objects.get(pk=child_id)
+    except Child.DoesNotExist:
+        raise serializers.ValidationError({'child_id': ['指定的幼儿不存在']})
+
+    # 先锁选区再锁记录，所有分配请求按相同顺序加锁
+    selection_area = reserve_area_capacity(selection_area_id, record_date, child.id)
+    if child.class_info_id != selection_area.class_info_id:
+        raise serializers.ValidationError('幼儿和选区不属于同一个班级')
+    record = SelectionRecord.objects.select_for_update().filter(
+        child_id=child.id, date=record_date
+    ).first()
+
+    if record is not None:
+        previous_area_id = record.selection_area_id
+        was_active = record.is_active
+        record.selection_area = selection_area
+        record.select_time = select_time
+        record.is_active = True
+        for field, value in fields.items():
+            setattr(record, field, value)
+        record.updated_at = timezone.now()
+        record.save()
+        refresh_daily_rollup([(record_date, previous_area_id), (record_date, selection_area.id)])
+        if was_active:
+            publish_record_changes([record_change(record, RECORD_MOVED, previous_area_id)])
+        else:
+            publish_record_changes([record_change(record, RECORD_CREATED)])
+        return record
+
+    record = SelectionRecord.objects.create(
+        child=child,
+        selection_area=selection_area,
+        date=record_date,
+        select_time=select_time,
+        is_active=True,
+        **fields
+    )
+    refresh_daily_rollup([(record_date, selection_area.id)])
+    publish_record_changes([record_change(record, RECORD_CREATED)])
+    return record
+
+
+def assign_selection_area(child_id, selection_area_id, select_time=None, **fields):
+    """
+    为幼儿分配选区，同一幼儿同一天只保留一条记录
+
+    在事务中锁定目标选区后检查容量，再更新或创建（幼儿、日期）记录，
+    并发请求不会超出选区的最大人数。两个请求同时为同一幼儿创建记录时，
+    后提交的请求会因唯一约束冲突回滚并重试，重试时更新已有记录。
+    不在外层事务中调用时，死锁和锁等待超时同样会回滚重试。
+
+    Args:
+        child_id (int): 幼儿ID
+        selection_area_id (int): 选区ID
+        select_time (datetime): 选择时间，默认当前时间
+        **fields: 其他需要写入的字段，如 notes、operated_by
+
+    Returns:
+        SelectionRecord: 更新或创建的选区记录
+
+    Raises:
+        serializers.ValidationError: 幼儿或选区不存在、不属于同一班级或选区人数已满
+    """
+    select_time = select_time or timezone.now()
+    # 处于外层事务中时死锁会回滚整个外层事务，只能重试回滚到保存点的唯一约束冲突
+    nested = transaction.get_connection().in_atomic_block
+    for attempt in range(ASSIGN_MAX_ATTEMPTS):
+        try:
+            with transaction.atomic():
+                return _assign(child_id, selection_area_id, select_time, fields)
+        except (IntegrityError, OperationalError) as e:
+            retryable = isinstance(e, IntegrityError) or not nested
+            if not retryable or attempt == ASSIGN_MAX_ATTEMPTS - 1:
+                raise
+            time.sleep(ASSIGN_RETRY_DELAY * (2 ** attempt) * (1 + random.random()))
+
+
+def _write_batch(items, errors):
+    """
+    在事务中加载关联对象、校验并写入批量记录，返回最终写入的（幼儿、日期）及其数据
+    """
+    # 一次性加载关联对象
+    children = Child.objects.in_bulk({item['child_id'] for item in items})
+    # 选区按主键顺序加锁，与单条分配共用同一把锁，容量检查期间占用人数不会被并发修改
+    areas = SelectionArea.objects.select_for_update().order_by('pk').in_bulk(
+        {item['selection_area_id'] for item in items}
+    )
+    operator_ids = {item['operated_by'] for item in items if item.get('operated_by')}
+    operators = User.objects.in_bulk(operator_ids) if operator_ids else {}
+
+    valid_items = []
+    for item in items:
+        item_errors = {}
+        child = children.get(item['child_id'])
+        area = areas.get(item['selection_area_id'])
+        if child is None:
+            item_errors['child_id'] = ['指定的幼儿不存在']
+        if area is None:
+            item_errors['selection_area_id'] = ['指定的选区不存在']
+        if item.get('operated_by') and item['operated_by'] not in operators:
+            item_errors['operated_by'] = ['指定的操作教师不存在']
+        if child is not None and area is not None and child.class_info_id != area.class_info_id:
+            item_errors['non_field_errors'] = ['幼儿和选区不属于同一个班级']
+        if item_errors:
+            errors.append({'index': item['index'], 'errors': item_errors})
+        else:
+            valid_items.append(item)
+
+    # 加载已有记录和选区当前占用人数
+    child_ids = {item['child_id'] for item in valid_items}
+    dates = {item['date'] for item in valid_items}
+    existing = {}
+    occupancy = Counter()
+    if valid_items:
+        # 已有记录在选区之后按主键顺序加锁，与单条分配的加锁顺序一致，并发分配不会被覆盖
+        existing = {
+            (record.child_id, record.date): record
+            for record in SelectionRecord.objects.select_for_update().filter(
+                child_id__in=child_ids, date__in=dates
+            ).order_by('pk')
+        }
+        occupancy.update({
+            (row['selection_area_id'], row['date']): row['count']
+            for row in SelectionRecord.objects.filter(
+                selection_area_id__in={item['selection_area_id'] for item in valid_items},
+                date__in=dates,
+                is_active=True
+            ).order_by().values('selection_area_id', 'date').annotate(count=Count('id'))
+        })
+
+    # 按提交顺序在内存中模拟分配，校验选区容量
+    # current 记录每个（幼儿、日期）当前所在的有效选区
+    current = {
+        key: record.selection_area_id
+        for key, record in existing.items() if record.is_active
+    }
+    final_items = {}
+    for item in valid_items:
+        key = (item['child_id'], item['date'])
+        area = areas[item['selection_area_id']]
+        previous_area_id = current.get(key)
+        if previous_area_id != area.id:
+            if occupancy[(area.id, item['date'])] >= area.max_selections:
+                errors.append({
+                    'index': item['index'],
+                    'errors': {'selection_area_id': [f'选区“{area.name}”人数已满']}
+                })
+                continue
+            if previous_area_id is not None:
+                occupancy[(previous_area_id, item['date'])] -= 1
+            occupancy[(area.id, item['date'])] += 1
+            current[key] = area.id
+        # 同一幼儿同一天出现多次时以最后一条为准
+        final_items[key] = item
+
+    if errors:
+        raise BatchSelectionError(sorted(errors, key=lambda error: error['index']))
+
+    now = timezone.now()
+    to_update = []
+    to_create = []
+    rollup_keys = set()
+    # 已有记录调整前所在的有效选区
+    previous_areas = {}
+    for key, item in final_items.items():
+        record = existing.get(key)
+        if record is not None:
+            rollup_keys.add((record.date, record.selection_area_id))
+            previous_areas[key] = record.selection_area_id if record.is_active else None
+            record.selection_area_id = item['selection_area_id']
+            record.select_time = item['select_time']
+            record.is_active = True
+            record.notes = item.get('notes', record.notes)
+            record.operated_by_id = item.get('operated_by', record.operated_by_id)
+            record.updated_at = now
+            to_update.append(record)
+        else:
+            to_create.append(SelectionRecord(
+                child_id=item['child_id'],
+                selection_area_id=item['selection_area_id'],
+                date=item['date'],
+                select_time=item['select_time'],
+                is_active=True,
+                notes=item.get('notes'),
+                operated_by_id=item.get('operated_by'),
+                created_at=now,
+                updated_at=now
+            ))
+        rollup_keys.add((item['date'], item['selection_area_id']))
+
+    update_fields = ['selection_area', 'select_time', 'is_active', 'notes', 'operated_by', 'updated_at']
+    if to_update:
+        SelectionRecord.objects.bulk_update(to_update, update_fields, batch_size=BULK_BATCH_SIZE)
+    if to_create:
+        # 并发插入的同一（幼儿、日期）记录会被更新而不是报错；
+        # MySQL 不支持指定冲突字段，ON DUPLICATE KEY UPDATE 按唯一约束自动匹配
+        conflict_options = {'update_conflicts': True, 'update_fields': update_fields}
+        if connections[SelectionRecord.objects.db].features.supports_update_conflicts_with_target:
+            conflict_options['unique_fields'] = ['child', 'date']
+        SelectionRecord.objects.bulk_create(to_create, batch_size=BULK_BATCH_SIZE, **conflict_options)
+    refresh_daily_rollup(rollup_keys)
+    # 批量写入不发送信号，需要自行使依赖选区记录的响应缓存失效
+    bump_model_versions('selections.SelectionRecord')
+    # 部分数据库批量创建后不回填主键，此时变化中的记录ID为空
+    publish_record_changes(
+        record_change(record, RECORD_MOVED, previous_areas[(record.child_id, record.date)])
+        if previous_areas.get((record.child_id, record.date)) is not None
+        else record_change(record, RECORD_CREATED)
+        for record in to_update + to_create
+    )
+
+    return final_items
+
+
+def batch_create_selection_records(records_data):
+    """
+    批量创建选区记录
+
+    在一个事务中锁定涉及的选区，幼儿、选区、操作教师、已有记录和选区占用人数
+    各用一次查询加载，同班级和选区容量校验在内存中完成。全部记录校验通过后，
+    按（幼儿、日期）唯一约束批量更新已有记录、批量创建新记录；
+    任意一条记录校验失败时不写入任何数据。
+
+    Args:
+        records_data (list): 记录数据列表，每项包含 child_id、selection_area_id，
+            可选 select_time、notes、operated_by
+
+    Returns:
+        list: 写入后的选区记录（已关联查询幼儿、选区、班级、幼儿园和操作教师）
+
+    Raises:
+        BatchSelectionError: 存在校验失败的记录
+    """
+    errors = []
+    items = []
+
+    # 字段格式校验
+    for index, record_data in enumerate(records_data):
+        item_serializer = SelectionRecordBatchItemSerializer(data=record_data)
+        if item_serializer.is_valid():
+            item = dict(item_serializer.validated_data)
+            item['index'] = index
+            item['select_time'] = item.get('select_time') or timezone.now()
+            item['date'] = item['select_time'].date()
+            items.append(item)
+        else:
+            errors.append({'index': index, 'errors': item_serializer.errors})
+
+    with transaction.atomic():
+        final_items = _write_batch(items, errors)
+
+    if not final_items:
+        return []
+    written = {
+        (record.child_id, record.date): record
+        for record in SelectionRecord.objects.filter(
+            child_id__in={key[0] for key in final_items},
+            date__in={key[1] for key in final_items}
+        ).select_related(
+            'child', 'child__class_info', 'selection_area', 'selection_area__class_info',
+            'selection_area__class_info__kindergarten', 'operated_by'
+        )
+    }
+    return [written[key] for key in final_items if key in written]
+
+
+def _move_records(items, scope):
+    """
+    在事务中锁定选区和记录、检查前置条件和容量，并写入选区调整，返回发生变化的记录
+    """
+    target_area_ids = {item['selection_area_id'] for item in items}
+    # 与单条分配相同，先按主键顺序锁定目标选区，再锁定记录
+    areas = SelectionArea.objects.select_for_update().order_by('pk').in_bulk(target_area_ids)
+    records = SelectionRecord.objects.select_for_update().order_by('pk').in_bulk(
+        [item['id'] for item in items]
+    )
+    # 数据范围单独查询，加锁的查询不关联班级表
+    visible_area_ids = set(scope.filter(
+        SelectionArea.objects.filter(
+            id__in=target_area_ids | {record.selection_area_id for record in records.values()}
+        ),
+        'class_info__kindergarten_id',
+        'class_info_id'
+    ).values_list('id', flat=True))
+
+    # 记录已删除、不在数据范围内或更新时间与前置条件不一致时视为冲突
+    conflicts = []
+    for item in items:
+        record = records.get(item['id'])
+        if record is None or record.selection_area_id not in visible_area_ids:
+            conflicts.append({'index': item['index'], 'id': item['id'], 'current': None})
+        elif record.updated_at != item['updated_at']:
+            conflicts.append({
+                'index': item['index'],
+                'id': item['id'],
+                'current': {
+                    'selection_area': record.selection_area_id,
+                    'date': record.date,
+                    'is_active': record.is_active,
+                    'updated_at': record_version(record.updated_at),
+                },
+            })
+    if conflicts:
+        raise SelectionMoveConflict(conflicts)
+
+    child_classes = dict(Child.objects.filter(
+        id__in={record.child_id for record in records.values()}
+    ).values_list('id', 'class_info_id'))
+    errors = []
+    moves = []
+    for item in items:
+        record = records[item['id']]
+        area = areas.get(item['selection_area_id'])
+        item_errors = {}
+        if area is None or area.id not in visible_area_ids:
+            item_errors['selection_area_id'] = ['指定的选区不存在']
+        elif child_classes.get(record.child_id) != area.class_info_id:
+            item_errors['non_field_errors'] = ['幼儿和选区不属于同一个班级']
+        if not record.is_active:
+            item_errors['id'] = ['选区记录已结束，不能调整选区']
+        if item_errors:
+            errors.append({'index': item['index'], 'errors': item_errors})
+        elif record.selection_area_id != area.id:
+            moves.append((item, record, area))
+    if errors:
+        raise BatchSelectionError(errors)
+    if not moves:
+        return []
+
+    # 按全部调整完成后的人数校验容量，班级内互换选区不会因中间状态超员而失败
+    dates = {record.date for _, record, _ in moves}
+    occupancy = Counter({
+        (row['selection_area_id'], row['date']): row['count']
+        for row in SelectionRecord.objects.filter(
+            selection_area_id__in={area.id for _, _, area in moves},
+            date__in=dates,
+            is_active=True
+        ).order_by().values('selection_area_id', 'date').annotate(count=Count('id'))
+    })
+    delta = Counter()
+    for _, record, area in moves:
+        delta[(record.selection_area_id, record.date)] -= 1
+        delta[(area.id, record.date)] += 1
+    for item, record, area in moves:
+        key = (area.id, record.date)
+        if delta[key] > 0 and occupancy[key] + delta[key] > area.max_selections:
+            errors.append({
+                'index': item['index'],
+                'errors': {'selection_area_id': [f'选区“{area.name}”人数已满']}
+            })
+    if errors:
+        raise BatchSelectionError(errors)
+
+    now = timezone.now()
+    rollup_keys = set()
+    changes = []
+    for _, record, area in moves:
+        previous_area_id = record.selection_area_id
+        rollup_keys.update({(record.date, previous_area_id), (record.date, area.id)})
+        record.selection_area_id = area.id
+        record.updated_at = now
+        changes.append(record_change(record, RECORD_MOVED, previous_area_id))
+    moved = [record for _, record, _ in moves]
+    SelectionRecord.objects.bulk_update(moved, ['selection_area', 'updated_at'], batch_size=BULK_BATCH_SIZE)
+    refresh_daily_rollup(rollup_keys)
+    # 批量写入不发送信号，需要自行使依赖选区记录的响应缓存失效
+    bump_model_versions('selections.SelectionRecord')
+    publish_record_changes(changes)
+    return moved
+
+
+def bulk_move_selection_records(moves_data, scope):
+    """
+    批量调整选区记录所在的选区，用于拖拽重新分配整个班级
+
+    每项调整以客户端读取到的 updated_at 作为前置条件，记录已被其他操作修改、
+    已删除或不在数据范围内时视为冲突，不写入任何数据。
+    在一个事务中按主键顺序锁定目标选区后锁定记录，同班级和选区容量校验在内存中完成，
+    查询次数与调整的记录数无关。选区没有变化的记录不会更新。
+
+    Args:
+        moves_data (list): 调整列表，每项包含 id、selection_area_id、updated_at
+        scope (UserScope): 当前用户的数据范围
+
+    Returns:
+        list: 选区发生变化的记录（已关联查询幼儿、选区、班级、幼儿园和操作教师），按提交顺序排列
+
+    Raises:
+        BatchSelectionError: 存在格式错误、校验失败或重复的调整
+        SelectionMoveConflict: 存在前置条件不满足的记录
+    """
+    errors = []
+    items = []
+    record_ids = set()
+    for index, move_data in enumerate(moves_data):
+        item_serializer = SelectionRecordMoveItemSerializer(data=move_data)
+        if not item_serializer.is_valid():
+            errors.append({'index': index, 'errors': item_serializer.errors})
+            continue
+        item = dict(item_serializer.validated_data)
+        item['index'] = index
+        if item['id'] in record_ids:
+            errors.append({'index': index, 'errors': {'id': ['同一记录不能重复调整']}})
+            continue
+        record_ids.add(item['id'])
+        items.append(item)
+    if errors:
+        raise BatchSelectionError(errors)
+    if not items:
+        return []
+
+    with transaction.atomic():
+        moved = _move_records(items, scope)
+
+    if not moved:
+        return []
+    written = SelectionRecord.objects.select_related(
+        'child', 'child__class_info', 'selection_area', 'selection_area__class_info',
+        'selection_area__class_info__kindergarten', 'operated_by'
+    ).in_bulk([record.id for record in moved])
+    return [written[record.id] for record in moved if record.id in written]
@@ -0,0 +1,39 @@
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+from django.dispatch import receiver
+from children.models import Child
+from .models import SelectionArea, SelectionRecord, SelectionDailyRollup
+from .rollup import refresh_daily_rollup
+
+
+@receiver(pre_delete, sender=Child)
+def remember_child_rollup_keys(sender, instance, **kwargs):
+    """
+    删除幼儿前记录其选区记录涉及的（日期、选区），选区记录会随幼儿级联删除
+    """
+    instance._rollup_keys = list(
+        SelectionRecord.objects.filter(child=instance).values_list('date', 'selection_area_id').distinct()
+    )
+
+
+@receiver(post_delete, sender=Child)
+def child_deleted(sender, instance, **kwargs):
+    refresh_daily_rollup(getattr(instance, '_rollup_keys', ()))
+
+
+@receiver(pre_save, sender=SelectionArea)
+def remember_area_class(sender, instance, raw=False, **kwargs):
+    previous = None
+    if not raw and instance.pk is not None:
+        previous = SelectionArea.objects.filter(pk=instance.pk).values_list('class_info_id', flat=True).first()
+    instance._rollup_previous_class_id = previous
+
+
+@receiver(post_save, sender=SelectionArea)
+def area_saved(sender, instance, created, raw=False, **kwargs):
+    """
+    选区更换班级时，同步该选区汇总行的所属班级
+    """
+    previous = getattr(instance, '_rollup_previous_class_id', None)
+    if raw or created or previous is None or previous == instance.class_info_id:
+        return
+    SelectionDailyRollup.objects.filter(selection_area=instance).update(class_info_id=instance.class_info_id)
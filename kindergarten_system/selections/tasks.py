@@ -0,0 +1,61 @@
+from datetime import date
+from rest_framework import status
+from rest_framework.response import Response
+from .models import SelectionRecord
+from .exports import build_export_response, EXPORT_FORMATS
+from users.scope import UserScope
+from search.index import search_filter
+from jobs.registry import register_task
+
+
+@register_task('selections.export')
+def export_selection_records(user, params, upload):
+    """
+    导出选区记录为Excel或CSV文件
+    """
+    # 系统所有者导出所有记录，园长导出自己幼儿园的记录，教师导出自己负责班级的记录
+    queryset = UserScope(user).filter(
+        SelectionRecord.objects.select_related(
+            'child', 'child__class_info', 'selection_area', 'selection_area__class_info',
+            'selection_area__class_info__kindergarten', 'operated_by'
+        ),
+        'selection_area__class_info__kindergarten_id',
+        'selection_area__class_info_id'
+    )
+    
+    # 应用筛选条件
+    class_id = params.get('class_id')
+    if class_id:
+        queryset = queryset.filter(selection_area__class_info_id=class_id)
+    
+    child_name = params.get('child_name')
+    if child_name:
+        queryset = search_filter(queryset, 'child', child_name, fields=['name'], prefix='child__')
+    
+    selection_area_id = params.get('selection_area_id')
+    if selection_area_id:
+        queryset = queryset.filter(selection_area_id=selection_area_id)
+    
+    date_from = params.get('date_from')
+    if date_from:
+        queryset = queryset.filter(date__gte=date_from)
+    
+    date_to = params.get('date_to')
+    if date_to:
+        queryset = queryset.filter(date__lte=date_to)
+    
+    # 应用排序
+    ordering = params.get('ordering', '-select_time')
+    queryset = queryset.order_by(ordering)
+    
+    # 导出格式，默认为Excel（format 参数已被DRF用于内容协商）
+    file_format = params.get('file_format', 'xlsx')
+    if file_format not in EXPORT_FORMATS:
+        return Response(
+            {'error': f'不支持的导出格式: {file_format}'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    # 流式导出，按块读取数据，内存占用与记录数无关
+    filename = f'selection_records_{date.today().strftime("%Y%m%d")}'
+    return build_export_response(queryset, filename, file_format)
@@ -1,3 +1,1035 @@
-from django.test import TestCase
+import asyncio
+import csv
+import threading
+from datetime import timedelta
+from io import BytesIO, StringIO
+from unittest import mock
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings, skipUnlessDBFeature
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from openpyxl import load_workbook
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from common.events import BaseBroker, CacheBroker, InProcessBroker, RESYNC_EVENT, get_broker
+from common.query_plan import QueryPlanAssertionsMixin
+from kindergartens.models import Kindergarten
+from classes.models import Class
+from teachers.models import Teacher
+from children.models import Child
+from users.models import User
+from users.serializers import CustomTokenObtainPairSerializer
+from .models import SelectionArea, SelectionRecord, SelectionDailyRollup
+from .rollup import refresh_rollup_for_records, verify_daily_rollup
+from .events import board_channel, record_version
+from .services import assign_selection_area
 
-# Create your tests here.
+
+def token_client(user):
+    """
+    以登录时签发的访问令牌认证的客户端
+
+    异步视图不经过 DRF，force_authenticate 对其无效。
+    """
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {CustomTokenObtainPairSerializer.get_token(user).access_token}')
+    return client
+
+
+class SharedScopeCacheMixin:
+    """
+    测试使用本地内存缓存，按多进程共享缓存的部署信任令牌声明，查询次数不含用户表
+    """
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch('users.authentication.scope_version_is_shared', return_value=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+
+class SelectionTestDataMixin:
+    """
+    构建选区相关测试数据的辅助方法
+    """
+    @classmethod
+    def create_class(cls, kindergarten, name, children=3, areas=2):
+        class_obj = Class.objects.create(name=name, kindergarten=kindergarten)
+        area_list = [
+            SelectionArea.objects.create(name=f'{name}-区域{i}', class_info=class_obj, max_selections=10)
+            for i in range(areas)
+        ]
+        child_list = [
+            Child.objects.create(name=f'{name}-幼儿{i}', class_info=class_obj)
+            for i in range(children)
+        ]
+        return class_obj, area_list, child_list
+
+    @classmethod
+    def create_records(cls, children, area, days):
+        today = timezone.now().date()
+        records = []
+        for offset in range(days):
+            record_date = today - timedelta(days=offset)
+            for child in children:
+                records.append(
+                    SelectionRecord.objects.create(child=child, selection_area=area, date=record_date)
+                )
+        # 汇总在事务提交后刷新，测试事务不会提交，需要立即执行提交回调
+        with TestCase.captureOnCommitCallbacks(execute=True):
+            refresh_rollup_for_records(records)
+        return records
+
+
+class DashboardStatsTests(SharedScopeCacheMixin, SelectionTestDataMixin, TestCase):
+    """
+    仪表盘统计接口测试
+    """
+    # 仪表盘统计固定执行的查询次数
+    EXPECTED_QUERIES = 5
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.kindergarten = Kindergarten.objects.create(name='阳光幼儿园')
+        cls.other_kindergarten = Kindergarten.objects.create(name='星星幼儿园')
+        cls.class_a, cls.areas_a, cls.children_a = cls.create_class(cls.kindergarten, '大一班')
+        cls.class_b, cls.areas_b, cls.children_b = cls.create_class(cls.kindergarten, '小一班', children=2)
+        cls.class_c, cls.areas_c, cls.children_c = cls.create_class(cls.other_kindergarten, '中一班')
+        cls.create_records(cls.children_a, cls.areas_a[0], days=3)
+        cls.create_records(cls.children_c, cls.areas_c[0], days=1)
+
+        cls.teacher = Teacher.objects.create(name='王老师', kindergarten=cls.kindergarten)
+        cls.teacher.classes.add(cls.class_a)
+
+        cls.owner = User.objects.create_user(username='owner', password='pass', role='owner')
+        cls.principal = User.objects.create_user(
+            username='principal', password='pass', role='principal', kindergarten=cls.kindergarten
+        )
+        cls.teacher_user = User.objects.create_user(
+            username='teacher', password='pass', role='teacher',
+            kindergarten=cls.kindergarten, teacher=cls.teacher
+        )
+
+    def get_stats(self, user, days=7):
+        return token_client(user).get('/api/selections/dashboard-stats/', {'days': days})
+
+    def test_owner_sees_all_data(self):
+        response = self.get_stats(self.owner)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['total_children'], 8)
+        self.assertEqual(response.json()['total_classes'], 3)
+        self.assertEqual(response.json()['assigned_children'], 6)
+        self.assertEqual(response.json()['unassigned_children'], 2)
+        self.assertEqual(len(response.json()['selection_trend']), 7)
+        self.assertEqual(
+            [point['count'] for point in response.json()['selection_trend'][-3:]],
+            [3, 3, 6]
+        )
+
+    def test_principal_sees_own_kindergarten(self):
+        response = self.get_stats(self.principal)
+        self.assertEqual(response.json()['total_children'], 5)
+        self.assertEqual(response.json()['total_selection_areas'], 4)
+        self.assertEqual(response.json()['assigned_children'], 3)
+        self.assertEqual(response.json()['total_teachers'], 1)
+        stats = {item['class_name']: item['student_count'] for item in response.json()['class_statistics']}
+        self.assertEqual(stats, {'大一班': 3, '小一班': 2})
+
+    def test_teacher_sees_own_classes(self):
+        response = self.get_stats(self.teacher_user, days=30)
+        self.assertEqual(response.json()['total_children'], 3)
+        self.assertEqual(response.json()['total_classes'], 1)
+        self.assertEqual(response.json()['total_teachers'], 1)
+        self.assertEqual(len(response.json()['selection_trend']), 30)
+
+    def test_days_parameter_is_clamped(self):
+        self.assertEqual(len(self.get_stats(self.owner, days=365).json()['selection_trend']), 90)
+        self.assertEqual(len(self.get_stats(self.owner, days='abc').json()['selection_trend']), 7)
+        self.assertEqual(len(self.get_stats(self.owner, days=0).json()['selection_trend']), 7)
+
+    def test_query_count_is_constant(self):
+        # 增加班级和记录后查询次数保持不变
+        for i in range(5):
+            self.create_class(self.kindergarten, f'新增班{i}')
+        self.teacher.classes.add(*Class.objects.filter(kindergarten=self.kindergarten))
+
+        for user in (self.owner, self.principal, self.teacher_user):
+            # 签发令牌时读取的班级ID不计入请求的查询次数
+            client = token_client(user)
+            for days in (1, 7, 90):
+                with self.subTest(user=user.username, days=days):
+                    with self.assertNumQueries(self.EXPECTED_QUERIES):
+                        response = client.get('/api/selections/dashboard-stats/', {'days': days})
+                    self.assertEqual(response.status_code, 200)
+
+
+class SelectionDailyRollupTests(SelectionTestDataMixin, TestCase):
+    """
+    选区每日汇总表增量维护测试
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.kindergarten = Kindergarten.objects.create(name='阳光幼儿园')
+        cls.class_obj, cls.areas, cls.children = cls.create_class(cls.kindergarten, '大一班')
+        cls.owner = User.objects.create_user(username='owner', password='pass', role='owner')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.owner)
+        self.select_time = timezone.now()
+        self.today = timezone.localdate(self.select_time)
+
+    def rollup(self, area):
+        row = SelectionDailyRollup.objects.filter(date=self.today, selection_area=area).first()
+        return (row.active_count, row.child_count) if row else None
+
+    def assign(self, child, area):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post('/api/selections/selection-records/', {
+                'child_id': child.id,
+                'selection_area_id': area.id,
+                'select_time': self.select_time.isoformat()
+            }, format='json')
+
+    def test_create_move_end_and_destroy_keep_rollup_in_sync(self):
+        area_a, area_b = self.areas
+        response = self.assign(self.children[0], area_a)
+        self.assertEqual(response.status_code, 201)
+        self.assign(self.children[1], area_a)
+        self.assertEqual(self.rollup(area_a), (2, 2))
+
+        # 同一天重新选择其他选区会移动原记录
+        self.assign(self.children[1], area_b)
+        self.assertEqual(self.rollup(area_a), (1, 1))
+        self.assertEqual(self.rollup(area_b), (1, 1))
+
+        # 通过更新接口移动记录
+        record = SelectionRecord.objects.get(child=self.children[0])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(
+                f'/api/selections/selection-records/{record.id}/',
+                {'selection_area_id': area_b.id}, format='json'
+            )
+        self.assertIsNone(self.rollup(area_a))
+        self.assertEqual(self.rollup(area_b), (2, 2))
+
+        # 结束选择后仍计入幼儿数，但不计入有效记录数
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(f'/api/selections/selection-records/{record.id}/end_selection/')
+        self.assertEqual(self.rollup(area_b), (1, 2))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f'/api/selections/selection-records/{record.id}/')
+        self.assertEqual(self.rollup(area_b), (1, 1))
+        self.assertEqual(verify_daily_rollup(), [])
+
+    def test_deleting_child_refreshes_rollup(self):
+        for child in self.children[:2]:
+            self.assign(child, self.areas[0])
+        self.assertEqual(self.rollup(self.areas[0]), (2, 2))
+
+        # 选区记录随幼儿级联删除
+        with self.captureOnCommitCallbacks(execute=True):
+            self.children[0].delete()
+        self.assertEqual(self.rollup(self.areas[0]), (1, 1))
+        self.assertEqual(verify_daily_rollup(), [])
+
+    def test_moving_area_to_other_class_updates_rollup(self):
+        self.assign(self.children[0], self.areas[0])
+        other_class = Class.objects.create(name='小一班', kindergarten=self.kindergarten)
+        area = self.areas[0]
+        area.class_info = other_class
+        area.save()
+        self.assertEqual(
+            list(SelectionDailyRollup.objects.filter(selection_area=area).values_list('class_info_id', flat=True)),
+            [other_class.id]
+        )
+        self.assertEqual(verify_daily_rollup(), [])
+
+    def test_rebuild_command_repairs_and_verifies(self):
+        SelectionRecord.objects.create(child=self.children[0], selection_area=self.areas[0], date=self.today)
+        with self.assertRaises(CommandError):
+            call_command('rebuild_selection_rollup', '--verify-only', stdout=StringIO(), stderr=StringIO())
+
+        call_command('rebuild_selection_rollup', stdout=StringIO())
+        self.assertEqual(self.rollup(self.areas[0]), (1, 1))
+        self.assertEqual(verify_daily_rollup(), [])
+
+
+class SelectionAreaListTests(SelectionTestDataMixin, TestCase):
+    """
+    选区列表接口测试
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.kindergarten = Kindergarten.objects.create(name='阳光幼儿园')
+        cls.class_obj, cls.areas, cls.children = cls.create_class(cls.kindergarten, '大一班', areas=3)
+        cls.create_records(cls.children[:2], cls.areas[0], days=2)
+        cls.owner = User.objects.create_user(username='owner', password='pass', role='owner')
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.owner)
+
+    def list_areas(self):
+        return self.client.get('/api/selections/selection-areas/', {'page_size': 1000})
+
+    def test_current_selections_come_from_annotation(self):
+        response = self.list_areas()
+        counts = {item['id']: item['current_selections'] for item in response.data['results']['items']}
+        self.assertEqual(counts, {self.areas[0].id: 2, self.areas[1].id: 0, self.areas[2].id: 0})
+
+    def test_query_count_does_not_grow_with_area_count(self):
+        with self.assertNumQueries(2):
+            self.list_areas()
+        for i in range(20):
+            SelectionArea.objects.create(name=f'新增区域{i}', class_info=self.class_obj)
+        with self.assertNumQueries(2):
+            response = self.list_areas()
+        self.assertEqual(response.data['results']['total'], 23)
+
+    def test_list_is_cached_until_records_change(self):
+        self.list_areas()
+        with self.assertNumQueries(0):
+            self.list_areas()
+        assign_selection_area(self.children[2].id, self.areas[0].id)
+        response = self.list_areas()
+        counts = {item['id']: item['current_selections'] for item in response.data['results']['items']}
+        self.assertEqual(counts[self.areas[0].id], 3)
+
+    def test_unannotated_instance_falls_back_to_query(self):
+        from .serializers import SelectionAreaSerializer
+        area = SelectionArea.objects.get(pk=self.areas[0].pk)
+        self.assertEqual(SelectionAreaSerializer(area).data['current_selections'], 2)
+
+
+class ClassBoardTests(SharedScopeCacheMixin, SelectionTestDataMixin, TestCase):
+    """
+    选区操作页面班级看板接口测试
+    """
+    # 看板固定执行的查询次数：班级、选区及人数、幼儿及当天记录
+    BOARD_QUERY_BUDGET = 3
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.kindergarten = Kindergarten.objects.create(name='阳光幼儿园')
+        cls.other_kindergarten = Kindergarten.objects.create(name='星星幼儿园')
+        cls.class_obj, cls.areas, cls.children = cls.create_class(cls.kindergarten, '大一班', children=4)
+        cls.other_class, cls.other_areas, _ = cls.create_class(cls.kindergarten, '小一班')
+        # 前两名幼儿今天和昨天都有记录，昨天的记录不计入看板
+        cls.create_records(cls.children[:2], cls.areas[0], days=2)
+        cls.graduated = Child.objects.create(name='毕业生', class_info=cls.class_obj, is_active=False)
+        cls.owner = User.objects.create_user(username='owner', password='pass', role='owner')
+        cls.other_principal = User.objects.create_user(
+            username='other_principal', password='pass', role='principal', kindergarten=cls.other_kindergarten
+        )
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.client = token_client(self.owner)
+
+    def get_board(self, class_id=None, **headers):
+        return self.client.get(f'/api/selections/class-board/{class_id or self.class_obj.id}/', **headers)
+
+    def test_board_contents(self):
+        with self.assertNumQueries(self.BOARD_QUERY_BUDGET):
+            response = self.get_board()
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['class'], {'id': self.class_obj.id, 'name': '大一班'})
+        self.assertEqual(data['date'], timezone.now().date().isoformat())
+        self.assertEqual(
+            {area['id']: area['current_selections'] for area in data['areas']},
+            {self.areas[0].id: 2, self.areas[1].id: 0}
+        )
+        self.assertEqual({child['id'] for child in data['children']}, {child.id for child in self.children})
+        today_records = SelectionRecord.objects.filter(date=timezone.now().date())
+        self.assertEqual(
+            sorted((item['id'], item['child'], item['selection_area']) for item in data['assignments']),
+            sorted((record.id, record.child_id, record.selection_area_id) for record in today_records)
+        )
+
+    def test_query_count_does_not_grow_with_class_size(self):
+        for i in range(20):
+            SelectionArea.objects.create(name=f'新增区域{i}', class_info=self.class_obj)
+        children = [Child.objects.create(name=f'新生{i}', class_info=self.class_obj) for i in range(30)]
+        self.create_records(children, self.areas[1], days=1)
+        with self.assertNumQueries(self.BOARD_QUERY_BUDGET):
+            data = self.get_board().json()
+        self.assertEqual(len(data['areas']), 22)
+        self.assertEqual(len(data['children']), 34)
+        self.assertEqual(len(data['assignments']), 32)
+
+    def test_unchanged_board_returns_not_modified(self):
+        etag = self.get_board()['ETag']
+        with self.assertNumQueries(0):
+            response = self.get_board(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        assign_selection_area(self.children[2].id, self.areas[1].id)
+        response = self.get_board(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(len(response.json()['assignments']), 3)
+
+    def test_class_outside_scope_is_not_found(self):
+        self.client = token_client(self.other_principal)
+        self.assertEqual(self.get_board().status_code, 404)
+        self.assertEqual(self.get_board(class_id=999999).status_code, 404)
+
+
+class RecordingBroker(BaseBroker):
+    """
+    记录发布消息的测试用事件代理
+    """
+    messages = []
+
+    def publish(self, channel, message):
+        self.messages.append((channel, message))
+
+
+@override_settings(EVENT_BROKER_BACKEND='selections.tests.RecordingBroker')
+class ClassBoardEventTests(SelectionTestDataMixin, TestCase):
+    """
+    班级看板实时事件测试
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.kindergarten = Kindergarten.objects.create(name='阳光幼儿园')
+        cls.class_obj, cls.areas, cls.children = cls.create_class(cls.kindergarten, '大一班')
+        cls.owner = User.objects.create_user(username='owner', password='pass', role='owner')
+
+    def setUp(self):
+        RecordingBroker.messages.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.owner)
+
+    def published(self):
+        self.assertEqual({channel for channel, _ in RecordingBroker.messages}, {board_channel(self.class_obj.id)})
+        return [message for _, message in RecordingBroker.messages]
+
+    def test_assign_move_and_end_publish_occupancy(self):
+        child, (area_a, area_b) = self.children[0], self.areas
+        with self.captureOnCommitCallbacks(execute=True):
+            record = assign_selection_area(child.id, area_a.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            assign_selection_area(child.id, area_b.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(f'/api/selections/selection-records/{record.id}/end_selection/')
+
+        created, moved, ended = self.published()
+        self.assertEqual(created['type'], 'occupancy')
+        self.assertEqual(created['date'], timezone.now().date().isoformat())
+        self.assertEqual(created['areas'], [{'id': area_a.id, 'current_selections': 1}])
+        self.assertEqual(created['changes'][0]['action'], 'created')
+        self.assertEqual(
+            moved['areas'], [{'id': area_a.id, 'current_selections': 0}, {'id': area_b.id, 'current_selections': 1}]
+        )
+        self.assertEqual(
+            {key: moved['changes'][0][key] for key in ('action', 'id', 'child', 'selection_area', 'previous_selection_area')},
+            {'action': 'moved', 'id': record.id, 'child': child.id, 'selection_area': area_b.id,
+             'previous_selection_area': area_a.id}
+        )
+        self.assertEqual(ended['areas'], [{'id': area_b.id, 'current_selections': 0}])
+        self.assertEqual(ended['changes'][0]['action'], 'ended')
+
+    def test_batch_create_publishes_one_event(self):
+        records = [
+            {'child_id': child.id, 'selection_area_id': self.areas[0].id, 'select_time': timezone.now().isoformat()}
+            for child in self.children
+        ]
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/selections/selection-records/batch_create/', {'records': records}, format='json')
+        self.assertEqual(response.status_code, 201)
+        [event] = self.published()
+        self.assertEqual(event['areas'], [{'id': self.areas[0].id, 'current_selections': 3}])
+        self.assertEqual({change['child'] for change in event['changes']}, {child.id for child in self.children})
+
+    def test_nothing_is_published_before_commit(self):
+        # 事务未提交（包括回滚）时不广播
+        with self.captureOnCommitCallbacks(execute=False):
+            assign_selection_area(self.children[0].id, self.areas[0].id)
+        self.assertEqual(RecordingBroker.messages, [])
+
+    @override_settings(EVENT_BROKER_BACKEND='common.events.InProcessBroker')
+    def test_no_board_query_without_subscribers(self):
+        # 没有看板连接时提交后不查询选区人数
+        with mock.patch('selections.events.build_board_events') as build:
+            with self.captureOnCommitCallbacks(execute=True):
+                assign_selection_area(self.children[0].id, self.areas[0].id)
+        build.assert_not_called()
+
+
+class ClassBoardStreamTests(SelectionTestDataMixin, TestCase):
+    """
+    班级看板事件流接口测试
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.kindergarten = Kindergarten.objects.create(name='阳光幼儿园')
+        cls.other_kindergarten = Kindergarten.objects.create(name='星星幼儿园')
+        cls.class_obj, cls.areas, cls.children = cls.create_class(cls.kindergarten, '大一班')
+        cls.principal = User.objects.create_user(
+            username='principal', password='pass', role='principal', kindergarten=cls.kindergarten
+        )
+        cls.other_principal = User.objects.create_user(
+            username='other_principal', password='pass', role='principal', kindergarten=cls.other_kindergarten
+        )
+
+    def url(self):
+        return f'/api/selections/class-board/{self.class_obj.id}/events/'
+
+    async def test_stream_delivers_published_events(self):
+        token = str(AccessToken.for_user(self.principal))
+        response = await self.async_client.get(self.url(), {'token': token})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        content = response.streaming_content
+        self.assertEqual(await content.__anext__(), b'retry: 3000\n\n')
+        self.assertIn(b'event: connected', await content.__anext__())
+
+        get_broker().publish(board_channel(self.class_obj.id), {'type': 'occupancy', 'class_id': self.class_obj.id})
+        chunk = await asyncio.wait_for(content.__anext__(), timeout=5)
+        self.assertTrue(chunk.startswith(b'event: occupancy\ndata: '))
+        await content.aclose()
+
+    async def test_stream_requires_token_and_scope(self):
+        response = await self.async_client.get(self.url())
+        self.assertEqual(response.status_code, 401)
+        response = await self.async_client.get(self.url(), {'token': 'invalid'})
+        self.assertEqual(response.status_code, 401)
+        token = str(AccessToken.for_user(self.other_principal))
+        response = await self.async_client.get(self.url(), headers={'Authorization': f'Bearer {token}'})
+        self.assertEqual(response.status_code, 404)
+
+
+class InProcessBrokerTests(TestCase):
+    """
+    进程内事件代理测试
+    """
+    def test_publish_from_other_thread_and_overflow(self):
+        broker = InProcessBroker(max_queue_size=2)
+
+        async def run():
+            with broker.subscribe('board') as subscription:
+                self.assertEqual(broker.subscriber_count('board'), 1)
+                await asyncio.get_running_loop().run_in_executor(None, broker.publish, 'board', {'n': 1})
+                self.assertEqual(await subscription.get(timeout=5), {'n': 1})
+                self.assertIsNone(await subscription.get(timeout=0.01))
+                # 积压超过队列长度时清空积压，只保留 resync 事件
+                for n in range(3):
+                    broker.publish('board', {'n': n})
+                await asyncio.sleep(0)
+                self.assertEqual(await subscription.get(timeout=5), RESYNC_EVENT)
+                self.assertIsNone(await subscription.get(timeout=0.01))
+            self.assertEqual(broker.subscriber_count('board'), 0)
+
+        asyncio.run(run())
+
+
+class CacheBrokerTests(TestCase):
+    """
+    跨进程事件代理测试，两个代理实例共用缓存，模拟两个工作进程
+    """
+    def setUp(self):
+        cache.clear()
+        self.subscriber_broker = CacheBroker(max_queue_size=5, poll_interval=0.01)
+        self.publisher_broker = CacheBroker(poll_interval=0.01)
+
+    def test_delivers_between_brokers(self):
+        async def run():
+            self.assertFalse(self.publisher_broker.has_subscribers())
+            with self.subscriber_broker.subscribe('board') as subscription:
+                await asyncio.sleep(0.05)
+                self.assertTrue(self.publisher_broker.has_subscribers('board'))
+                self.assertFalse(self.publisher_broker.has_subscribers('other'))
+                self.publisher_broker.publish('board', {'n': 1})
+                self.publisher_broker.publish('other', {'n': 2})
+                self.assertEqual(await subscription.get(timeout=5), {'n': 1})
+                self.assertIsNone(await subscription.get(timeout=0.05))
+            # 最后一个订阅者退出后停止轮询
+            self.assertEqual(self.subscriber_broker._pollers, {})
+
+        asyncio.run(run())
+
+    def test_missing_message_sends_resync(self):
+        async def run():
+            with self.subscriber_broker.subscribe('board') as subscription:
+                await asyncio.sleep(0.05)
+                self.publisher_broker.publish('board', {'n': 1})
+                self.publisher_broker.publish('board', {'n': 2})
+                # 模拟消息过期
+                cache.delete(self.publisher_broker._key('board', 1))
+                self.assertEqual(await subscription.get(timeout=5), RESYNC_EVENT)
+                self.assertEqual(await subscription.get(timeout=5), {'n': 2})
+
+        asyncio.run(run())
+
+
+class SelectionRecordBatchCreateTests(SelectionTestDataMixin, TestCase):
+    """
+    批量创建选区记录接口测试
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.kindergarten = Kindergarten.objects.create(name='阳光幼儿园')
+        cls.class_obj, cls.areas, cls.children = cls.create_class(cls.kindergarten, '大一班', children=30)
+        cls.other_class, cls.other_areas, cls.other_children = cls.create_class(cls.kindergarten, '小一班')
+        SelectionArea.objects.filter(pk__in=[area.pk for area in cls.areas]).update(max_selections=20)
+        cls.owner = User.objects.create_user(username='owner', password='pass', role='owner')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.owner)
+        # 取UTC当天中午前的时间，避免接口按本地时区换算日期时跨天
+        self.select_time = timezone.now().replace(hour=4, minute=0, second=0, microsecond=0)
+        self.today = self.select_time.date()
+
+    def batch_create(self, records):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post('/api/selections/selection-records/batch_create/', {
+                'records': [
+                    {'child_id': child.id, 'selection_area_id': area.id, 'select_time': self.select_time.isoformat()}
+                    for child, area in records
+                ]
+            }, format='json')
+
+    def test_whole_class_uses_constant_queries(self):
+        records = [(child, self.areas[i % 2]) for i, child in enumerate(self.children)]
+        # 加载幼儿、选区、已有记录和占用人数4条，批量写入3条（含保存点），返回结果1条，
+        # 提交后锁定选区并刷新汇总6条（含保存点）
+        with self.assertNumQueries(14):
+            response = self.batch_create(records)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data), 30)
+        self.assertEqual(SelectionRecord.objects.filter(date=self.today, is_active=True).count(), 30)
+        self.assertEqual(verify_daily_rollup(), [])
+
+    def test_existing_records_are_moved(self):
+        self.create_records(self.children[:5], self.areas[0], days=1)
+        response = self.batch_create([(child, self.areas[1]) for child in self.children[:5]])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(SelectionRecord.objects.filter(date=self.today).count(), 5)
+        self.assertEqual(
+            SelectionRecord.objects.filter(date=self.today, selection_area=self.areas[1]).count(), 5
+        )
+        self.assertEqual(verify_daily_rollup(), [])
+
+    def test_insert_without_conflict_target(self):
+        # MySQL 不支持 unique_fields，批量创建不能传入冲突字段
+        with mock.patch.object(connection.features, 'supports_update_conflicts_with_target', False):
+            response = self.batch_create([(child, self.areas[0]) for child in self.children[:3]])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(SelectionRecord.objects.filter(date=self.today).count(), 3)
+        self.assertEqual(verify_daily_rollup(), [])
+
+    def test_invalid_record_rejects_whole_batch(self):
+        response = self.batch_create([
+            (self.children[0], self.areas[0]),
+            (self.other_children[0], self.areas[0]),
+        ])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([error['index'] for error in response.data['errors']], [1])
+        self.assertFalse(SelectionRecord.objects.exists())
+
+    def test_capacity_is_checked_in_memory(self):
+        response = self.batch_create([(child, self.areas[0]) for child in self.children[:21]])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([error['index'] for error in response.data['errors']], [20])
+        self.assertFalse(SelectionRecord.objects.exists())
+
+
+class SelectionRecordBulkMoveTests(SelectionTestDataMixin, TestCase):
+    """
+    批量调整选区接口测试
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.kindergarten = Kindergarten.objects.create(name='阳光幼儿园')
+        cls.other_kindergarten = Kindergarten.objects.create(name='星星幼儿园')
+        cls.class_obj, cls.areas, cls.children = cls.create_class(cls.kindergarten, '大一班', children=30)
+        cls.other_class, cls.other_areas, _ = cls.create_class(cls.kindergarten, '小一班')
+        # 两个选区各15人且已满
+        SelectionArea.objects.filter(pk__in=[area.pk for area in cls.areas]).update(max_selections=15)
+        cls.create_records(cls.children[:15], cls.areas[0], days=1)
+        cls.create_records(cls.children[15:], cls.areas[1], days=1)
+        cls.owner = User.objects.create_user(username='owner', password='pass', role='owner')
+        cls.other_principal = User.objects.create_user(
+            username='other_principal', password='pass', role='principal', kindergarten=cls.other_kindergarten
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.owner)
+        self.records = {record.child_id: record for record in SelectionRecord.objects.all()}
+
+    def move(self, moves):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post('/api/selections/selection-records/bulk_move/', {
+                'moves': [
+                    {'id': record.id, 'selection_area_id': area.id, 'updated_at': record_version(record.updated_at)}
+                    for record, area in moves
+                ]
+            }, format='json')
+
+    def swap(self, children):
+        # 把两个选区中的幼儿互换
+        return [
+            (self.records[child.id], self.areas[1] if self.records[child.id].selection_area_id == self.areas[0].id
+             else self.areas[0])
+            for child in children
+        ]
+
+    def test_whole_class_swap_in_one_request(self):
+        moves = self.swap(self.children)
+        # 两个选区各有一名幼儿不动，不更新也不返回
+        moves[0] = (moves[0][0], self.areas[0])
+        moves[15] = (moves[15][0], self.areas[1])
+        response = self.move(moves)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [item['id'] for item in response.data], [record.id for record, _ in moves[1:15] + moves[16:]]
+        )
+
+        areas = dict(SelectionRecord.objects.values_list('child_id', 'selection_area_id'))
+        self.assertEqual(areas[self.children[0].id], self.areas[0].id)
+        self.assertEqual(areas[self.children[1].id], self.areas[1].id)
+        self.assertEqual(areas[self.children[15].id], self.areas[1].id)
+        self.assertEqual(areas[self.children[16].id], self.areas[0].id)
+        unchanged = SelectionRecord.objects.get(pk=moves[0][0].pk)
+        self.assertEqual(unchanged.updated_at, moves[0][0].updated_at)
+        self.assertEqual(verify_daily_rollup(), [])
+
+    def test_query_count_does_not_grow_with_moves(self):
+        counts = []
+        for children in (self.children[14:16], self.children):
+            self.records = {record.child_id: record for record in SelectionRecord.objects.all()}
+            with CaptureQueriesContext(connection) as queries:
+                response = self.move(self.swap(children))
+            self.assertEqual(response.status_code, 200)
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_board_version_is_accepted_as_precondition(self):
+        assignment = next(
+            item for item in token_client(self.owner).get(
+                f'/api/selections/class-board/{self.class_obj.id}/'
+            ).json()['assignments']
+            if item['child'] == self.children[0].id
+        )
+        response = self.client.post('/api/selections/selection-records/bulk_move/', {'moves': [{
+            'id': assignment['id'], 'selection_area_id': self.areas[1].id, 'updated_at': assignment['updated_at']
+        }, {
+            'id': self.records[self.children[15].id].id,
+            'selection_area_id': self.areas[0].id,
+            'updated_at': record_version(self.records[self.children[15].id].updated_at),
+        }]}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+    def test_conflicting_edit_rejects_whole_move(self):
+        stale = self.swap(self.children[14:17])
+        # 读取后其他人结束了一条记录，并删除了另一条
+        record = self.records[self.children[15].id]
+        self.client.patch(f'/api/selections/selection-records/{record.id}/end_selection/')
+        SelectionRecord.objects.filter(pk=self.records[self.children[16].id].pk).delete()
+        record = SelectionRecord.objects.get(pk=record.pk)
+
+        response = self.move(stale)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['conflicts'], [
+            {'index': 1, 'id': record.id, 'current': {
+                'selection_area': self.areas[1].id,
+                'date': record.date,
+                'is_active': False,
+                'updated_at': record_version(record.updated_at),
+            }},
+            {'index': 2, 'id': stale[2][0].id, 'current': None},
+        ])
+        self.assertEqual(SelectionRecord.objects.get(pk=stale[0][0].pk).selection_area_id, self.areas[0].id)
+
+    def test_records_outside_scope_conflict(self):
+        self.client.force_authenticate(user=self.other_principal)
+        response = self.move(self.swap(self.children[:1]))
+        self.assertEqual(response.status_code, 409)
+        self.assertIsNone(response.data['conflicts'][0]['current'])
+
+    def test_invalid_moves_are_rejected(self):
+        record = self.records[self.children[0].id]
+        response = self.move([(record, self.other_areas[0]), (record, self.areas[1])])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['errors'], [{'index': 1, 'errors': {'id': ['同一记录不能重复调整']}}])
+
+        response = self.client.post('/api/selections/selection-records/bulk_move/', {'moves': [
+            {'id': record.id, 'selection_area_id': 999999, 'updated_at': record_version(record.updated_at)},
+            {'id': self.records[self.children[1].id].id, 'selection_area_id': self.other_areas[0].id,
+             'updated_at': record_version(self.records[self.children[1].id].updated_at)},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([error['index'] for error in response.data['errors']], [0, 1])
+        self.assertIn('selection_area_id', response.data['errors'][0]['errors'])
+        self.assertIn('non_field_errors', response.data['errors'][1]['errors'])
+
+        # 只移入不移出时目标选区超员
+        response = self.move([(record, self.areas[1])])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['errors'][0]['errors']['selection_area_id'], ['选区“大一班-区域1”人数已满'])
+        self.assertEqual(SelectionRecord.objects.get(pk=record.pk).selection_area_id, self.areas[0].id)
+        self.assertEqual(verify_daily_rollup(), [])
+
+
+class SelectionRecordExportTests(SelectionTestDataMixin, TestCase):
+    """
+    选区记录流式导出测试
+    """
+    HEADERS = ['幼儿姓名', '选区名称', '所属班级', '选择时间', '备注']
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.kindergarten = Kindergarten.objects.create(name='阳光幼儿园')
+        cls.class_obj, cls.areas, cls.children = cls.create_class(cls.kindergarten, '大一班', children=5)
+        cls.create_records(cls.children, cls.areas[0], days=3)
+        SelectionRecord.objects.filter(child=cls.children[0]).update(notes='喜欢积木')
+        cls.owner = User.objects.create_user(username='owner', password='pass', role='owner')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.owner)
+
+    def export(self, **params):
+        return self.client.get('/api/selections/selection-records/export/', params)
+
+    def test_xlsx_keeps_columns(self):
+        with self.assertNumQueries(1):
+            response = self.export()
+            content = b''.join(response.streaming_content)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('.xlsx', response['Content-Disposition'])
+
+        worksheet = load_workbook(BytesIO(content))['选区记录']
+        rows = list(worksheet.iter_rows(values_only=True))
+        self.assertEqual(list(rows[0]), self.HEADERS)
+        self.assertEqual(len(rows), 16)
+        self.assertEqual(rows[1][1:3], ('大一班-区域0', '大一班'))
+
+    def test_csv_is_streamed(self):
+        response = self.export(file_format='csv', child_name='幼儿0')
+        self.assertTrue(response.streaming)
+        content = b''.join(response.streaming_content).decode('utf-8-sig')
+        rows = list(csv.reader(StringIO(content)))
+        self.assertEqual(rows[0], self.HEADERS)
+        self.assertEqual(len(rows), 4)
+        self.assertEqual({row[4] for row in rows[1:]}, {'喜欢积木'})
+
+    def test_unknown_format_is_rejected(self):
+        self.assertEqual(self.export(file_format='pdf').status_code, 400)
+
+
+class SelectionAssignmentTests(SelectionTestDataMixin, TestCase):
+    """
+    分配选区接口测试
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.kindergarten = Kindergarten.objects.create(name='阳光幼儿园')
+        cls.class_obj, cls.areas, cls.children = cls.create_class(cls.kindergarten, '大一班', children=6)
+        SelectionArea.objects.filter(pk__in=[area.pk for area in cls.areas]).update(max_selections=5)
+
+    def test_api_rejects_full_area(self):
+        owner = User.objects.create_user(username='owner', password='pass', role='owner')
+        client = APIClient()
+        client.force_authenticate(user=owner)
+        for child in self.children[:5]:
+            assign_selection_area(child.id, self.areas[0].id)
+
+        response = client.post('/api/selections/selection-records/', {
+            'child_id': self.children[5].id,
+            'selection_area_id': self.areas[0].id
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('selection_area_id', response.data)
+
+        # 已在该选区的幼儿重复选择不受容量限制
+        response = client.post('/api/selections/selection-records/', {
+            'child_id': self.children[0].id,
+            'selection_area_id': self.areas[0].id
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+
+
+@skipUnlessDBFeature('has_select_for_update')
+class SelectionAssignmentConcurrencyTests(SelectionTestDataMixin, TransactionTestCase):
+    """
+    并发分配选区压力测试，每个线程使用独立的数据库连接
+
+    SQLite 没有行锁，并发写入只会测到整表锁，只在支持 select_for_update 的数据库（如 MySQL）上运行。
+    """
+    THREADS = 20
+
+    def setUp(self):
+        self.kindergarten = Kindergarten.objects.create(name='阳光幼儿园')
+        self.class_obj, self.areas, self.children = self.create_class(
+            self.kindergarten, '大一班', children=self.THREADS
+        )
+        SelectionArea.objects.filter(pk__in=[area.pk for area in self.areas]).update(max_selections=5)
+
+    def run_concurrently(self, tasks, action=assign_selection_area):
+        """
+        所有线程就绪后同时执行操作（默认为分配选区），返回成功数和失败原因列表
+        """
+        barrier = threading.Barrier(len(tasks))
+        results = []
+        lock = threading.Lock()
+
+        def worker(*args):
+            try:
+                barrier.wait()
+                action(*args)
+                outcome = 'ok'
+            except Exception as e:
+                outcome = e
+            finally:
+                connection.close()
+            with lock:
+                results.append(outcome)
+
+        threads = [threading.Thread(target=worker, args=task) for task in tasks]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        failures = [result for result in results if result != 'ok']
+        return len(results) - len(failures), failures
+
+    def test_capacity_is_never_exceeded(self):
+        area = self.areas[0]
+        succeeded, failures = self.run_concurrently([(child.id, area.id) for child in self.children])
+
+        self.assertEqual(succeeded, 5)
+        self.assertTrue(all('人数已满' in str(failure) for failure in failures), failures)
+        self.assertEqual(SelectionRecord.objects.filter(selection_area=area, is_active=True).count(), 5)
+        self.assertEqual(verify_daily_rollup(), [])
+
+    def test_same_child_keeps_single_record(self):
+        child = self.children[0]
+        tasks = [(child.id, self.areas[i % 2].id) for i in range(10)]
+        succeeded, failures = self.run_concurrently(tasks)
+
+        self.assertEqual(failures, [])
+        self.assertEqual(succeeded, 10)
+        self.assertEqual(SelectionRecord.objects.filter(child=child).count(), 1)
+        self.assertEqual(verify_daily_rollup(), [])
+
+    def test_concurrent_ends_keep_rollup_exact(self):
+        owner = User.objects.create_user(username='owner', password='pass', role='owner')
+        records = [assign_selection_area(child.id, self.areas[0].id) for child in self.children[:5]]
+
+        def end(record_id):
+            client = APIClient()
+            client.force_authenticate(user=owner)
+            response = client.patch(f'/api/selections/selection-records/{record_id}/end_selection/')
+            if response.status_code != 200:
+                raise AssertionError(response.status_code)
+
+        succeeded, failures = self.run_concurrently([(record.id,) for record in records], action=end)
+        self.assertEqual(failures, [])
+        self.assertEqual(
+            SelectionDailyRollup.objects.get(selection_area=self.areas[0]).active_count, 0
+        )
+        self.assertEqual(verify_daily_rollup(), [])
+
+
+class SelectionRecordQueryPlanTests(QueryPlanAssertionsMixin, SelectionTestDataMixin, TestCase):
+    """
+    选区记录热点查询执行计划测试
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.kindergarten = Kindergarten.objects.create(name='阳光幼儿园')
+        cls.class_a, areas, children = cls.create_class(cls.kindergarten, '大一班')
+        cls.create_records(children, areas[0], days=3)
+        cls.today = timezone.now().date()
+
+    def test_daily_occupancy_uses_index(self):
+        self.assertNoFullScan(
+            SelectionRecord.objects.filter(date=self.today, is_active=True).values('child_id')
+        )
+        self.assertNoFullScan(
+            SelectionRecord.objects.filter(date__gte=self.today - timedelta(days=7), date__lte=self.today)
+        )
+        # 选区列表本身返回全部选区，当天人数的子查询需按索引定位
+        self.assertNoFullScan(
+            SelectionArea.objects.with_current_selections(), allowed_tables=(SelectionArea._meta.db_table,)
+        )
+
+    def test_kindergarten_filter_uses_index(self):
+        self.assertNoFullScan(
+            SelectionRecord.objects.filter(
+                selection_area__class_info__kindergarten_id=self.kindergarten.id, is_active=True
+            )
+        )
+
+
+class SelectionRecordKeysetPaginationTests(SelectionTestDataMixin, TestCase):
+    """
+    选区记录游标分页测试
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.kindergarten = Kindergarten.objects.create(name='阳光幼儿园')
+        cls.class_obj, areas, children = cls.create_class(cls.kindergarten, '大一班', children=7)
+        records = cls.create_records(children, areas[0], days=3)
+        # 部分记录的选择时间相同，翻页时依靠ID区分先后
+        SelectionRecord.objects.filter(pk__in=[record.pk for record in records[:4]]).update(
+            select_time=records[0].select_time
+        )
+        cls.owner = User.objects.create_user(username='owner', password='pass', role='owner')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.owner)
+
+    def get_page(self, params, queries=1):
+        with self.assertNumQueries(queries):
+            response = self.client.get('/api/selections/selection-records/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_walks_all_records_in_order(self):
+        expected = list(
+            SelectionRecord.objects.order_by('-date', '-select_time', '-id').values_list('id', flat=True)
+        )
+        seen = []
+        pages = []
+        data = self.get_page({'pagination': 'cursor', 'page_size': 5})
+        self.assertIsNone(data['count'])
+        self.assertIsNone(data['previous_cursor'])
+        while True:
+            pages.append(data)
+            seen.extend(item['id'] for item in data['results'])
+            if not data['next_cursor']:
+                break
+            data = self.get_page({'cursor': data['next_cursor'], 'page_size': 5})
+        self.assertEqual(seen, expected)
+        self.assertEqual(len(pages), 5)
+
+        # 从最后一页向前翻页得到与向后翻页相同的结果
+        previous = self.get_page({'cursor': pages[-1]['previous_cursor'], 'page_size': 5})
+        self.assertEqual(
+            [item['id'] for item in previous['results']], [item['id'] for item in pages[-2]['results']]
+        )
+
+    def test_count_is_optional(self):
+        data = self.get_page({'pagination': 'cursor', 'with_count': 'true'}, queries=2)
+        self.assertEqual(data['count'], 21)
+
+    def test_invalid_cursor_and_default_mode(self):
+        response = self.client.get('/api/selections/selection-records/', {'cursor': 'bad'})
+        self.assertEqual(response.status_code, 404)
+        # 不选择游标分页时仍按页码分页
+        data = self.get_page({'page': 2, 'page_size': 5}, queries=2)
+        self.assertEqual((data['count'], data['current_page']), (21, 2))
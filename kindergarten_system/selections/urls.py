@@ -19,4 +19,6 @@ urlpatterns = [
     # 添加自定义URL（与视图集路由区分开）
     path('recent-activities/', views.get_recent_activities, name='recent-activities'),
     path('dashboard-stats/', views.get_dashboard_stats, name='dashboard-stats'),
+    path('class-board/<int:class_id>/', views.get_class_board, name='class-board'),
+    path('class-board/<int:class_id>/events/', views.class_board_events, name='class-board-events'),
 ]
\ No newline at end of file
@@ -1,9 +1,10 @@
 from rest_framework import viewsets, status, filters
-from rest_framework.decorators import action, api_view
+from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.decorators import permission_classes
-from rest_framework.permissions import AllowAny
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
+from asgiref.sync import sync_to_async
+from django.db import transaction
+from django.http import HttpResponseNotAllowed, JsonResponse, StreamingHttpResponse
 from django.db.models import Q, Count, Prefetch
 from django.core.exceptions import ValidationError
 from datetime import date, timedelta
@@ -17,6 +18,16 @@ from .serializers import (
     SelectionFilterSerializer,
     SelectionStatisticsSerializer
 )
+from .board import abuild_class_board
+from .dashboard import abuild_dashboard_stats, normalize_days, DEFAULT_TREND_DAYS
+from .events import RECORD_DELETED, RECORD_ENDED, board_channel, publish_record_changes, record_change
+from .rollup import refresh_rollup_for_records
+from .services import (
+    batch_create_selection_records,
+    bulk_move_selection_records,
+    BatchSelectionError,
+    SelectionMoveConflict
+)
 from children.models import Child
 from classes.models import Class
 from teachers.models import Teacher
@@ -25,187 +36,93 @@ from users.permissions import (
     IsKindergartenOwnerOrSystemOwner,
     TeacherDataPermission
 )
-import pandas as pd
-from django.http import HttpResponse
+from users.authentication import authenticate_request_token
+from users.scope import UserScope, get_user_scope
+from common.async_views import async_api_view, json_response
+from common.cache import cached_response
+from common.events import sse_stream
+from common.pagination import KeysetPaginationMixin
+from search.index import search_filter
+from jobs.registry import run_task
 from django.utils import timezone
 
 
-# 添加获取最近活动的独立视图函数
-@api_view(['GET'])
-@permission_classes([AllowAny])
-def get_recent_activities(request):
+# 添加获取最近活动的独立视图函数（异步）
+@async_api_view()
+async def get_recent_activities(request):
     """
     获取最近的选区活动记录（独立视图函数）
     """
     # 获取限制参数，默认为10
-    limit = int(request.query_params.get('limit', 10))
+    limit = int(request.GET.get('limit', 10))
     
-    # 获取最近的活动记录，按选择时间倒序排列
+    # 获取最近的活动记录，按选择时间倒序排列，序列化用到的关联对象一次加载
     recent_records = SelectionRecord.objects.select_related(
-        'child', 'selection_area', 'selection_area__class_info',
+        'child', 'child__class_info', 'selection_area', 'selection_area__class_info',
         'selection_area__class_info__kindergarten', 'operated_by'
     ).order_by('-select_time')[:limit]
     
     # 序列化数据
-    serializer = SelectionRecordSerializer(recent_records, many=True)
+    serializer = SelectionRecordSerializer([record async for record in recent_records], many=True)
     
-    return Response({
+    return json_response({
         'data': serializer.data,
         'count': len(serializer.data)
     })
 
 
-# 添加获取仪表盘统计数据的独立视图函数
-@api_view(['GET'])
-@permission_classes([AllowAny])
-def get_dashboard_stats(request):
+# 添加获取仪表盘统计数据的独立视图函数（异步）
+@async_api_view()
+async def get_dashboard_stats(request):
     """
     获取仪表盘统计数据
     """
-    # 根据用户角色过滤数据
-    user = request.user
-    kindergarten_filter = None
-    class_filter = None
-    
-    if hasattr(user, 'role'):
-        if user.role == 'principal' and hasattr(user, 'kindergarten'):
-            # 园长只能看到自己幼儿园的数据
-            kindergarten_filter = user.kindergarten
-        elif user.role == 'teacher' and hasattr(user, 'teacher'):
-            # 教师只能看到自己班级的数据
-            class_filter = user.teacher.teaching_classes.all()
-    
-    # 获取时间范围参数
-    days_param = request.query_params.get('days', '7')  # 默认7天
-    try:
-        days = int(days_param)
-    except ValueError:
-        days = 7
-    
-    # 限制最大天数为90天
-    if days > 90:
-        days = 90
-    elif days < 1:
-        days = 7
-    
-    # 获取今天的日期
-    today = timezone.now().date()
-    
-    # 获取幼儿总数
-    children_queryset = Child.objects.all()
-    if kindergarten_filter:
-        children_queryset = children_queryset.filter(class_info__kindergarten=kindergarten_filter)
-    elif class_filter is not None:
-        children_queryset = children_queryset.filter(class_info__in=class_filter)
-    total_children = children_queryset.count()
-    
-    # 获取选区总数
-    selection_areas_queryset = SelectionArea.objects.all()
-    if kindergarten_filter:
-        selection_areas_queryset = selection_areas_queryset.filter(
-            class_info__kindergarten=kindergarten_filter
-        )
-    elif class_filter is not None:
-        selection_areas_queryset = selection_areas_queryset.filter(
-            class_info__in=class_filter
-        )
-    total_selection_areas = selection_areas_queryset.count()
-    
-    # 获取已分配选区的幼儿数（仅今天的记录）
-    assigned_children_queryset = SelectionRecord.objects.filter(
-        is_active=True, 
-        date=today
-    ).values('child').distinct()
-    if kindergarten_filter:
-        assigned_children_queryset = assigned_children_queryset.filter(
-            child__class_info__kindergarten=kindergarten_filter
-        )
-    elif class_filter is not None:
-        assigned_children_queryset = assigned_children_queryset.filter(
-            child__class_info__in=class_filter
-        )
-    assigned_children = assigned_children_queryset.count()
-    
-    # 计算未分配选区的幼儿数
-    unassigned_children = total_children - assigned_children if total_children > assigned_children else 0
-    
-    # 获取选区趋势数据（根据指定天数）
-    selection_trend = []
-    for i in range(days):
-        date_point = today - timedelta(days=(days-1-i))
-        
-        # 构建查询
-        daily_assigned_queryset = SelectionRecord.objects.filter(
-            is_active=True, 
-            date=date_point
-        ).values('child').distinct()
-        
-        # 应用过滤器
-        if kindergarten_filter:
-            daily_assigned_queryset = daily_assigned_queryset.filter(
-                child__class_info__kindergarten=kindergarten_filter
-            )
-        elif class_filter is not None:
-            daily_assigned_queryset = daily_assigned_queryset.filter(
-                child__class_info__in=class_filter
-            )
-            
-        count = daily_assigned_queryset.count()
-        selection_trend.append({
-            'date': date_point.strftime('%Y-%m-%d'),
-            'count': count
-        })
-    
-    # 获取班级总数
-    classes_queryset = Class.objects.all()
-    if kindergarten_filter:
-        classes_queryset = classes_queryset.filter(kindergarten=kindergarten_filter)
-    elif class_filter is not None:
-        classes_queryset = classes_queryset.filter(id__in=class_filter)
-    total_classes = classes_queryset.count()
-    
-    # 获取班级统计信息（班级名称和学生数量）
-    class_stats = []
-    classes_for_stats = Class.objects.all()
-    if kindergarten_filter:
-        classes_for_stats = classes_for_stats.filter(kindergarten=kindergarten_filter)
-    elif class_filter is not None:
-        classes_for_stats = classes_for_stats.filter(id__in=class_filter)
-        
-    for cls in classes_for_stats:
-        # 获取班级学生数量
-        student_count = Child.objects.filter(
-            class_info=cls, 
-            is_active=True
-        ).count()
-        # 始终添加班级到统计中，即使学生数为0
-        class_stats.append({
-            'class_id': cls.id,
-            'class_name': cls.name,
-            'student_count': student_count
-        })
-    
-    # 获取教师总数
-    teachers_queryset = Teacher.objects.all()
-    if kindergarten_filter:
-        teachers_queryset = teachers_queryset.filter(kindergarten=kindergarten_filter)
-    elif class_filter is not None:
-        # 教师关联到班级，需要通过班级过滤教师
-        teachers_queryset = teachers_queryset.filter(
-            classes__in=class_filter
-        ).distinct()
-    total_teachers = teachers_queryset.count()
-    
-    return Response({
-        'total_children': total_children,
-        'total_selection_areas': total_selection_areas,
-        'assigned_children': assigned_children,
-        'unassigned_children': unassigned_children,
-        'selection_trend': selection_trend,
-        'total_classes': total_classes,
-        'total_teachers': total_teachers,
-        'class_statistics': class_stats  # 添加班级统计信息
-    })
+    days = normalize_days(request.GET.get('days', DEFAULT_TREND_DAYS))
+    return json_response(await abuild_dashboard_stats(request.user, days))
+
+
+@async_api_view(permission_classes=[IsKindergartenOwnerOrSystemOwner])
+@cached_response(
+    depends_on=('selections.SelectionArea', 'selections.SelectionRecord', 'children.Child', 'classes.Class'),
+    daily=True
+)
+async def get_class_board(request, class_id):
+    """
+    选区操作页面的班级看板，一次返回选区及当天人数、幼儿名单和当天的分配（异步）
+    """
+    return json_response(await abuild_class_board(request, get_user_scope(request), class_id))
+
+
+def _board_stream_error(request, class_id):
+    """
+    检查事件流请求的身份和班级权限，通过时返回 None
+    """
+    user = authenticate_request_token(request)
+    if user is None:
+        return JsonResponse({'detail': '身份认证信息未提供或无效'}, status=status.HTTP_401_UNAUTHORIZED)
+    classes = UserScope(user).filter(Class.objects.filter(pk=class_id), 'kindergarten_id', 'id')
+    if not classes.exists():
+        return JsonResponse({'detail': '未找到。'}, status=status.HTTP_404_NOT_FOUND)
+    return None
+
+
+async def class_board_events(request, class_id):
+    """
+    班级看板的事件流（Server-Sent Events），需要在 ASGI 服务器下运行
+
+    选区记录创建、调整、结束或删除后，推送受影响选区当天的人数和记录变化。
+    客户端连接后加载一次看板，之后按事件增量更新，收到 resync 事件时重新加载看板。
+    """
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(['GET'])
+    error = await sync_to_async(_board_stream_error)(request, class_id)
+    if error is not None:
+        return error
+    response = StreamingHttpResponse(sse_stream(board_channel(class_id)), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # 禁止 Nginx 缓冲事件流
+    response['X-Accel-Buffering'] = 'no'
+    return response
 
 
 class SelectionAreaViewSet(viewsets.ModelViewSet):
@@ -236,24 +153,13 @@ class SelectionAreaViewSet(viewsets.ModelViewSet):
         """
         根据用户角色过滤查询集
         """
-        queryset = super().get_queryset().select_related('class_info', 'class_info__kindergarten')
-        user = self.request.user
-        
-        # 如果是系统所有者，返回所有选区
-        if hasattr(user, 'role') and user.role == 'owner':
-            return queryset
-        
-        # 如果是园长，返回自己幼儿园的选区
-        elif hasattr(user, 'role') and user.role == 'principal' and user.kindergarten:
-            return queryset.filter(class_info__kindergarten=user.kindergarten)
-        
-        # 如果是教师，返回自己负责班级的选区
-        elif hasattr(user, 'role') and user.role == 'teacher' and user.teacher:
-            return queryset.filter(
-                class_info_id__in=user.teacher.teaching_classes.values_list('id', flat=True)
-            )
-        
-        return queryset.none()
+        queryset = super().get_queryset().select_related(
+            'class_info', 'class_info__kindergarten'
+        ).with_current_selections()
+        # 系统所有者返回所有选区，园长返回自己幼儿园的选区，教师返回自己负责班级的选区
+        return get_user_scope(self.request).filter(
+            queryset, 'class_info__kindergarten_id', 'class_info_id'
+        )
     
     def create(self, request, *args, **kwargs):
         """
@@ -320,6 +226,11 @@ class SelectionAreaViewSet(viewsets.ModelViewSet):
         
         return Response(serializer.data)
     
+    # 列表包含当天的选择人数，随选区记录和日期变化
+    @cached_response(
+        depends_on=('selections.SelectionArea', 'selections.SelectionRecord', 'classes.Class', 'kindergartens.Kindergarten'),
+        daily=True
+    )
     def list(self, request, *args, **kwargs):
         """
         重写列表方法，支持按班级筛选
@@ -329,7 +240,7 @@ class SelectionAreaViewSet(viewsets.ModelViewSet):
         # 支持按名称筛选
         name = request.query_params.get('name')
         if name:
-            queryset = queryset.filter(name__icontains=name)
+            queryset = search_filter(queryset, 'area', name, fields=['name'])
         
         # 按班级筛选
         class_id = request.query_params.get('class_id')
@@ -366,11 +277,13 @@ class SelectionAreaViewSet(viewsets.ModelViewSet):
             'message': '状态更新成功'
         })
 
-class SelectionRecordViewSet(viewsets.ModelViewSet):
+class SelectionRecordViewSet(KeysetPaginationMixin, viewsets.ModelViewSet):
     """
     选区记录视图集
     """
     queryset = SelectionRecord.objects.all()
+    # 游标分页按记录日期、选择时间倒序
+    keyset_ordering = ('-date', '-select_time', '-id')
     serializer_class = SelectionRecordSerializer
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['child__name', 'selection_area__name']
@@ -392,6 +305,9 @@ class SelectionRecordViewSet(viewsets.ModelViewSet):
         elif self.action in ['batch_create', 'end_selection']:
             # 批量创建和结束选区选择仅允许系统所有者和园长
             return [IsKindergartenOwnerOrSystemOwner()]
+        elif self.action == 'bulk_move':
+            # 批量调整选区允许系统所有者、园长和教师，记录按数据范围过滤
+            return [IsKindergartenOwnerOrSystemOwner()]
         elif self.action in ['history', 'active', 'export']:
             # 历史记录、当前有效记录和导出功能允许系统所有者、园长和教师
             return [IsKindergartenOwnerOrSystemOwner()]
@@ -402,26 +318,13 @@ class SelectionRecordViewSet(viewsets.ModelViewSet):
         根据用户角色过滤查询集
         """
         queryset = super().get_queryset().select_related(
-            'child', 'selection_area', 'selection_area__class_info',
+            'child', 'child__class_info', 'selection_area', 'selection_area__class_info',
             'selection_area__class_info__kindergarten', 'operated_by'
         )
-        user = self.request.user
-        
-        # 如果是系统所有者，返回所有记录
-        if hasattr(user, 'role') and user.role == 'owner':
-            return queryset
-        
-        # 如果是园长，返回自己幼儿园的记录
-        elif hasattr(user, 'role') and user.role == 'principal' and user.kindergarten:
-            return queryset.filter(selection_area__class_info__kindergarten=user.kindergarten)
-        
-        # 如果是教师，返回自己负责班级的记录
-        elif hasattr(user, 'role') and user.role == 'teacher' and user.teacher:
-            return queryset.filter(
-                selection_area__class_info_id__in=user.teacher.classes.values_list('id', flat=True)
-            )
-        
-        return queryset.none()
+        # 系统所有者返回所有记录，园长返回自己幼儿园的记录，教师返回自己负责班级的记录
+        return get_user_scope(self.request).filter(
+            queryset, 'selection_area__class_info__kindergarten_id', 'selection_area__class_info_id'
+        )
     
     def get_serializer_class(self):
         """
@@ -462,7 +365,7 @@ class SelectionRecordViewSet(viewsets.ModelViewSet):
         
         child_name = request.query_params.get('child_name')
         if child_name:
-            queryset = queryset.filter(child__name__icontains=child_name)
+            queryset = search_filter(queryset, 'child', child_name, fields=['name'], prefix='child__')
         
         selection_area_id = request.query_params.get('selection_area_id')
         if selection_area_id:
@@ -494,34 +397,69 @@ class SelectionRecordViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(queryset, many=True)
         return Response(serializer.data)
     
+    def perform_destroy(self, instance):
+        """
+        删除选区记录并刷新对应的每日汇总
+        """
+        with transaction.atomic():
+            change = record_change(instance, RECORD_DELETED)
+            instance.delete()
+            refresh_rollup_for_records([instance])
+            publish_record_changes([change])
+    
     @action(detail=False, methods=['post'], permission_classes=[IsKindergartenOwnerOrSystemOwner])
     def batch_create(self, request):
         """
         批量创建选区记录
         """
         records_data = request.data.get('records', [])
-        created_records = []
-        
-        for record_data in records_data:
-            serializer = SelectionRecordCreateSerializer(data=record_data)
-            if serializer.is_valid():
-                instance = serializer.save()
-                created_records.append(instance)
-            else:
-                return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-        
+        if not isinstance(records_data, list):
+            return Response({'error': 'records必须是列表'}, status=status.HTTP_400_BAD_REQUEST)
+
+        # 全部记录校验通过后在一个事务中批量写入，任意一条失败时不写入任何数据
+        try:
+            created_records = batch_create_selection_records(records_data)
+        except BatchSelectionError as e:
+            return Response({'errors': e.errors}, status=status.HTTP_400_BAD_REQUEST)
+
         # 返回创建的记录
         response_serializer = SelectionRecordSerializer(created_records, many=True)
         return Response(response_serializer.data, status=status.HTTP_201_CREATED)
     
+    @action(detail=False, methods=['post'], permission_classes=[IsKindergartenOwnerOrSystemOwner])
+    def bulk_move(self, request):
+        """
+        批量调整选区记录所在的选区
+
+        每项调整包含记录ID、目标选区ID和读取记录时的 updated_at，全部在一个事务中写入。
+        记录已被其他操作修改或删除时返回409及冲突记录的当前状态，不写入任何数据；
+        成功时只返回选区发生变化的记录。
+        """
+        moves_data = request.data.get('moves', [])
+        if not isinstance(moves_data, list):
+            return Response({'error': 'moves必须是列表'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            moved_records = bulk_move_selection_records(moves_data, get_user_scope(request))
+        except BatchSelectionError as e:
+            return Response({'errors': e.errors}, status=status.HTTP_400_BAD_REQUEST)
+        except SelectionMoveConflict as e:
+            return Response({'conflicts': e.conflicts}, status=status.HTTP_409_CONFLICT)
+
+        response_serializer = SelectionRecordSerializer(moved_records, many=True)
+        return Response(response_serializer.data)
+
     @action(detail=True, methods=['patch'], permission_classes=[IsKindergartenOwnerOrSystemOwner])
     def end_selection(self, request, pk=None):
         """
         结束选区选择（标记为无效）
         """
         selection_record = self.get_object()
-        selection_record.is_active = False
-        selection_record.save()
+        with transaction.atomic():
+            selection_record.is_active = False
+            selection_record.save()
+            refresh_rollup_for_records([selection_record])
+            publish_record_changes([record_change(selection_record, RECORD_ENDED)])
         
         # 返回更新后的数据
         serializer = self.get_serializer(selection_record)
@@ -559,61 +497,6 @@ class SelectionRecordViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'], permission_classes=[IsKindergartenOwnerOrSystemOwner])
     def export(self, request):
         """
-        导出选区记录为Excel文件
+        导出选区记录为Excel或CSV文件
         """
-        # 获取查询参数
-        queryset = self.get_queryset()
-        
-        # 应用筛选条件
-        class_id = request.query_params.get('class_id')
-        if class_id:
-            queryset = queryset.filter(selection_area__class_info_id=class_id)
-        
-        child_name = request.query_params.get('child_name')
-        if child_name:
-            queryset = queryset.filter(child__name__icontains=child_name)
-        
-        selection_area_id = request.query_params.get('selection_area_id')
-        if selection_area_id:
-            queryset = queryset.filter(selection_area_id=selection_area_id)
-        
-        date_from = request.query_params.get('date_from')
-        if date_from:
-            queryset = queryset.filter(date__gte=date_from)
-        
-        date_to = request.query_params.get('date_to')
-        if date_to:
-            queryset = queryset.filter(date__lte=date_to)
-        
-        # 应用排序
-        ordering = request.query_params.get('ordering', '-select_time')
-        queryset = queryset.order_by(ordering)
-        
-        # 序列化数据
-        serializer = self.get_serializer(queryset, many=True)
-        data = serializer.data
-        
-        # 创建DataFrame
-        df_data = []
-        for item in data:
-            df_data.append({
-                '幼儿姓名': item.get('child_name', ''),
-                '选区名称': item.get('selection_area_name', ''),
-                '所属班级': item.get('class_name', ''),
-                '选择时间': item.get('select_time', ''),
-                '备注': item.get('notes', ''),
-            })
-        
-        df = pd.DataFrame(df_data)
-        
-        # 创建响应
-        response = HttpResponse(
-            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        )
-        response['Content-Disposition'] = f'attachment; filename="selection_records_{date.today().strftime("%Y%m%d")}.xlsx"'
-        
-        # 写入Excel
-        with pd.ExcelWriter(response, engine='openpyxl') as writer:
-            df.to_excel(writer, index=False, sheet_name='选区记录')
-            
-        return response
+        return run_task(request, 'selections.export')
@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 from django.core.exceptions import ValidationError
 # 在 views.py 或其他文件中
@@ -6,6 +7,47 @@ from common.logger import get_logger
 
 # 获取当前模块的日志记录器
 logger = get_logger(__name__)
+
+
+class TeacherQuerySet(models.QuerySet):
+    """
+    教师查询集
+    """
+    def with_counts(self):
+        """
+        以子查询注解教师负责的班级数和在读学生数
+
+        注解字段为 class_count_value 和 student_count_value
+        """
+        from children.models import Child
+
+        class_count_subquery = Teacher.classes.through.objects.filter(
+            teacher=models.OuterRef('pk')
+        ).order_by().values('teacher').annotate(
+            count=models.Count('id')
+        ).values('count')
+        student_count_subquery = Child.objects.filter(
+            class_info__teachers=models.OuterRef('pk'),
+            is_active=True
+        ).order_by().values('class_info__teachers').annotate(
+            count=models.Count('id')
+        ).values('count')
+        return self.annotate(
+            class_count_value=Coalesce(
+                models.Subquery(class_count_subquery, output_field=models.IntegerField()), 0
+            ),
+            student_count_value=Coalesce(
+                models.Subquery(student_count_subquery, output_field=models.IntegerField()), 0
+            )
+        )
+
+    def with_list_data(self):
+        """
+        序列化教师列表所需的数据：幼儿园联表读取，负责班级预取，并注解班级数和在读学生数
+        """
+        return self.with_counts().select_related('kindergarten').prefetch_related('classes')
+
+
 # 教师模型
 class Teacher(models.Model):
     """
@@ -139,10 +181,16 @@ class Teacher(models.Model):
         auto_now=True
     )
     
+    objects = TeacherQuerySet.as_manager()
+    
     class Meta:
         verbose_name = '教师'
         verbose_name_plural = '教师管理'
         ordering = ['-created_at']
+        indexes = [
+            # 按幼儿园统计在职教师
+            models.Index(fields=['kindergarten', 'is_active'], name='teacher_kg_active_idx'),
+        ]
     
     def __str__(self):
         return f'{self.name}({self.get_position_display()})'
@@ -198,21 +246,22 @@ class Teacher(models.Model):
     # 获取教师负责的班级数量
     def get_class_count(self):
         """
-        获取教师负责的班级数量
+        获取教师负责的班级数量，查询集已注解时直接使用注解值
         """
+        if hasattr(self, 'class_count_value'):
+            return self.class_count_value
         return self.classes.count()
     
     # 获取教师负责的学生数量
     def get_student_count(self):
         """
-        获取教师负责的学生数量
+        获取教师负责的在读学生数量，查询集已注解时直接使用注解值
         """
+        if hasattr(self, 'student_count_value'):
+            return self.student_count_value
         from children.models import Child
-        # 获取教师所有负责班级的学生总数
-        student_count = 0
-        for class_info in self.classes.all():
-            student_count += Child.objects.filter(class_info=class_info, is_active=True).count()
-        return student_count
+        # 一条查询统计教师所有负责班级的在读学生总数
+        return Child.objects.filter(class_info__teachers=self, is_active=True).count()
     
     # 获取教师负责的班级（用于兼容teaching_classes属性）
     @property
@@ -0,0 +1,70 @@
+from datetime import timedelta
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+
+# 排行榜返回的教师字段
+RANKING_FIELDS = ('id', 'name', 'position')
+
+
+def _top_teacher(active_teachers, count_field, output_field):
+    """
+    在数据库中按统计数降序取第一名，统计数为0时返回 None
+
+    并列时取最近创建的教师，与按默认排序逐个比较的结果一致。
+    """
+    row = active_teachers.filter(**{f'{count_field}__gt': 0}).order_by(
+        f'-{count_field}', '-created_at', '-id'
+    ).values(*RANKING_FIELDS, count_field).first()
+    if row is None:
+        return None
+    result = {field: row[field] for field in RANKING_FIELDS}
+    result[output_field] = row[count_field]
+    return result
+
+
+def build_teacher_stats(queryset):
+    """
+    计算教师统计数据
+
+    无论教师数量多少，都只执行固定的5条查询：
+    汇总计数（含学生总数）、职务分组、性别分组、负责班级最多和负责学生最多的教师。
+
+    Args:
+        queryset: 已按用户数据范围过滤的教师查询集
+    """
+    now = timezone.now()
+    three_months_ago = (now - timedelta(days=90)).date()
+    three_years_ago = (now - timedelta(days=3 * 365)).date()
+    active = Q(is_active=True)
+
+    counted = queryset.with_counts()
+    totals = counted.aggregate(
+        total_count=Count('id'),
+        active_count=Count('id', filter=active),
+        kindergarten_count=Count('kindergarten_id', distinct=True),
+        total_students=Sum('student_count_value', filter=active),
+        recent_hires_count=Count('id', filter=Q(hire_date__gte=three_months_ago)),
+        long_term_teachers_count=Count('id', filter=active & Q(hire_date__lte=three_years_ago)),
+    )
+    total_count = totals['total_count']
+    active_count = totals['active_count']
+    kindergarten_count = totals['kindergarten_count']
+    total_students = totals['total_students'] or 0
+
+    active_teachers = counted.filter(active)
+    return {
+        'total_count': total_count,
+        'active_count': active_count,
+        'inactive_count': total_count - active_count,
+        'position_stats': list(queryset.order_by().values('position').annotate(count=Count('id'))),
+        'gender_stats': list(queryset.order_by().values('gender').annotate(count=Count('id'))),
+        'avg_teachers_per_kindergarten': round(
+            active_count / kindergarten_count if kindergarten_count > 0 else 0, 2
+        ),
+        'avg_students_per_teacher': round(total_students / active_count if active_count > 0 else 0, 2),
+        'teacher_with_most_classes': _top_teacher(active_teachers, 'class_count_value', 'class_count'),
+        'teacher_with_most_students': _top_teacher(active_teachers, 'student_count_value', 'student_count'),
+        'recent_hires_count': totals['recent_hires_count'],
+        'long_term_teachers_count': totals['long_term_teachers_count'],
+    }
@@ -0,0 +1,238 @@
+from datetime import datetime
+from django.http import HttpResponse
+from rest_framework import status
+from rest_framework.response import Response
+import pandas as pd
+from .models import Teacher
+from .serializers import TeacherImportSerializer
+from jobs.registry import register_task
+
+
+@register_task('teachers.import_data')
+def import_teachers(user, params, upload):
+    """
+    批量导入教师数据
+    """
+    data = params.copy()
+    data['file'] = upload
+    serializer = TeacherImportSerializer(data=data)
+    serializer.is_valid(raise_exception=True)
+    
+    
+    try:
+        # 读取Excel文件
+        df = pd.read_excel(upload)
+        
+        # 检查必要的列
+        required_columns = ['姓名(*)', '性别(*)', '职位(*)', '手机号码(*)']
+        if user.role == 'system_owner':
+            required_columns.append('幼儿园名称(*)')
+        
+        missing_columns = [col for col in required_columns if col not in df.columns]
+        if missing_columns:
+            return Response(
+                {'error': f'缺少必要的列: {missing_columns}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        created_count = 0
+        updated_count = 0
+        errors = []
+        teachers_to_create = []  # 用于暂存待创建的教师数据
+        teachers_to_update = []  # 用于暂存待更新的教师数据
+        
+        # 预处理所有行数据，收集错误
+        processed_data = []
+        for index, row in df.iterrows():
+            try:
+                # 确定幼儿园ID
+                if user.role == 'system_owner':
+                    if '幼儿园名称(*)' not in row or pd.isna(row['幼儿园名称(*)']):
+                        errors.append(f"第{index+2}行: 幼儿园名称不能为空")
+                        continue
+                    from kindergartens.models import Kindergarten
+                    try:
+                        kindergarten = Kindergarten.objects.get(name=row['幼儿园名称(*)'])
+                        kindergarten_id = kindergarten.id
+                    except Kindergarten.DoesNotExist:
+                        errors.append(f"第{index+2}行: 幼儿园 '{row['幼儿园名称(*)']}' 不存在")
+                        continue
+                else:
+                    # 对于教师用户，从关联的教师记录中获取幼儿园信息
+                    if user.role == 'teacher' and hasattr(user, 'teacher') and user.teacher:
+                        kindergarten_id = user.teacher.kindergarten.id
+                    else:
+                        kindergarten_id = user.kindergarten.id
+                
+                # 查找是否已存在该教师（通过手机号）
+                teacher = None
+                if '手机号码(*)' in row and pd.notna(row['手机号码(*)']):
+                    phone = str(row['手机号码(*)']).strip()
+                    teacher = Teacher.objects.filter(phone=phone).first()
+                
+                # 转换职务
+                position_map = {
+                    '园长': 'principal',
+                    '班主任': 'head_teacher',
+                    '配班老师': 'assistant_teacher',
+                    '生活老师': 'life_teacher'
+                }
+                position = position_map.get(row['职位(*)'], 'assistant_teacher')
+                
+                # 转换性别
+                gender_map = {
+                    '男': 'male',
+                    '女': 'female'
+                }
+                gender = gender_map.get(row['性别(*)'], 'female')
+                
+                # 准备教师数据
+                teacher_data = {
+                    'name': row['姓名(*)'],
+                    'gender': gender,
+                    'position': position,
+                    'kindergarten_id': kindergarten_id,
+                    'phone': phone if pd.notna(row.get('手机号码(*)')) else None
+                }
+                
+                # 处理可选字段
+                optional_fields = {
+                    'employee_id': '工号',
+                    'email': '邮箱',
+                    'notes': '备注'
+                }
+                for field, col in optional_fields.items():
+                    if col in row and pd.notna(row[col]):
+                        teacher_data[field] = row[col]
+                
+                # 处理班级字段
+                class_id = None
+                if '班级' in row and pd.notna(row['班级']):
+                    from classes.models import Class
+                    try:
+                        class_obj = Class.objects.get(name=row['班级'], kindergarten_id=kindergarten_id)
+                        class_id = class_obj.id
+                    except Class.DoesNotExist:
+                        errors.append(f"第{index+2}行: 班级 '{row['班级']}' 在当前幼儿园中不存在")
+                
+                # 处理入职日期
+                if '入职日期' in row and pd.notna(row['入职日期']):
+                    hire_date = row['入职日期']
+                    if isinstance(hire_date, pd.Timestamp):
+                        hire_date = hire_date.date()
+                    teacher_data['hire_date'] = hire_date
+                
+                # 保存处理后的数据
+                processed_data.append({
+                    'teacher': teacher,
+                    'teacher_data': teacher_data,
+                    'class_id': class_id,
+                    'row_index': index
+                })
+                    
+            except Exception as e:
+                errors.append(f"第{index+2}行: {str(e)}")
+        
+        # 如果有任何错误，直接返回错误信息，不进行任何创建或更新操作
+        if errors:
+            return Response({
+                'created_count': 0,
+                'updated_count': 0,
+                'total_rows': len(df),
+                'errors': errors
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        # 如果没有错误，则执行创建和更新操作
+        created_count = 0
+        updated_count = 0
+        
+        for data in processed_data:
+            teacher = data['teacher']
+            teacher_data = data['teacher_data']
+            class_id = data['class_id']
+            index = data['row_index']
+            
+            try:
+                if teacher:
+                    # 更新现有教师
+                    for field, value in teacher_data.items():
+                        setattr(teacher, field, value)
+                    teacher.save()
+                    # 如果有班级ID，则关联班级
+                    if class_id:
+                        from classes.models import Class
+                        try:
+                            class_obj = Class.objects.get(id=class_id)
+                            teacher.classes.set([class_obj])
+                        except Class.DoesNotExist:
+                            pass  # 班级不存在，忽略
+                    updated_count += 1
+                else:
+                    # 创建新教师
+                    new_teacher = Teacher.objects.create(**teacher_data)
+                    # 如果有班级ID，则关联班级
+                    if class_id:
+                        from classes.models import Class
+                        try:
+                            class_obj = Class.objects.get(id=class_id)
+                            new_teacher.classes.add(class_obj)
+                        except Class.DoesNotExist:
+                            pass  # 班级不存在，忽略
+                    created_count += 1
+            except Exception as e:
+                # 理论上不应该到这里，但如果发生异常，记录错误
+                errors.append(f"第{index+2}行处理时发生错误: {str(e)}")
+        
+        result = {
+            'created_count': created_count,
+            'updated_count': updated_count,
+            'total_rows': len(df),
+            'errors': errors
+        }
+        
+        if errors:
+            return Response(result, status=status.HTTP_207_MULTI_STATUS)
+        else:
+            return Response(result, status=status.HTTP_201_CREATED)
+            
+    except Exception as e:
+        return Response(
+            {'error': f'导入失败: {str(e)}'},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+
+@register_task('teachers.export_template')
+def export_teacher_template(user, params, upload):
+    """
+    导出教师数据导入模板
+    """
+    
+    # 创建模板数据，表头与创建教师字段保持一致
+    template_data = {
+        '姓名(*)': ['张三', '李四'],
+        '工号': ['T001', 'T002'],  # 可选
+        '性别(*)': ['女', '男'],
+        '职位(*)': ['配班老师', '班主任'],  # 可选值：园长、班主任、配班老师、生活老师
+        '手机号码(*)': ['13800138000', '13900139000'],
+        '邮箱': ['zhangsan@example.com', 'lisi@example.com'],  # 可选
+        '班级': ['大班1', '中班1'],  # 可选，使用班级名称
+        '入职日期': ['2023-01-01', '2023-02-01'],  # 可选
+        '备注': ['主班老师', '配班老师']  # 可选
+    }
+    
+    # 如果是系统所有者，添加幼儿园名称列
+    if user.role == 'system_owner':
+        template_data['幼儿园名称(*)'] = ['幼儿园A', '幼儿园B']  # 示例名称
+    
+    df = pd.DataFrame(template_data)
+    
+    # 创建响应
+    response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+    response['Content-Disposition'] = f'attachment; filename=teacher_template_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
+    
+    # 保存到响应
+    with pd.ExcelWriter(response, engine='openpyxl') as writer:
+        df.to_excel(writer, index=False, sheet_name='教师信息')
+    
+    return response
@@ -1,3 +1,239 @@
+import random
+from datetime import timedelta
+from django.core.cache import cache
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+from common.query_plan import QueryPlanAssertionsMixin
+from kindergartens.models import Kindergarten
+from classes.models import Class
+from children.models import Child
+from users.models import User
+from .models import Teacher
 
-# Create your tests here.
+
+class TeacherListQueryBudgetTests(TestCase):
+    """
+    教师列表接口查询次数测试
+    """
+    # 列表接口固定执行的查询次数：总数统计、当前页数据、预取负责班级
+    LIST_QUERY_BUDGET = 3
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.kindergarten = Kindergarten.objects.create(name='阳光幼儿园')
+        cls.class_a = Class.objects.create(name='大一班', kindergarten=cls.kindergarten)
+        cls.class_b = Class.objects.create(name='小一班', kindergarten=cls.kindergarten)
+        Child.objects.create(name='张三', class_info=cls.class_a)
+        Child.objects.create(name='李四', class_info=cls.class_a)
+        Child.objects.create(name='王五', class_info=cls.class_b)
+        Child.objects.create(name='毕业生', class_info=cls.class_b, is_active=False)
+        cls.teacher = Teacher.objects.create(name='王老师', kindergarten=cls.kindergarten)
+        cls.teacher.classes.add(cls.class_a, cls.class_b)
+        cls.idle_teacher = Teacher.objects.create(name='李老师', kindergarten=cls.kindergarten)
+        cls.principal = User.objects.create_user(
+            username='principal', password='pass', role='principal', kindergarten=cls.kindergarten
+        )
+
+    def get_list(self, page_size=10):
+        client = APIClient()
+        client.force_authenticate(user=self.principal)
+        with self.assertNumQueries(self.LIST_QUERY_BUDGET):
+            response = client.get('/api/teachers/', {'page_size': page_size})
+        self.assertEqual(response.status_code, 200)
+        return {item['name']: item for item in response.data['results']}
+
+    def test_counts_and_classes(self):
+        items = self.get_list()
+        self.assertEqual(items['王老师']['class_count'], 2)
+        self.assertEqual(items['王老师']['student_count'], 3)
+        self.assertEqual({c['name'] for c in items['王老师']['classes']}, {'大一班', '小一班'})
+        self.assertEqual(items['王老师']['kindergarten']['name'], '阳光幼儿园')
+        self.assertEqual((items['李老师']['class_count'], items['李老师']['student_count']), (0, 0))
+
+    def test_query_budget_does_not_grow_with_page_size(self):
+        for i in range(30):
+            teacher = Teacher.objects.create(name=f'教师{i}', kindergarten=self.kindergarten)
+            teacher.classes.add(self.class_a)
+        self.assertEqual(len(self.get_list(page_size=100)), 32)
+
+    def test_model_methods_match_annotations(self):
+        annotated = Teacher.objects.with_list_data().get(pk=self.teacher.pk)
+        plain = Teacher.objects.get(pk=self.teacher.pk)
+        self.assertEqual(annotated.get_student_count(), plain.get_student_count())
+        self.assertEqual(annotated.get_class_count(), plain.get_class_count())
+
+
+class TeacherStatsTests(TestCase):
+    """
+    教师统计接口测试
+    """
+    # 统计接口固定执行的查询次数
+    STATS_QUERY_BUDGET = 5
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.kindergarten = Kindergarten.objects.create(name='阳光幼儿园')
+        cls.owner = User.objects.create_user(username='owner', password='pass', role='owner')
+
+    def generate(self, teachers, classes=10, children_per_class=8, seed=1):
+        """
+        生成随机的教师、班级和幼儿数据
+        """
+        rng = random.Random(seed)
+        today = timezone.now().date()
+        class_list = [
+            Class.objects.create(name=f'班级{seed}-{i}', kindergarten=self.kindergarten) for i in range(classes)
+        ]
+        Child.objects.bulk_create([
+            Child(name=f'幼儿{i}', class_info=class_obj, is_active=rng.random() > 0.1)
+            for class_obj in class_list for i in range(children_per_class)
+        ])
+        for i in range(teachers):
+            teacher = Teacher.objects.create(
+                name=f'教师{seed}-{i}', kindergarten=self.kindergarten,
+                position=rng.choice(['teacher', 'assistant', 'head_teacher']),
+                hire_date=today - timedelta(days=rng.randint(0, 2000)),
+                is_active=rng.random() > 0.2
+            )
+            teacher.classes.add(*rng.sample(class_list, rng.randint(0, 3)))
+
+    def expected_stats(self):
+        """
+        按原逐个教师计算的方式得到期望结果
+        """
+        active = list(Teacher.objects.filter(is_active=True))
+        most_classes = max(active, key=lambda t: (t.get_class_count(), t.created_at, t.id))
+        most_students = max(active, key=lambda t: (t.get_student_count(), t.created_at, t.id))
+        total_students = sum(t.get_student_count() for t in active)
+        return {
+            'active_count': len(active),
+            'avg_students_per_teacher': round(total_students / len(active), 2),
+            'most_classes': (most_classes.id, most_classes.get_class_count()),
+            'most_students': (most_students.id, most_students.get_student_count()),
+        }
+
+    def get_stats(self):
+        client = APIClient()
+        client.force_authenticate(user=self.owner)
+        with self.assertNumQueries(self.STATS_QUERY_BUDGET):
+            response = client.get('/api/teachers/stats/')
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_stats_match_per_teacher_computation(self):
+        self.generate(teachers=40)
+        data = self.get_stats()
+        expected = self.expected_stats()
+        self.assertEqual(data['total_count'], 40)
+        self.assertEqual(data['active_count'], expected['active_count'])
+        self.assertEqual(data['inactive_count'], 40 - expected['active_count'])
+        self.assertEqual(data['avg_students_per_teacher'], expected['avg_students_per_teacher'])
+        self.assertEqual(
+            (data['teacher_with_most_classes']['id'], data['teacher_with_most_classes']['class_count']),
+            expected['most_classes']
+        )
+        self.assertEqual(
+            (data['teacher_with_most_students']['id'], data['teacher_with_most_students']['student_count']),
+            expected['most_students']
+        )
+        self.assertEqual(sum(item['count'] for item in data['position_stats']), 40)
+
+    def test_no_classes_means_no_ranking(self):
+        Teacher.objects.create(name='王老师', kindergarten=self.kindergarten)
+        data = self.get_stats()
+        self.assertIsNone(data['teacher_with_most_classes'])
+        self.assertIsNone(data['teacher_with_most_students'])
+        self.assertEqual(data['avg_teachers_per_kindergarten'], 1.0)
+
+    def test_benchmark_query_count_is_constant(self):
+        # 教师数量从30增加到300时查询次数不变
+        for seed, teachers in ((1, 30), (2, 270)):
+            self.generate(teachers=teachers, seed=seed)
+            data = self.get_stats()
+            self.assertEqual(data['total_count'], Teacher.objects.count())
+
+
+class TeacherQueryPlanTests(QueryPlanAssertionsMixin, TestCase):
+    """
+    教师热点查询执行计划测试
+    """
+    def test_kindergarten_filter_uses_index(self):
+        kindergarten = Kindergarten.objects.create(name='阳光幼儿园')
+        Teacher.objects.create(name='王老师', kindergarten=kindergarten)
+        self.assertNoFullScan(Teacher.objects.filter(kindergarten_id=kindergarten.id, is_active=True))
+
+
+class TeacherResponseCacheTests(TestCase):
+    """
+    在职教师和按职务分组接口的响应缓存测试
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.kindergarten = Kindergarten.objects.create(name='阳光幼儿园')
+        cls.other_kindergarten = Kindergarten.objects.create(name='星星幼儿园')
+        cls.class_a = Class.objects.create(name='大一班', kindergarten=cls.kindergarten)
+        cls.teacher = Teacher.objects.create(name='王老师', kindergarten=cls.kindergarten, position='teacher')
+        Teacher.objects.create(name='赵老师', kindergarten=cls.other_kindergarten, position='teacher')
+        cls.principal = User.objects.create_user(
+            username='principal', password='pass', role='principal', kindergarten=cls.kindergarten
+        )
+        cls.other_principal = User.objects.create_user(
+            username='other_principal', password='pass', role='principal', kindergarten=cls.other_kindergarten
+        )
+
+    def setUp(self):
+        # 测试之间数据库会回滚，缓存不会
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.principal)
+
+    def get_active(self, **headers):
+        response = self.client.get('/api/teachers/active/', **headers)
+        self.assertIn(response.status_code, (200, 304))
+        return response
+
+    def test_second_request_hits_cache(self):
+        first = self.get_active()
+        with self.assertNumQueries(0):
+            second = self.get_active()
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(second['ETag'], first['ETag'])
+        self.assertEqual(first['Cache-Control'], 'private, no-cache')
+
+    def test_matching_etag_returns_not_modified(self):
+        etag = self.get_active()['ETag']
+        with self.assertNumQueries(0):
+            response = self.get_active(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(self.get_active(HTTP_IF_NONE_MATCH='"stale"').status_code, 200)
+
+    def test_save_and_delete_invalidate(self):
+        etag = self.get_active()['ETag']
+        self.teacher.name = '王老师（班主任）'
+        self.teacher.save()
+        response = self.get_active(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item['name'] for item in response.data], ['王老师（班主任）'])
+
+        self.teacher.delete()
+        self.assertEqual(self.get_active().data, [])
+
+    def test_class_assignment_invalidates(self):
+        self.assertEqual(self.get_active().data[0]['class_count'], 0)
+        self.teacher.classes.add(self.class_a)
+        self.assertEqual(self.get_active().data[0]['class_count'], 1)
+        Child.objects.create(name='张三', class_info=self.class_a)
+        self.assertEqual(self.get_active().data[0]['student_count'], 1)
+
+    def test_cache_is_separated_by_scope_and_params(self):
+        self.get_active()
+        other = APIClient()
+        other.force_authenticate(user=self.other_principal)
+        response = other.get('/api/teachers/active/')
+        self.assertEqual([item['name'] for item in response.data], ['赵老师'])
+
+        self.client.get('/api/teachers/by_position/')
+        response = self.client.get('/api/teachers/by_position/', {'position': 'assistant'})
+        self.assertEqual(response.data['teacher'], [])
@@ -0,0 +1,86 @@
+from functools import partial
+from django.utils.functional import SimpleLazyObject
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from .scope import get_scope_version, scope_version_is_shared
+
+
+# 令牌中数据范围版本号和班级ID的声明名称
+SCOPE_VERSION_CLAIM = 'scope_version'
+CLASS_IDS_CLAIM = 'class_ids'
+USER_CLASS_IDS_CLAIM = 'user_class_ids'
+
+
+class ClaimsUser(SimpleLazyObject):
+    """
+    根据令牌声明构建的用户代理
+
+    用户ID、角色、幼儿园ID、教师ID和班级ID直接取自令牌，读取这些属性不会查询数据库；
+    访问其他属性（如 kindergarten、teacher 或作为外键赋值）时才加载完整的用户记录。
+    """
+    def __init__(self, validated_token, load_user):
+        super().__init__(load_user)
+        user_id = validated_token[api_settings.USER_ID_CLAIM]
+        scope_claims = None
+        if CLASS_IDS_CLAIM in validated_token and USER_CLASS_IDS_CLAIM in validated_token:
+            scope_claims = {
+                'class_ids': list(validated_token[CLASS_IDS_CLAIM]),
+                'user_class_ids': list(validated_token[USER_CLASS_IDS_CLAIM]),
+            }
+        # LazyObject 会把属性赋值转发给被代理对象，声明属性直接写入代理自身
+        self.__dict__.update({
+            'id': user_id,
+            'pk': user_id,
+            'username': validated_token.get('username', ''),
+            'role': validated_token.get('role'),
+            'kindergarten_id': validated_token.get('kindergarten_id'),
+            'teacher_id': validated_token.get('teacher_id'),
+            'scope_claims': scope_claims,
+            'is_active': True,
+            'is_authenticated': True,
+            'is_anonymous': False,
+        })
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    信任令牌声明的JWT认证
+
+    令牌中的数据范围版本号与当前版本一致时，直接使用令牌声明构建用户，不查询用户表；
+    版本号不一致（角色、幼儿园、班级等已变化）或令牌没有版本号时，
+    不使用令牌中的声明，按原方式从数据库加载用户。
+    缓存不在进程间共享时无法得知其他进程递增的版本号，同样从数据库加载用户。
+    """
+    def get_user(self, validated_token):
+        if SCOPE_VERSION_CLAIM not in validated_token or 'role' not in validated_token:
+            return super().get_user(validated_token)
+        if not scope_version_is_shared():
+            return super().get_user(validated_token)
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        if user_id is None or validated_token[SCOPE_VERSION_CLAIM] != get_scope_version(user_id):
+            return super().get_user(validated_token)
+        return ClaimsUser(validated_token, partial(super().get_user, validated_token))
+
+
+def authenticate_request_token(request, query_param='token'):
+    """
+    认证普通 Django 视图的请求，先读取 Authorization 请求头，没有时读取 token 查询参数（query_param 为 None 时不读取）
+
+    用于事件流等不经过 DRF 的视图；浏览器的 EventSource 不能设置请求头，只能通过查询参数传递令牌。
+
+    Returns:
+        用户对象，令牌缺失或无效时返回 None
+    """
+    authentication = ClaimsJWTAuthentication()
+    header = authentication.get_header(request)
+    raw_token = authentication.get_raw_token(header) if header is not None else None
+    if raw_token is None and query_param:
+        raw_token = request.GET.get(query_param)
+    if not raw_token:
+        return None
+    try:
+        return authentication.get_user(authentication.get_validated_token(raw_token))
+    except (InvalidToken, AuthenticationFailed):
+        return None
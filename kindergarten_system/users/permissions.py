@@ -1,5 +1,17 @@
 from rest_framework import permissions
 from rest_framework.permissions import BasePermission, SAFE_METHODS
+from .scope import get_user_scope
+
+
+def _kindergarten_id(obj):
+    """
+    获取对象所属幼儿园的ID，幼儿通过所在班级获取
+    """
+    if hasattr(obj, 'kindergarten_id'):
+        return obj.kindergarten_id
+    if hasattr(obj, 'class_info_id'):
+        return obj.class_info.kindergarten_id if obj.class_info_id else None
+    return None
 
 class IsOwnerOrReadOnly(BasePermission):
     """
@@ -58,26 +70,25 @@ class KindergartenDataPermission(BasePermission):
     - 教师只能访问自己关联班级的数据
     """
     def has_object_permission(self, request, view, obj):
+        scope = get_user_scope(request)
+
         # 系统所有者可以访问所有数据
-        if hasattr(request.user, 'role') and request.user.role == 'owner':
+        if scope.is_owner:
             return True
         
         # 园长只能访问自己幼儿园的数据
-        if hasattr(request.user, 'role') and request.user.role == 'principal':
-            if hasattr(obj, 'kindergarten'):
-                return obj.kindergarten == request.user.kindergarten
+        if scope.is_principal:
+            if hasattr(obj, 'kindergarten_id'):
+                return obj.kindergarten_id == scope.kindergarten_id
             # 如果对象本身是幼儿园，则检查是否是自己的幼儿园
-            if hasattr(obj, 'id') and hasattr(request.user, 'kindergarten'):
-                return obj.id == request.user.kindergarten.id
+            return obj.pk == scope.kindergarten_id
         
         # 教师只能访问自己关联班级的数据
-        if hasattr(request.user, 'role') and request.user.role == 'teacher':
-            if hasattr(obj, 'class'):
-                return obj.classes in request.user.classes.all()
+        if scope.role == 'teacher':
             if hasattr(obj, 'classes'):
-                return obj.classes.filter(id__in=[c.id for c in request.user.classes.all()]).exists()
-            if hasattr(obj, 'kindergarten'):
-                return obj.kindergarten == request.user.kindergarten
+                return obj.classes.filter(id__in=scope.user_class_ids).exists()
+            if hasattr(obj, 'kindergarten_id'):
+                return obj.kindergarten_id is not None and obj.kindergarten_id == scope.kindergarten_id
         
         return False
     
@@ -93,11 +104,11 @@ class TeacherDataPermission(BasePermission):
     - 园长只能访问自己幼儿园的教师数据
     """
     def has_object_permission(self, request, view, obj):
-        if hasattr(request.user, 'role'):
-            if request.user.role == 'owner':
-                return True
-            elif request.user.role == 'principal':
-                return obj.kindergarten == request.user.kindergarten
+        scope = get_user_scope(request)
+        if scope.is_owner:
+            return True
+        elif scope.is_principal:
+            return _kindergarten_id(obj) == scope.kindergarten_id
         return False
 
 class ClassDataPermission(BasePermission):
@@ -108,14 +119,14 @@ class ClassDataPermission(BasePermission):
     - 教师只能访问自己负责的班级数据
     """
     def has_object_permission(self, request, view, obj):
-        if hasattr(request.user, 'role'):
-            if request.user.role == 'owner':
-                return True
-            elif request.user.role == 'principal':
-                return obj.kindergarten == request.user.kindergarten
-            elif request.user.role == 'teacher' and hasattr(request.user, 'teacher'):
-                # 检查班级是否在教师负责的班级列表中
-                return obj in request.user.teacher.classes.all()
+        scope = get_user_scope(request)
+        if scope.is_owner:
+            return True
+        elif scope.is_principal:
+            return obj.kindergarten_id == scope.kindergarten_id
+        elif scope.is_teacher:
+            # 检查班级是否在教师负责的班级列表中
+            return obj.pk in scope.class_ids
         return False
 
 class ChildDataPermission(BasePermission):
@@ -126,12 +137,12 @@ class ChildDataPermission(BasePermission):
     - 教师只能访问自己关联班级的幼儿数据
     """
     def has_object_permission(self, request, view, obj):
-        if hasattr(request.user, 'role'):
-            if request.user.role == 'owner':
-                return True
-            elif request.user.role == 'principal':
-                return obj.kindergarten == request.user.kindergarten
-            elif request.user.role == 'teacher' and hasattr(request.user, 'teacher'):
-                # 检查幼儿所在的班级是否在教师负责的班级列表中
-                return obj.class_info in request.user.teacher.classes.all()
-        return False
\ No newline at end of file
+        scope = get_user_scope(request)
+        if scope.is_owner:
+            return True
+        elif scope.is_principal:
+            return _kindergarten_id(obj) == scope.kindergarten_id
+        elif scope.is_teacher:
+            # 检查幼儿所在的班级是否在教师负责的班级列表中
+            return obj.class_info_id in scope.class_ids
+        return False
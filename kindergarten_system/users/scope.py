@@ -0,0 +1,181 @@
+import time
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+
+
+# 缓存键前缀
+SCOPE_CACHE_PREFIX = 'user_scope'
+SCOPE_VERSION_PREFIX = 'user_scope_version'
+
+# 请求内记忆化使用的请求对象属性名
+_MEMO_ATTR = '_user_scope'
+
+
+def _version_key(user_id):
+    return f'{SCOPE_VERSION_PREFIX}:{user_id}'
+
+
+def get_scope_version(user_id):
+    """
+    获取用户数据范围的当前版本号
+
+    版本号保存在缓存中且不过期；不存在时以当前纳秒时间戳初始化，
+    缓存被清空后重新生成的版本号不会与之前的版本号重复。
+    """
+    key = _version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def scope_version_is_shared():
+    """
+    数据范围版本号是否保存在进程间共享的缓存中
+
+    本地内存缓存（默认配置）只在当前进程有效，其他工作进程递增的版本号不可见。
+    """
+    return not isinstance(caches[DEFAULT_CACHE_ALIAS], (LocMemCache, DummyCache))
+
+
+def _bump_versions(user_ids):
+    for user_id in user_ids:
+        try:
+            cache.incr(_version_key(user_id))
+        except ValueError:
+            # 版本号不存在说明没有缓存过数据范围，下次读取时会重新生成
+            pass
+
+
+def bump_scope_version(user_ids):
+    """
+    使用户的数据范围缓存失效
+
+    立即递增一次版本号，并在事务提交后再递增一次，
+    避免并发请求在事务提交前按旧数据重新写入缓存。
+    """
+    user_ids = {user_id for user_id in user_ids if user_id is not None}
+    if not user_ids:
+        return
+    _bump_versions(user_ids)
+    transaction.on_commit(lambda: _bump_versions(user_ids))
+
+
+class UserScope:
+    """
+    用户数据范围
+    - 系统所有者：全部数据
+    - 园长：本幼儿园数据
+    - 教师：本人负责班级的数据
+
+    角色、幼儿园ID和教师ID直接读取用户对象的字段；
+    班级ID集合优先使用令牌声明，否则在首次使用时读取，并按用户缓存。
+    """
+    def __init__(self, user):
+        self.user_id = getattr(user, 'pk', None)
+        self.role = getattr(user, 'role', None)
+        self.kindergarten_id = getattr(user, 'kindergarten_id', None)
+        self.teacher_id = getattr(user, 'teacher_id', None)
+        self._data = getattr(user, 'scope_claims', None)
+
+    @property
+    def is_owner(self):
+        return self.role == 'owner'
+
+    @property
+    def is_principal(self):
+        return self.role == 'principal' and self.kindergarten_id is not None
+
+    @property
+    def is_teacher(self):
+        return self.role == 'teacher' and self.teacher_id is not None
+
+    def _cache_key(self):
+        version = get_scope_version(self.user_id)
+        return f'{SCOPE_CACHE_PREFIX}:{self.user_id}:{self.teacher_id}:{version}'
+
+    def _load(self):
+        """
+        从数据库读取班级ID集合
+        """
+        from classes.models import Class
+
+        class_ids = []
+        if self.teacher_id is not None:
+            class_ids = list(Class.objects.filter(teachers__id=self.teacher_id).values_list('id', flat=True))
+        user_class_ids = list(Class.objects.filter(user__id=self.user_id).values_list('id', flat=True))
+        return {'class_ids': class_ids, 'user_class_ids': user_class_ids}
+
+    @property
+    def data(self):
+        if self._data is None:
+            if self.user_id is None:
+                self._data = {'class_ids': [], 'user_class_ids': []}
+            else:
+                key = self._cache_key()
+                data = cache.get(key)
+                if data is None:
+                    data = self._load()
+                    cache.set(key, data, getattr(settings, 'USER_SCOPE_CACHE_TIMEOUT', 3600))
+                self._data = data
+        return self._data
+
+    @property
+    def class_ids(self):
+        """
+        教师负责的班级ID集合（Teacher.classes）
+        """
+        return frozenset(self.data['class_ids'])
+
+    @property
+    def user_class_ids(self):
+        """
+        用户账号关联的班级ID集合（User.classes）
+        """
+        return frozenset(self.data['user_class_ids'])
+
+    @property
+    def cache_key(self):
+        """
+        数据范围标识，范围相同的用户得到相同的值，用于缓存按数据范围过滤的响应
+        """
+        if self.is_owner:
+            return 'owner'
+        if self.is_principal:
+            return f'principal:{self.kindergarten_id}'
+        if self.is_teacher:
+            class_ids = ','.join(str(pk) for pk in sorted(self.class_ids))
+            return f'teacher:{self.teacher_id}:{class_ids}'
+        return 'none'
+
+    def filter(self, queryset, kindergarten_path, class_path=None):
+        """
+        将数据范围应用到查询集
+
+        Args:
+            queryset: 需要过滤的查询集
+            kindergarten_path (str): 指向幼儿园ID的查询路径
+            class_path (str): 指向班级ID的查询路径，为 None 时教师没有访问权限
+        """
+        if self.is_owner:
+            return queryset
+        if self.is_principal:
+            return queryset.filter(**{kindergarten_path: self.kindergarten_id})
+        if self.is_teacher and class_path is not None:
+            return queryset.filter(**{f'{class_path}__in': self.class_ids})
+        return queryset.none()
+
+
+def get_user_scope(request):
+    """
+    获取当前请求用户的数据范围，同一请求内的视图和权限类共用一个实例
+    """
+    scope = getattr(request, _MEMO_ATTR, None)
+    if scope is None or scope.user_id != getattr(request.user, 'pk', None):
+        scope = UserScope(request.user)
+        setattr(request, _MEMO_ATTR, scope)
+    return scope
@@ -1,6 +1,11 @@
+from django.conf import settings
 from rest_framework import serializers
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.settings import api_settings
 from .models import User
+from .scope import UserScope, get_scope_version
+from .authentication import SCOPE_VERSION_CLAIM, CLASS_IDS_CLAIM, USER_CLASS_IDS_CLAIM
 
 # 用户登录令牌序列化器
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
@@ -14,8 +19,17 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
         # 添加用户自定义信息到token中
         token['username'] = user.username
         token['role'] = user.role
-        token['kindergarten_id'] = user.kindergarten.id if user.kindergarten else None
-        token['teacher_id'] = user.teacher.id if user.teacher else None
+        token['kindergarten_id'] = user.kindergarten_id
+        token['teacher_id'] = user.teacher_id
+
+        # 数据范围版本号先于班级ID读取，读取期间发生变化时令牌会被视为过期
+        token[SCOPE_VERSION_CLAIM] = get_scope_version(user.pk)
+        scope_data = UserScope(user).data
+        # 班级较多时不写入令牌，避免令牌过大，改由服务端缓存提供
+        limit = getattr(settings, 'JWT_CLASS_IDS_CLAIM_LIMIT', 100)
+        if len(scope_data['class_ids']) + len(scope_data['user_class_ids']) <= limit:
+            token[CLASS_IDS_CLAIM] = list(scope_data['class_ids'])
+            token[USER_CLASS_IDS_CLAIM] = list(scope_data['user_class_ids'])
         
         return token
     
@@ -39,6 +53,19 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
         
         return data
 
+# 令牌刷新序列化器
+class CustomTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    自定义令牌刷新序列化器，重新读取用户信息生成访问令牌中的声明，
+    避免刷新得到的访问令牌沿用过期的角色和班级信息
+    """
+    def validate(self, attrs):
+        data = super().validate(attrs)
+        user_id = RefreshToken(attrs['refresh']).payload.get(api_settings.USER_ID_CLAIM)
+        user = User.objects.get(**{api_settings.USER_ID_FIELD: user_id})
+        data['access'] = str(CustomTokenObtainPairSerializer.get_token(user).access_token)
+        return data
+
 # 用户简要信息序列化器
 class UserBriefSerializer(serializers.ModelSerializer):
     """
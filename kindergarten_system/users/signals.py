@@ -0,0 +1,95 @@
+from django.db.models import Q
+from django.db.models.signals import m2m_changed, pre_save, post_save, pre_delete, post_delete
+from django.dispatch import receiver
+from classes.models import Class
+from kindergartens.models import Kindergarten
+from teachers.models import Teacher
+from .models import User
+from .scope import bump_scope_version
+
+
+# 影响数据范围的用户字段，停用账号也需要让令牌中的声明失效
+SCOPE_FIELDS = ('role', 'kindergarten_id', 'teacher_id', 'is_active')
+
+
+@receiver(m2m_changed, sender=Teacher.classes.through)
+def teacher_classes_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    教师负责班级变化时，使关联用户的数据范围缓存失效
+    """
+    if action not in ('post_add', 'post_remove', 'pre_clear', 'post_clear'):
+        return
+    if not reverse:
+        teacher_ids = [instance.pk]
+    elif action == 'pre_clear':
+        teacher_ids = list(instance.teachers.values_list('id', flat=True))
+    else:
+        teacher_ids = list(pk_set or [])
+    if teacher_ids:
+        bump_scope_version(User.objects.filter(teacher_id__in=teacher_ids).values_list('id', flat=True))
+
+
+@receiver(m2m_changed, sender=User.classes.through)
+def user_classes_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    用户关联班级变化时，使该用户的数据范围缓存失效
+    """
+    if action not in ('post_add', 'post_remove', 'pre_clear', 'post_clear'):
+        return
+    if not reverse:
+        bump_scope_version([instance.pk])
+    elif action == 'pre_clear':
+        bump_scope_version(instance.user_set.values_list('id', flat=True))
+    else:
+        bump_scope_version(pk_set or [])
+
+
+@receiver(pre_save, sender=User)
+def remember_scope_fields(sender, instance, update_fields=None, **kwargs):
+    """
+    保存前记录影响数据范围的字段原值
+    """
+    instance._scope_changed = False
+    if instance.pk is None:
+        return
+    if update_fields is not None and not {'role', 'kindergarten', 'teacher', 'is_active'} & set(update_fields):
+        return
+    previous = User.objects.filter(pk=instance.pk).values(*SCOPE_FIELDS).first()
+    if previous is not None:
+        instance._scope_changed = any(previous[field] != getattr(instance, field) for field in SCOPE_FIELDS)
+
+
+@receiver(post_save, sender=User)
+def user_scope_changed(sender, instance, created, **kwargs):
+    """
+    用户角色、所属幼儿园、关联教师或启用状态变化时，使数据范围缓存失效
+    """
+    if getattr(instance, '_scope_changed', False):
+        bump_scope_version([instance.pk])
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    """
+    删除用户后使其令牌中的声明失效
+    """
+    bump_scope_version([instance.pk])
+
+
+# 删除教师、班级、幼儿园时，用户的外键被级联置空、班级关联被级联删除，
+# 这些批量更新不发送 post_save 和 m2m_changed，需要在删除前找到受影响的用户
+@receiver(pre_delete, sender=Teacher)
+def teacher_deleted(sender, instance, **kwargs):
+    bump_scope_version(User.objects.filter(teacher_id=instance.pk).values_list('id', flat=True))
+
+
+@receiver(pre_delete, sender=Class)
+def class_deleted(sender, instance, **kwargs):
+    bump_scope_version(User.objects.filter(
+        Q(teacher__classes=instance.pk) | Q(classes=instance.pk)
+    ).values_list('id', flat=True).distinct())
+
+
+@receiver(pre_delete, sender=Kindergarten)
+def kindergarten_deleted(sender, instance, **kwargs):
+    bump_scope_version(User.objects.filter(kindergarten_id=instance.pk).values_list('id', flat=True))
@@ -1,3 +1,225 @@
+from unittest import mock
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.test.client import RequestFactory
+from rest_framework.test import APIClient
+from kindergartens.models import Kindergarten
+from classes.models import Class
+from teachers.models import Teacher
+from children.models import Child
+from .models import User
+from .scope import UserScope, get_user_scope
+from .serializers import CustomTokenObtainPairSerializer
 
-# Create your tests here.
+
+class UserScopeCacheTests(TestCase):
+    """
+    用户数据范围缓存测试
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.kindergarten = Kindergarten.objects.create(name='阳光幼儿园')
+        cls.other_kindergarten = Kindergarten.objects.create(name='星星幼儿园')
+        cls.class_a = Class.objects.create(name='大一班', kindergarten=cls.kindergarten)
+        cls.class_b = Class.objects.create(name='小一班', kindergarten=cls.kindergarten)
+        cls.child_a = Child.objects.create(name='张三', class_info=cls.class_a)
+        cls.child_b = Child.objects.create(name='李四', class_info=cls.class_b)
+        cls.teacher = Teacher.objects.create(name='王老师', kindergarten=cls.kindergarten)
+        cls.teacher.classes.add(cls.class_a)
+        cls.teacher_user = User.objects.create_user(
+            username='teacher', password='pass', role='teacher',
+            kindergarten=cls.kindergarten, teacher=cls.teacher
+        )
+
+    def setUp(self):
+        # 进程内缓存在测试之间共享，清空以免读到其他测试的数据
+        cache.clear()
+
+    def list_children(self, user):
+        client = APIClient()
+        client.force_authenticate(user=user)
+        response = client.get('/api/children/')
+        self.assertEqual(response.status_code, 200)
+        return {item['name'] for item in response.data['results']}
+
+    def test_scope_is_memoized_per_request(self):
+        request = RequestFactory().get('/')
+        request.user = self.teacher_user
+        scope = get_user_scope(request)
+        self.assertIs(get_user_scope(request), scope)
+        with self.assertNumQueries(2):
+            self.assertEqual(scope.class_ids, {self.class_a.id})
+        with self.assertNumQueries(0):
+            self.assertEqual(scope.class_ids, {self.class_a.id})
+
+    def test_class_ids_are_cached_across_requests(self):
+        UserScope(self.teacher_user).class_ids
+        with self.assertNumQueries(0):
+            self.assertEqual(UserScope(self.teacher_user).class_ids, {self.class_a.id})
+
+    def test_owner_and_principal_need_no_queries(self):
+        principal = User.objects.create_user(
+            username='principal', password='pass', role='principal', kindergarten=self.kindergarten
+        )
+        with self.assertNumQueries(0):
+            scope = UserScope(principal)
+            scope.filter(Child.objects.all(), 'class_info__kindergarten_id', 'class_info_id')
+        self.assertEqual(scope.kindergarten_id, self.kindergarten.id)
+
+    def test_teacher_classes_change_invalidates_cache(self):
+        self.assertEqual(self.list_children(self.teacher_user), {'张三'})
+        self.teacher.classes.add(self.class_b)
+        self.assertEqual(self.list_children(self.teacher_user), {'张三', '李四'})
+        self.class_a.teachers.remove(self.teacher)
+        self.assertEqual(self.list_children(self.teacher_user), {'李四'})
+        self.class_b.teachers.clear()
+        self.assertEqual(self.list_children(self.teacher_user), set())
+
+    def test_user_classes_change_invalidates_cache(self):
+        self.assertEqual(UserScope(self.teacher_user).user_class_ids, set())
+        self.teacher_user.classes.add(self.class_b)
+        self.assertEqual(UserScope(self.teacher_user).user_class_ids, {self.class_b.id})
+        self.class_b.user_set.clear()
+        self.assertEqual(UserScope(self.teacher_user).user_class_ids, set())
+
+    def test_user_role_and_kindergarten_change_invalidates_cache(self):
+        user = User.objects.create_user(
+            username='principal', password='pass', role='principal', kindergarten=self.other_kindergarten
+        )
+        self.assertEqual(self.list_children(user), set())
+        user.kindergarten = self.kindergarten
+        user.save()
+        self.assertEqual(self.list_children(user), {'张三', '李四'})
+
+        user.role = 'teacher'
+        user.teacher = Teacher.objects.create(name='李老师', kindergarten=self.kindergarten)
+        user.save()
+        self.assertEqual(self.list_children(user), set())
+        user.teacher.classes.add(self.class_b)
+        self.assertEqual(self.list_children(user), {'李四'})
+
+    def test_permission_uses_scope(self):
+        client = APIClient()
+        client.force_authenticate(user=self.teacher_user)
+        self.assertEqual(client.get(f'/api/classes/{self.class_a.id}/').status_code, 200)
+        self.assertEqual(client.get(f'/api/classes/{self.class_b.id}/').status_code, 404)
+
+
+class ClaimsAuthenticationTests(TestCase):
+    """
+    基于令牌声明的认证测试
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.kindergarten = Kindergarten.objects.create(name='阳光幼儿园')
+        cls.class_a = Class.objects.create(name='大一班', kindergarten=cls.kindergarten)
+        cls.class_b = Class.objects.create(name='小一班', kindergarten=cls.kindergarten)
+        Child.objects.create(name='张三', class_info=cls.class_a)
+        Child.objects.create(name='李四', class_info=cls.class_b)
+        cls.teacher = Teacher.objects.create(name='王老师', kindergarten=cls.kindergarten)
+        cls.teacher.classes.add(cls.class_a)
+        cls.teacher_user = User.objects.create_user(
+            username='teacher', password='pass', role='teacher',
+            kindergarten=cls.kindergarten, teacher=cls.teacher
+        )
+
+    def setUp(self):
+        cache.clear()
+        # 测试使用本地内存缓存，按多进程共享缓存的部署测试令牌声明
+        patcher = mock.patch('users.authentication.scope_version_is_shared', return_value=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def client_for(self, user):
+        token = CustomTokenObtainPairSerializer.get_token(user)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {token.access_token}')
+        return client, token
+
+    def list_children(self, client):
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get('/api/children/')
+        self.assertEqual(response.status_code, 200)
+        user_queries = [q['sql'] for q in queries.captured_queries if User._meta.db_table in q['sql']]
+        return {item['name'] for item in response.data['results']}, user_queries
+
+    def test_list_and_retrieve_without_user_queries(self):
+        client, token = self.client_for(self.teacher_user)
+        self.assertEqual(token['class_ids'], [self.class_a.id])
+
+        names, user_queries = self.list_children(client)
+        self.assertEqual(names, {'张三'})
+        self.assertEqual(user_queries, [])
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(client.get(f'/api/classes/{self.class_a.id}/').status_code, 200)
+            self.assertEqual(client.get(f'/api/classes/{self.class_b.id}/').status_code, 404)
+        self.assertFalse([q for q in queries.captured_queries if User._meta.db_table in q['sql']])
+
+    def test_stale_claims_fall_back_to_database(self):
+        client, token = self.client_for(self.teacher_user)
+        self.teacher.classes.add(self.class_b)
+
+        names, user_queries = self.list_children(client)
+        self.assertEqual(names, {'张三', '李四'})
+        self.assertTrue(user_queries)
+
+    def test_refresh_issues_current_claims(self):
+        client, token = self.client_for(self.teacher_user)
+        self.teacher.classes.add(self.class_b)
+
+        response = APIClient().post('/api/auth/token/refresh/', {'refresh': str(token)})
+        self.assertEqual(response.status_code, 200)
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+        names, user_queries = self.list_children(client)
+        self.assertEqual(names, {'张三', '李四'})
+        self.assertEqual(user_queries, [])
+
+    def test_deactivated_user_is_rejected(self):
+        client, token = self.client_for(self.teacher_user)
+        self.teacher_user.is_active = False
+        self.teacher_user.save()
+        self.assertEqual(client.get('/api/children/').status_code, 401)
+
+    def test_local_cache_falls_back_to_database(self):
+        client, token = self.client_for(self.teacher_user)
+        # 本地内存缓存看不到其他进程递增的版本号，不信任令牌声明
+        with mock.patch('users.authentication.scope_version_is_shared', return_value=False):
+            names, user_queries = self.list_children(client)
+        self.assertEqual(names, {'张三'})
+        self.assertTrue(user_queries)
+
+    def test_deleting_teacher_invalidates_claims(self):
+        client, token = self.client_for(self.teacher_user)
+        self.teacher.delete()
+
+        names, user_queries = self.list_children(client)
+        self.assertEqual(names, set())
+        self.assertTrue(user_queries)
+
+    def test_deleting_class_invalidates_claims(self):
+        client, token = self.client_for(self.teacher_user)
+        self.class_a.delete()
+
+        names, user_queries = self.list_children(client)
+        self.assertEqual(names, set())
+        self.assertTrue(user_queries)
+
+    def test_deleting_kindergarten_invalidates_claims(self):
+        principal = User.objects.create_user(
+            username='principal', password='pass', role='principal', kindergarten=self.kindergarten
+        )
+        client, token = self.client_for(principal)
+        self.kindergarten.delete()
+
+        names, user_queries = self.list_children(client)
+        self.assertEqual(names, set())
+        self.assertTrue(user_queries)
+
+    def test_claims_user_can_be_saved_as_foreign_key(self):
+        client, token = self.client_for(self.teacher_user)
+        response = client.get('/api/selections/selection-records/export/', {'background': '1'})
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(client.get('/api/jobs/').data['count'], 1)
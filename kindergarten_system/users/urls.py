@@ -1,8 +1,9 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from rest_framework_simplejwt.views import TokenRefreshView, TokenVerifyView
+from rest_framework_simplejwt.views import TokenVerifyView
 from .views import (
     CustomTokenObtainPairView,
+    CustomTokenRefreshView,
     UserViewSet,
     UserRegisterViewSet
 )
@@ -16,7 +17,7 @@ router.register(r'register', UserRegisterViewSet, basename='register')
 urlpatterns = [
     # JWT认证路由
     path('token/', CustomTokenObtainPairView.as_view(), name='token_obtain_pair'),
-    path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('token/refresh/', CustomTokenRefreshView.as_view(), name='token_refresh'),
     path('token/verify/', TokenVerifyView.as_view(), name='token_verify'),
     
     # 登录接口
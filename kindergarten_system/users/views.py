@@ -10,11 +10,11 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.parsers import JSONParser
 from rest_framework.permissions import AllowAny, IsAuthenticated
-from rest_framework_simplejwt.views import TokenObtainPairView
-from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from .models import User
 from .serializers import (
     CustomTokenObtainPairSerializer,
+    CustomTokenRefreshSerializer,
     UserSerializer,
     UserRegisterSerializer
 )
@@ -25,11 +25,16 @@ from .permissions import (
     KindergartenDataPermission,
     IsOwnerOrReadOnly
 )
+from .scope import get_user_scope
 
 # 自定义令牌获取视图
 class CustomTokenObtainPairView(TokenObtainPairView):
     serializer_class = CustomTokenObtainPairSerializer
 
+# 自定义令牌刷新视图
+class CustomTokenRefreshView(TokenRefreshView):
+    serializer_class = CustomTokenRefreshSerializer
+
 # 生成验证码
 def generate_captcha():
     # 生成随机字符串
@@ -150,21 +155,14 @@ class UserViewSet(viewsets.ModelViewSet):
         根据用户角色过滤查询集
         """
         queryset = super().get_queryset()
-        user = self.request.user
-        
-        # 如果是系统所有者，返回所有用户
-        if hasattr(user, 'role') and user.role == 'owner':
-            return queryset
-        
-        # 如果是园长，返回自己幼儿园的所有用户
-        elif hasattr(user, 'role') and user.role == 'principal' and user.kindergarten:
-            return queryset.filter(kindergarten=user.kindergarten)
+        scope = get_user_scope(self.request)
         
         # 如果是教师，返回自己
-        elif hasattr(user, 'role') and user.role == 'teacher':
-            return queryset.filter(id=user.id)
+        if scope.role == 'teacher':
+            return queryset.filter(id=scope.user_id)
         
-        return queryset.none()
+        # 系统所有者返回所有用户，园长返回自己幼儿园的所有用户
+        return scope.filter(queryset, 'kindergarten_id')
     
     def create(self, request, *args, **kwargs):
         """
@@ -276,8 +274,8 @@ class UserViewSet(viewsets.ModelViewSet):
         if not user.is_active:
             return Response({'code': 400, 'msg': '用户已被禁用'}, status=status.HTTP_400_BAD_REQUEST)
         
-        # 生成JWT token
-        refresh = RefreshToken.for_user(user)
+        # 生成JWT token，携带角色和数据范围声明
+        refresh = CustomTokenObtainPairSerializer.get_token(user)
         
         # 删除已使用的验证码
         cache.delete(f'captcha_{captcha_key}')
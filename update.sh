@@ -58,6 +58,7 @@ else
     else
         echo "数据库模型无变更，跳过迁移"
     fi
+    docker-compose exec backend python manage.py createcachetable
 
     # 重新收集静态文件
     echo "重新收集静态文件..."